@@ -1,6 +1,9 @@
 import os
 import json
-from typing import List, Optional, Dict, Any
+import time
+import sqlite3
+import threading
+from typing import List, Optional, Dict, Any, Tuple
 from pathlib import Path
   # Import Exercise từ models.py cùng cấp trong TestFE
 from sqlalchemy import create_engine
@@ -24,15 +27,25 @@ def get_db():
         yield db
     finally:
         db.close()
-# Đường dẫn tới file JSON lưu trữ cơ sở dữ liệu các bài tập
-# File này sẽ nằm cùng cấp với main.py trong thư mục scansCV
+# Kho bài tập được lưu trong một file SQLite nhúng (chế độ WAL) để 4 worker gunicorn
+# có thể đọc/ghi đồng thời an toàn, tra cứu/cập nhật theo ID qua chỉ mục B-tree.
+# File JSON cũ chỉ còn được dùng làm nguồn di chuyển dữ liệu ở lần khởi động đầu tiên.
 from models import Exercise
-DB_FILE_PATH = Path("exercises_db.json")  # exercises_db.json sẽ nằm ở thư mục gốc của dự án
+DB_FILE_PATH = Path("exercises_db.json")  # File JSON cũ, nằm ở thư mục gốc của dự án
+EXERCISE_STORE_PATH = Path(os.getenv("EXERCISE_STORE_PATH", "exercises_db.sqlite3"))
+# Job chấm bài đã hoàn tất được giữ lại trong khoảng thời gian này (giây) rồi tự động dọn
+SUBMISSION_JOB_RETENTION_SECONDS = 7 * 24 * 3600
+# Số kết quả chấm tối đa được ghi nhớ (các kết quả ít được dùng gần đây nhất bị xóa trước)
+VERDICT_CACHE_MAX_ENTRIES = int(os.getenv("VERDICT_CACHE_MAX_ENTRIES", "10000"))
+
+_store_local = threading.local()
+_store_init_lock = threading.Lock()
+_store_initialized = False
 
 
 def _load_exercises_raw() -> List[Dict[str, Any]]:
     """
-    Tải danh sách bài tập (dạng dict) từ file JSON.
+    Tải danh sách bài tập (dạng dict) từ file JSON cũ.
     Trả về danh sách rỗng nếu file không tồn tại hoặc có lỗi.
     """
     if not DB_FILE_PATH.exists():
@@ -47,23 +60,152 @@ def _load_exercises_raw() -> List[Dict[str, Any]]:
         return []
 
 
-def _save_exercises_raw(exercises_data: List[Dict[str, Any]]):
+def _get_store_connection() -> sqlite3.Connection:
     """
-    Lưu danh sách bài tập (dạng dict) vào file JSON.
+    Trả về kết nối SQLite riêng cho thread hiện tại (kết nối SQLite không nên dùng chung giữa các thread).
+    Lần gọi đầu tiên trong tiến trình sẽ tạo bảng và di chuyển dữ liệu từ file JSON cũ nếu cần.
     """
+    conn = getattr(_store_local, "conn", None)
+    # Kết nối SQLite không được dùng lại sau fork (gunicorn --preload), nên mở kết nối mới trong worker
+    if conn is None or getattr(_store_local, "pid", None) != os.getpid():
+        conn = sqlite3.connect(str(EXERCISE_STORE_PATH), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        _store_local.conn = conn
+        _store_local.pid = os.getpid()
+        _init_store(conn)
+    return conn
+
+
+def _init_store(conn: sqlite3.Connection):
+    global _store_initialized
+    with _store_init_lock:
+        if _store_initialized:
+            return
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS exercises (
+                id INTEGER PRIMARY KEY,
+                data TEXT NOT NULL,
+                seq INTEGER NOT NULL
+            )
+        """)
+        # seq tăng dần sau mỗi lần ghi, dùng làm tem phiên bản để các worker đồng bộ phần thay đổi
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_exercises_seq ON exercises (seq)")
+        conn.execute("CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)")
+        # Trạng thái các job chấm bài bất đồng bộ, dùng chung giữa các worker
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS submission_jobs (
+                id TEXT PRIMARY KEY,
+                exercise_id INTEGER NOT NULL,
+                owner TEXT,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_submission_jobs_updated ON submission_jobs (updated_at)")
+        # Sự kiện tiến độ của job (kết quả từng test case, tổng kết), phục vụ stream kết quả cho client
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS submission_events (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                event TEXT NOT NULL,
+                PRIMARY KEY (job_id, seq)
+            )
+        """)
+        # Kết quả chấm đã ghi nhớ theo (bài tập, test case, mã nguồn) để trả lời ngay các bài nộp trùng lặp
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS verdict_cache (
+                key TEXT PRIMARY KEY,
+                exercise_id INTEGER NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdict_cache_exercise ON verdict_cache (exercise_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verdict_cache_last_used ON verdict_cache (last_used)")
+        _migrate_from_json(conn)
+        _store_initialized = True
+
+
+def _migrate_from_json(conn: sqlite3.Connection):
+    """Nhập dữ liệu từ exercises_db.json vào SQLite đúng một lần (an toàn khi nhiều worker cùng khởi động)."""
+    conn.execute("BEGIN IMMEDIATE")
     try:
-        with open(DB_FILE_PATH, "w", encoding="utf-8") as f:
-            json.dump(exercises_data, f, indent=4, ensure_ascii=False)
-    except IOError as e:
-        print(f"Lỗi khi ghi file {DB_FILE_PATH}: {e}")
+        migrated = conn.execute("SELECT value FROM store_meta WHERE key = 'json_migrated'").fetchone()
+        if migrated:
+            conn.execute("COMMIT")
+            return
+
+        exercises = []
+        for data in _load_exercises_raw():
+            try:
+                exercises.append(Exercise(**data))
+            except Exception as e:  # Bỏ qua bản ghi không khớp model thay vì làm hỏng cả lần di chuyển
+                print(f"Bỏ qua bài tập ID {data.get('id')} khi di chuyển từ {DB_FILE_PATH}: {e}")
+        count = _upsert_many(conn, exercises)
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_migrated', ?)", (str(count),))
+        conn.execute("COMMIT")
+        if count:
+            print(f"Đã di chuyển {count} bài tập từ {DB_FILE_PATH} sang {EXERCISE_STORE_PATH}")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _upsert_many(conn: sqlite3.Connection, exercises: List[Exercise]) -> int:
+    """Ghi (thêm hoặc cập nhật) nhiều bài tập. Phải được gọi bên trong một transaction ghi."""
+    last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM exercises").fetchone()[0]
+    rows = [
+        (exercise.id, json.dumps(exercise.model_dump(mode="json"), ensure_ascii=False), last_seq + i + 1)
+        for i, exercise in enumerate(exercises)
+    ]
+    conn.executemany(
+        "INSERT INTO exercises (id, data, seq) VALUES (?, ?, ?) "
+        "ON CONFLICT(id) DO UPDATE SET data = excluded.data, seq = excluded.seq",
+        rows
+    )
+    return len(rows)
+
+
+def _row_to_exercise(exercise_id: int, data: str) -> Optional[Exercise]:
+    try:
+        return Exercise(**json.loads(data))
+    except Exception as e:  # Bắt lỗi validation của Pydantic nếu dữ liệu trong DB không khớp model
+        print(f"Lỗi khi parse Exercise ID {exercise_id} từ DB: {e}")
+        return None
+
+
+def get_exercises_version() -> int:
+    """
+    Trả về "tem phiên bản" của kho bài tập (seq lớn nhất, tra cứu qua chỉ mục).
+    Các worker so sánh giá trị này để biết kho đã bị worker khác thay đổi hay chưa.
+    """
+    return _get_store_connection().execute("SELECT COALESCE(MAX(seq), 0) FROM exercises").fetchone()[0]
+
+
+def get_exercises_changed_since(version: int) -> Tuple[List[Exercise], int]:
+    """
+    Trả về các bài tập được thêm/cập nhật sau tem phiên bản `version`,
+    cùng tem phiên bản mới nhất đã đọc được.
+    """
+    rows = _get_store_connection().execute(
+        "SELECT id, data, seq FROM exercises WHERE seq > ? ORDER BY seq", (version or 0,)
+    ).fetchall()
+    exercises = [ex for ex in (_row_to_exercise(row[0], row[1]) for row in rows) if ex is not None]
+    new_version = rows[-1][2] if rows else (version or 0)
+    return exercises, new_version
 
 
 def get_all_exercises() -> List[Exercise]:
     """
-    Lấy tất cả bài tập từ cơ sở dữ liệu JSON và chuyển đổi thành đối tượng Exercise.
+    Lấy tất cả bài tập từ kho và chuyển đổi thành đối tượng Exercise.
     """
-    exercises_data = _load_exercises_raw()
-    return [Exercise(**data) for data in exercises_data]
+    rows = _get_store_connection().execute("SELECT id, data FROM exercises ORDER BY id").fetchall()
+    return [ex for ex in (_row_to_exercise(row[0], row[1]) for row in rows) if ex is not None]
 
 
 def get_exercise_by_id(exercise_id: int) -> Optional[Exercise]:
@@ -71,41 +213,128 @@ def get_exercise_by_id(exercise_id: int) -> Optional[Exercise]:
     Tìm và trả về một bài tập dựa trên ID của nó.
     Trả về None nếu không tìm thấy.
     """
-    exercises_data = _load_exercises_raw()
-    for data in exercises_data:
-        if data.get("id") == exercise_id:
-            try:
-                return Exercise(**data)
-            except Exception as e:  # Bắt lỗi validation của Pydantic nếu dữ liệu trong DB không khớp model
-                print(f"Lỗi khi parse Exercise ID {exercise_id} từ DB: {e}")
-                return None
-    return None
+    row = _get_store_connection().execute(
+        "SELECT id, data FROM exercises WHERE id = ?", (exercise_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return _row_to_exercise(row[0], row[1])
+
+
+def import_exercises(exercises: List[Exercise]) -> int:
+    """
+    Nhập hàng loạt bài tập trong một transaction duy nhất (thêm mới hoặc cập nhật theo ID).
+    Trả về số bài tập đã ghi.
+    """
+    conn = _get_store_connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        count = _upsert_many(conn, exercises)
+        # Test case có thể đã thay đổi: bỏ các kết quả chấm đã ghi nhớ của những bài tập này
+        conn.executemany("DELETE FROM verdict_cache WHERE exercise_id = ?", [(ex.id,) for ex in exercises])
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return count
 
 
 def add_exercise(exercise: Exercise) -> int:
     """
-    Thêm một bài tập mới vào cơ sở dữ liệu JSON hoặc cập nhật nếu ID đã tồn tại.
+    Thêm một bài tập mới vào kho hoặc cập nhật nếu ID đã tồn tại.
     Trả về ID của bài tập đã được thêm/cập nhật.
     """
-    exercises_raw = _load_exercises_raw()
+    import_exercises([exercise])
+    print(f"Đã lưu bài tập với ID: {exercise.id}")
+    return exercise.id
 
-    # Kiểm tra xem exercise với ID này đã tồn tại chưa
-    exercise_exists = False
-    for i, ex_data in enumerate(exercises_raw):
-        if ex_data.get("id") == exercise.id:
-            exercises_raw[i] = exercise.model_dump()  # Cập nhật exercise hiện tại (Pydantic v2+)
-            # exercises_raw[i] = exercise.dict() # Cho Pydantic v1
-            exercise_exists = True
-            print(f"Đã cập nhật bài tập với ID: {exercise.id}")
-            break
 
-    if not exercise_exists:
-        exercises_raw.append(exercise.model_dump())  # Thêm exercise mới (Pydantic v2+)
-        # exercises_raw.append(exercise.dict()) # Cho Pydantic v1
-        print(f"Đã thêm bài tập mới với ID: {exercise.id}")
+# --- Job chấm bài bất đồng bộ ---
 
-    _save_exercises_raw(exercises_raw)
-    return exercise.id
+def create_submission_job(job_id: str, exercise_id: int, owner: Optional[str]):
+    """Tạo một job chấm bài mới ở trạng thái 'queued' và dọn các job cũ đã hết hạn."""
+    now = time.time()
+    conn = _get_store_connection()
+    conn.execute(
+        "INSERT INTO submission_jobs (id, exercise_id, owner, status, created_at, updated_at) "
+        "VALUES (?, ?, ?, 'queued', ?, ?)",
+        (job_id, exercise_id, owner, now, now)
+    )
+    expired = (now - SUBMISSION_JOB_RETENTION_SECONDS,)
+    conn.execute(
+        "DELETE FROM submission_events WHERE job_id IN (SELECT id FROM submission_jobs "
+        "WHERE updated_at < ? AND status IN ('completed', 'failed'))", expired
+    )
+    conn.execute(
+        "DELETE FROM submission_jobs WHERE updated_at < ? AND status IN ('completed', 'failed')", expired
+    )
+
+
+def update_submission_job(job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+                          error: Optional[str] = None):
+    _get_store_connection().execute(
+        "UPDATE submission_jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE id = ?",
+        (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), job_id)
+    )
+
+
+def get_submission_job(job_id: str) -> Optional[Dict[str, Any]]:
+    row = _get_store_connection().execute(
+        "SELECT id, exercise_id, owner, status, result, error, created_at, updated_at "
+        "FROM submission_jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": row[0],
+        "exercise_id": row[1],
+        "owner": row[2],
+        "status": row[3],
+        "result": json.loads(row[4]) if row[4] else None,
+        "error": row[5],
+        "created_at": row[6],
+        "updated_at": row[7],
+    }
+
+
+def append_submission_event(job_id: str, seq: int, event: Dict[str, Any]):
+    """Lưu một sự kiện tiến độ của job (để client kết nối muộn hoặc ở worker khác đọc lại)."""
+    _get_store_connection().execute(
+        "INSERT OR REPLACE INTO submission_events (job_id, seq, event) VALUES (?, ?, ?)",
+        (job_id, seq, json.dumps(event, ensure_ascii=False))
+    )
+
+
+def get_submission_events(job_id: str, after_seq: int = 0) -> List[Tuple[int, Dict[str, Any]]]:
+    """Trả về các sự kiện của job có seq > after_seq, theo thứ tự."""
+    rows = _get_store_connection().execute(
+        "SELECT seq, event FROM submission_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+        (job_id, after_seq)
+    ).fetchall()
+    return [(seq, json.loads(event)) for seq, event in rows]
+
+
+# --- Ghi nhớ kết quả chấm ---
 
+def get_cached_verdict(key: str) -> Optional[List[Dict[str, Any]]]:
+    conn = _get_store_connection()
+    row = conn.execute("SELECT result FROM verdict_cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    conn.execute("UPDATE verdict_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+    return json.loads(row[0])
 
 
+def store_cached_verdict(key: str, exercise_id: int, result: List[Dict[str, Any]]):
+    """Ghi nhớ kết quả chấm của một bài nộp, giữ tổng số kết quả không vượt VERDICT_CACHE_MAX_ENTRIES."""
+    conn = _get_store_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO verdict_cache (key, exercise_id, result, last_used) VALUES (?, ?, ?, ?)",
+        (key, exercise_id, json.dumps(result, ensure_ascii=False), time.time())
+    )
+    overflow = conn.execute("SELECT COUNT(*) FROM verdict_cache").fetchone()[0] - VERDICT_CACHE_MAX_ENTRIES
+    if overflow > 0:
+        conn.execute(
+            "DELETE FROM verdict_cache WHERE key IN "
+            "(SELECT key FROM verdict_cache ORDER BY last_used LIMIT ?)", (overflow,)
+        )
@@ -0,0 +1,164 @@
+# grader/browser_pool.py
+"""
+Pool các Chromium headless chạy sẵn cho máy chấm frontend.
+
+Trình duyệt được khởi động một lần (khi worker của grader service khởi động) và dùng lại cho nhiều bài nộp;
+mỗi bài nộp (hoặc mỗi phiên test case chạy song song của bài nộp) chỉ phải tạo một BrowserContext riêng
+(cookie, localStorage, cache... tách biệt hoàn toàn).
+
+    GRADER_BROWSER_POOL_SIZE    : số Chromium chạy sẵn (mặc định 1)
+    GRADER_BROWSER_MAX_USES     : số BrowserContext tối đa trên một Chromium trước khi khởi động lại (mặc định 50)
+    GRADER_BROWSER_MAX_CONTEXTS : số BrowserContext mở đồng thời tối đa trên cả pool (mặc định 8)
+
+Chromium bị crash/ngắt kết nối được thay bằng bản mới ở lần lấy context tiếp theo.
+Pool dùng Playwright async API và gắn với event loop đã khởi động nó (event loop của máy chấm frontend,
+xem FrontendEngine trong grader/judge.py); nhiều bài nộp dùng chung pool trên cùng event loop.
+"""
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from typing import List, Optional, Dict, Any, AsyncIterator
+
+from playwright.async_api import async_playwright, Browser, BrowserContext, Playwright, Error as PlaywrightError
+
+BROWSER_POOL_SIZE = int(os.getenv("GRADER_BROWSER_POOL_SIZE", "1"))
+BROWSER_MAX_USES = int(os.getenv("GRADER_BROWSER_MAX_USES", "50"))
+BROWSER_MAX_CONTEXTS = int(os.getenv("GRADER_BROWSER_MAX_CONTEXTS", "8"))
+# Thời gian tối đa chờ một chỗ trống khi pool đã mở đủ BrowserContext (giây)
+CONTEXT_ACQUIRE_TIMEOUT = 120
+
+
+class _PooledBrowser:
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.crashed = False
+        browser.on("disconnected", lambda _: setattr(self, "crashed", True))
+
+    def usable(self, max_uses: int) -> bool:
+        return not self.crashed and self.uses < max_uses and self.browser.is_connected()
+
+
+class BrowserPool:
+    def __init__(self, size: int = BROWSER_POOL_SIZE, max_uses: int = BROWSER_MAX_USES,
+                 max_contexts: int = BROWSER_MAX_CONTEXTS):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        self.max_contexts = max(1, max_contexts)
+        self._slots = asyncio.Semaphore(self.max_contexts)
+        # Khởi động/thay Chromium lần lượt, tránh nhiều bài nộp cùng lúc khởi động thừa trình duyệt
+        self._launch_lock = asyncio.Lock()
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[_PooledBrowser] = []
+        self.launched = 0
+
+    async def start(self):
+        """Khởi động Playwright và đủ `size` Chromium."""
+        async with self._launch_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            while len(self._browsers) < self.size:
+                self._browsers.append(await self._launch())
+        print(f"[BrowserPool] Đã khởi động {len(self._browsers)} Chromium.")
+
+    async def _launch(self) -> _PooledBrowser:
+        self.launched += 1
+        return _PooledBrowser(await self._playwright.chromium.launch(headless=True))
+
+    async def _retire(self, entry: _PooledBrowser):
+        if entry in self._browsers:
+            self._browsers.remove(entry)
+        try:
+            await entry.browser.close()
+        except PlaywrightError:
+            pass
+
+    async def _pick(self) -> _PooledBrowser:
+        """Chromium còn dùng được và đang mở ít context nhất; bỏ các Chromium đã hỏng/hết lượt không còn ai dùng."""
+        async with self._launch_lock:
+            for entry in list(self._browsers):
+                if entry.active == 0 and not entry.usable(self.max_uses):
+                    await self._retire(entry)
+            usable = [entry for entry in self._browsers if entry.usable(self.max_uses)]
+            if not usable or len(self._browsers) < self.size:
+                # Thiếu Chromium, hoặc mọi Chromium đều hết lượt nhưng còn bài đang chấm:
+                # chạy thêm một bản, bản cũ bị bỏ khi rảnh
+                entry = await self._launch()
+                self._browsers.append(entry)
+                usable.append(entry)
+            return min(usable, key=lambda e: e.active)
+
+    @asynccontextmanager
+    async def context(self, **options: Any) -> AsyncIterator[BrowserContext]:
+        """BrowserContext mới trên một Chromium của pool, được đóng khi ra khỏi khối `async with`."""
+        if self._playwright is None:
+            await self.start()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=CONTEXT_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Không có trình duyệt rảnh sau {CONTEXT_ACQUIRE_TIMEOUT}s.")
+        try:
+            entry = await self._pick()
+            # Giữ chỗ trước khi chờ new_context để Chromium không bị bỏ giữa chừng
+            entry.active += 1
+            try:
+                try:
+                    browser_context = await entry.browser.new_context(**options)
+                except PlaywrightError:
+                    # Chromium chết giữa chừng: thay bằng bản mới và thử lại một lần
+                    entry.crashed = True
+                    entry.active -= 1
+                    entry = await self._pick()
+                    entry.active += 1
+                    browser_context = await entry.browser.new_context(**options)
+                entry.uses += 1
+                try:
+                    yield browser_context
+                finally:
+                    try:
+                        await browser_context.close()
+                    except PlaywrightError:
+                        entry.crashed = True
+            finally:
+                entry.active -= 1
+                if entry.active == 0 and not entry.usable(self.max_uses):
+                    await self._retire(entry)
+        finally:
+            self._slots.release()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"browsers": len(self._browsers), "launched": self.launched,
+                "active_contexts": sum(entry.active for entry in self._browsers)}
+
+    async def close(self):
+        if self._playwright is None:
+            return
+        for entry in list(self._browsers):
+            await self._retire(entry)
+        await self._playwright.stop()
+        self._playwright = None
+
+
+_pool: Optional[BrowserPool] = None
+
+
+async def get_browser_pool() -> BrowserPool:
+    """Pool dùng chung của tiến trình (khởi động ở lần gọi đầu tiên, trên event loop của máy chấm frontend)."""
+    global _pool
+    if _pool is None:
+        _pool = BrowserPool()
+        await _pool.start()
+    return _pool
+
+
+def browser_pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats if _pool is not None else None
+
+
+async def shutdown_browser_pool():
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
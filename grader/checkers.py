@@ -0,0 +1,309 @@
+# grader/checkers.py
+"""
+Các bộ so sánh output cho máy chấm backend.
+
+Expected output được truyền dưới dạng bytes hoặc mmap của file expected (không sao chép vào bộ nhớ
+với "exact" và "strip"). Mỗi bộ so sánh nhận output của bài nộp theo từng đoạn (bytes) ngay khi đọc được từ pipe:
+`feed(chunk)` trả về False ngay khi output đã chắc chắn sai (để dừng bài nộp sớm),
+`finish()` trả về kết quả cuối cùng sau khi đọc hết output (chỉ khi bài nộp kết thúc bình thường),
+`close()` luôn được gọi sau cùng.
+
+Cấu hình trên bài tập qua trường `checker`:
+    "strip"                                  (mặc định) bỏ khoảng trắng ở đầu/cuối toàn bộ output
+    "exact"                                  so khớp từng byte
+    "trailing_whitespace"                    bỏ khoảng trắng cuối mỗi dòng và các dòng trống ở cuối
+    "tokens"                                 so khớp từng token (phân tách bởi khoảng trắng)
+    {"type": "float", "tolerance": 1e-6}     như "tokens", số thực được so với sai số tuyệt đối/tương đối
+    {"type": "program", "language": "cpp" | "python", "source": "..."}
+                                             special judge: chương trình checker của bài tập, chạy dạng
+                                             `checker <input> <expected> <actual>`; mã thoát 0 = đúng, 1 hoặc 2 = sai,
+                                             mã khác = checker lỗi. stdout/stderr của checker là thông báo cho người nộp.
+"""
+import re
+import math
+import mmap
+import tempfile
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+Expected = Union[bytes, mmap.mmap]
+
+DEFAULT_CHECKER = "strip"
+DEFAULT_FLOAT_TOLERANCE = 1e-6
+
+# Các ký tự khoảng trắng của str.strip() (dạng UTF-8), dùng cho "strip" để giữ đúng cách so sánh cũ
+_UNICODE_WHITESPACE = tuple(sorted((chr(c).encode("utf-8") for c in range(0x3001) if chr(c).isspace()),
+                                   key=len, reverse=True))
+_MULTIBYTE_WHITESPACE = tuple(ws for ws in _UNICODE_WHITESPACE if len(ws) > 1)
+_LEADING_WHITESPACE_RE = re.compile(b"(?:" + b"|".join(re.escape(ws) for ws in _UNICODE_WHITESPACE) + b")*")
+
+
+class OutputChecker:
+    # Thông báo của bộ so sánh về kết quả (chỉ checker dạng chương trình có)
+    message: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> bool:
+        raise NotImplementedError
+
+    def finish(self) -> bool:
+        raise NotImplementedError
+
+    def close(self):
+        """Giải phóng tài nguyên; được gọi cả khi finish() không được gọi (bài nộp lỗi runtime, quá thời gian...)."""
+
+
+class ExactChecker(OutputChecker):
+    def __init__(self, expected: Expected):
+        self._expected = expected
+        self._position = 0
+
+    def feed(self, chunk: bytes) -> bool:
+        end = self._position + len(chunk)
+        if end > len(self._expected) or self._expected[self._position:end] != chunk:
+            return False
+        self._position = end
+        return True
+
+    def finish(self) -> bool:
+        return self._position == len(self._expected)
+
+
+def _skip_whitespace(data: Expected, start: int = 0) -> int:
+    """Vị trí ký tự đầu tiên không phải khoảng trắng (unicode) tính từ `start`."""
+    return _LEADING_WHITESPACE_RE.match(data, start).end()
+
+
+def _rstrip_whitespace(data: Expected, start: int, end: int) -> int:
+    """Vị trí kết thúc của data[start:end] sau khi bỏ khoảng trắng (unicode) ở cuối."""
+    while end > start:
+        for ws in _UNICODE_WHITESPACE:
+            if end - len(ws) >= start and data[end - len(ws):end] == ws:
+                end -= len(ws)
+                break
+        else:
+            return end
+    return end
+
+
+def _is_partial_whitespace(data: bytes) -> bool:
+    """`data` có thể là phần đầu của một ký tự khoảng trắng nhiều byte bị cắt ở ranh giới đoạn output."""
+    return any(len(data) < len(ws) and ws.startswith(data) for ws in _MULTIBYTE_WHITESPACE)
+
+
+class StripChecker(OutputChecker):
+    """
+    Tương đương `actual.strip() == expected.strip()` (cách so sánh cũ của máy chấm): khoảng trắng theo str.strip()
+    (cả các ký tự unicode như U+00A0), output của bài nộp được đọc như ở chế độ text (\\r\\n và \\r thành \\n).
+    """
+
+    def __init__(self, expected: Expected):
+        # Chỉ tính vị trí phần không phải khoảng trắng, không sao chép expected
+        start = _skip_whitespace(expected)
+        end = _rstrip_whitespace(expected, start, len(expected))
+        self._expected = expected
+        self._start = start
+        self._length = end - start
+        self._position = 0
+        self._started = False
+        # Phần output chưa phân định được (có thể là đầu của một ký tự khoảng trắng nhiều byte)
+        self._pending = b""
+        # Output kết thúc đoạn bằng \r: chưa biết có \n theo sau hay không
+        self._pending_cr = False
+
+    def feed(self, chunk: bytes) -> bool:
+        if self._pending_cr:
+            chunk = b"\r" + chunk
+        self._pending_cr = chunk.endswith(b"\r")
+        if self._pending_cr:
+            chunk = chunk[:-1]
+        if b"\r" in chunk:
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        return self._feed(chunk)
+
+    def _feed(self, data: bytes) -> bool:
+        if not self._started:
+            data = self._pending + data
+            data = data[_skip_whitespace(data):]
+            if not data or _is_partial_whitespace(data):
+                self._pending = data
+                return True
+            self._pending = b""
+            self._started = True
+        if self._position < self._length:
+            count = min(len(data), self._length - self._position)
+            offset = self._start + self._position
+            if data[:count] != self._expected[offset:offset + count]:
+                return False
+            self._position += count
+            data = data[count:]
+            if not data:
+                return True
+        # Sau khi đã khớp hết expected chỉ còn được phép có khoảng trắng
+        data = self._pending + data
+        self._pending = data[_skip_whitespace(data):]
+        return not self._pending or _is_partial_whitespace(self._pending)
+
+    def finish(self) -> bool:
+        if self._pending_cr:
+            self._pending_cr = False
+            if not self._feed(b"\n"):
+                return False
+        if not self._started and self._pending:
+            # Phần đầu dở dang không thành khoảng trắng: đó là nội dung của output
+            data, self._pending = self._pending, b""
+            self._started = True
+            if not self._feed(data):
+                return False
+        return self._position == self._length and not self._pending
+
+
+class TrailingWhitespaceChecker(OutputChecker):
+    """So khớp từng dòng sau khi bỏ khoảng trắng cuối dòng; các dòng trống ở cuối output được bỏ qua."""
+
+    def __init__(self, expected: Expected):
+        lines = [line.rstrip() for line in bytes(expected).split(b"\n")]
+        while lines and not lines[-1]:
+            lines.pop()
+        self._expected = lines
+        self._index = 0
+        self._partial = b""
+
+    def _check_line(self, line: bytes) -> bool:
+        if self._index < len(self._expected):
+            matched = line == self._expected[self._index]
+            self._index += 1
+            return matched
+        return not line
+
+    def feed(self, chunk: bytes) -> bool:
+        lines = (self._partial + chunk).split(b"\n")
+        self._partial = lines.pop()
+        return all(self._check_line(line.rstrip()) for line in lines)
+
+    def finish(self) -> bool:
+        if self._partial and not self._check_line(self._partial.rstrip()):
+            return False
+        return self._index >= len(self._expected)
+
+
+class TokenChecker(OutputChecker):
+    def __init__(self, expected: Expected):
+        self._expected = bytes(expected).split()
+        self._index = 0
+        self._partial = b""
+
+    def _tokens_match(self, actual: bytes, expected: bytes) -> bool:
+        return actual == expected
+
+    def _check_token(self, token: bytes) -> bool:
+        if self._index >= len(self._expected):
+            return False
+        matched = self._tokens_match(token, self._expected[self._index])
+        self._index += 1
+        return matched
+
+    def feed(self, chunk: bytes) -> bool:
+        data = self._partial + chunk
+        tokens = data.split()
+        # Token cuối có thể chưa đọc xong nếu đoạn output không kết thúc bằng khoảng trắng
+        self._partial = tokens.pop() if tokens and not data[-1:].isspace() else b""
+        return all(self._check_token(token) for token in tokens)
+
+    def finish(self) -> bool:
+        if self._partial and not self._check_token(self._partial):
+            return False
+        return self._index == len(self._expected)
+
+
+class FloatChecker(TokenChecker):
+    def __init__(self, expected: Expected, tolerance: float = DEFAULT_FLOAT_TOLERANCE):
+        super().__init__(expected)
+        self._tolerance = tolerance
+
+    def _tokens_match(self, actual: bytes, expected: bytes) -> bool:
+        if actual == expected:
+            return True
+        try:
+            actual_value, expected_value = float(actual), float(expected)
+        except ValueError:
+            return False
+        return math.isclose(actual_value, expected_value, rel_tol=self._tolerance, abs_tol=self._tolerance)
+
+
+class ProgramChecker(OutputChecker):
+    """
+    Special judge: output được ghi dần ra file tạm trong lúc đọc (không giữ trong bộ nhớ),
+    sau khi bài nộp kết thúc thì `evaluate(đường_dẫn_output)` chạy chương trình checker và trả về (đúng/sai, thông báo).
+    """
+
+    def __init__(self, evaluate: Callable[[str], Tuple[bool, str]]):
+        self._evaluate = evaluate
+        # File tự bị xóa khi đóng (kể cả khi bài nộp bị dừng và finish() không được gọi)
+        self._actual = tempfile.NamedTemporaryFile(prefix="actual_")
+
+    def feed(self, chunk: bytes) -> bool:
+        self._actual.write(chunk)
+        return True
+
+    def finish(self) -> bool:
+        try:
+            self._actual.flush()
+            accepted, self.message = self._evaluate(self._actual.name)
+        finally:
+            self._actual.close()
+        return accepted
+
+    def close(self):
+        self._actual.close()
+
+
+PROGRAM_CHECKER_LANGUAGES = ("cpp", "python")
+
+
+def is_program_checker(spec: Optional[Any]) -> bool:
+    return isinstance(spec, dict) and spec.get("type") == "program"
+
+
+CHECKERS = {
+    "exact": ExactChecker,
+    "strip": StripChecker,
+    "trailing_whitespace": TrailingWhitespaceChecker,
+    "tokens": TokenChecker,
+    "float": FloatChecker,
+    "program": ProgramChecker,
+}
+
+# Chạy chương trình checker cho một test case: (test case, đường dẫn file output) -> (đúng/sai, thông báo)
+ProgramRunner = Callable[[Dict[str, Any], str], Tuple[bool, str]]
+
+
+def validate_program_checker(spec: Dict[str, Any]):
+    if spec.get("language") not in PROGRAM_CHECKER_LANGUAGES or not isinstance(spec.get("source"), str):
+        raise ValueError(f"Checker dạng chương trình cần 'language' ({', '.join(PROGRAM_CHECKER_LANGUAGES)}) "
+                         f"và 'source' (mã nguồn).")
+
+
+def checker_factory(spec: Optional[Any],
+                    run_program: Optional[ProgramRunner] = None) -> Callable[[Expected, Dict[str, Any]], OutputChecker]:
+    """
+    Từ cấu hình `checker` của bài tập, trả về hàm tạo bộ so sánh từ (expected output, test case).
+    Với checker dạng chương trình, `run_program` chạy chương trình checker đã biên dịch (xem judge_backend).
+    Ném ValueError nếu cấu hình không hợp lệ.
+    """
+    if spec is None:
+        spec = DEFAULT_CHECKER
+    if isinstance(spec, str):
+        spec = {"type": spec}
+    if not isinstance(spec, dict) or spec.get("type") not in CHECKERS:
+        raise ValueError(f"Checker không hợp lệ: {spec!r}. Hỗ trợ: {', '.join(CHECKERS)}")
+
+    checker_type = spec["type"]
+    if checker_type == "program":
+        validate_program_checker(spec)
+        if run_program is None:
+            raise ValueError("Checker dạng chương trình cần được biên dịch trước khi chấm.")
+        return lambda expected, test_case: ProgramChecker(lambda actual_path: run_program(test_case, actual_path))
+    if checker_type == "float":
+        tolerance = float(spec.get("tolerance", DEFAULT_FLOAT_TOLERANCE))
+        return lambda expected, test_case=None: FloatChecker(expected, tolerance)
+    checker_class = CHECKERS[checker_type]
+    return lambda expected, test_case=None: checker_class(expected)
@@ -0,0 +1,152 @@
+# grader/compile_cache.py
+"""
+Cache bản biên dịch theo nội dung (content-addressed) cho máy chấm backend.
+
+Khóa của một bản biên dịch = sha256(ngôn ngữ + lệnh/cờ biên dịch + dấu vết trình biên dịch + mã nguồn).
+Mỗi bản biên dịch là một thư mục `<khóa>/` trong thư mục cache (file thực thi C++ hoặc các file .class Java),
+kèm file đánh dấu `.complete` chứa kích thước thư mục. Thư mục được dựng ở chỗ tạm rồi đổi tên nguyên tử,
+nên nhiều worker chấm bài có thể dùng chung một thư mục cache.
+Khi tổng dung lượng vượt giới hạn, các bản biên dịch ít được dùng gần đây nhất (theo mtime của `.complete`)
+bị xóa trước.
+"""
+import os
+import uuid
+import time
+import shutil
+import hashlib
+import pathlib
+import threading
+from typing import List, Optional, Any, Dict, Callable
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+COMPILE_CACHE_DIR = pathlib.Path(os.getenv("GRADER_COMPILE_CACHE_DIR", str(PROJECT_ROOT / ".grader_cache" / "compiled")))
+# Dung lượng tối đa của cache (byte); đặt 0 để tắt cache
+COMPILE_CACHE_MAX_BYTES = int(os.getenv("GRADER_COMPILE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+# Bản biên dịch vừa được dùng trong khoảng này (giây) không bị xóa, vì có thể đang được chạy ở worker khác
+EVICTION_GRACE_SECONDS = 300
+
+_COMPLETE_MARKER = ".complete"
+
+
+def _directory_size(path: pathlib.Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def toolchain_fingerprint(executable: str) -> str:
+    """Dấu vết của trình biên dịch (đường dẫn + kích thước + mtime), đổi khi trình biên dịch được cập nhật."""
+    resolved = shutil.which(executable) or executable
+    try:
+        stat = os.stat(resolved)
+        return f"{resolved}:{stat.st_size}:{stat.st_mtime_ns}"
+    except OSError:
+        return resolved
+
+
+class CompileCache:
+    """Cache LRU trên đĩa cho các bản biên dịch, an toàn khi dùng từ nhiều thread và nhiều tiến trình."""
+
+    def __init__(self, root: pathlib.Path = COMPILE_CACHE_DIR, max_bytes: int = COMPILE_CACHE_MAX_BYTES):
+        self.root = pathlib.Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    @staticmethod
+    def key(language: str, source: bytes, flags: List[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(language.encode("utf-8") + b"\0")
+        for flag in flags:
+            digest.update(flag.encode("utf-8") + b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> Optional[pathlib.Path]:
+        """Trả về thư mục bản biên dịch nếu đã có trong cache (và đánh dấu vừa được dùng)."""
+        entry = self.root / key
+        marker = entry / _COMPLETE_MARKER
+        try:
+            os.utime(marker)
+        except OSError:
+            return None
+        return entry
+
+    def get_or_build(self, key: str, build: Callable[[pathlib.Path], None]) -> pathlib.Path:
+        """
+        Trả về thư mục bản biên dịch của `key`; nếu chưa có thì gọi `build(thư_mục_đích)` để biên dịch.
+        Lỗi của `build` (ví dụ CompilationError) được ném lại và không có gì được lưu vào cache.
+        """
+        entry = self.lookup(key)
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            return entry
+        with self._lock:
+            self.misses += 1
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = self.root / f".{key}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+        staging.mkdir()
+        try:
+            build(staging)
+            (staging / _COMPLETE_MARKER).write_text(str(_directory_size(staging)))
+            try:
+                os.rename(staging, self.root / key)
+            except OSError:
+                # Một thread/worker khác vừa lưu cùng khóa: dùng bản đó
+                if self.lookup(key) is None:
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        self._evict()
+        return self.root / key
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for entry in self.root.iterdir():
+            marker = entry / _COMPLETE_MARKER
+            try:
+                size = int(marker.read_text() or 0)
+                last_used = marker.stat().st_mtime
+            except (OSError, ValueError):
+                continue
+            entries.append((last_used, size, entry))
+            total += size
+        if total <= self.max_bytes:
+            return
+
+        now = time.time()
+        for last_used, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if now - last_used < EVICTION_GRACE_SECONDS:
+                break
+            # Đổi tên trước khi xóa để không ai nhìn thấy một bản biên dịch bị xóa dở
+            doomed = self.root / f".{entry.name}.{uuid.uuid4().hex[:8]}.evicted"
+            try:
+                os.rename(entry, doomed)
+            except OSError:
+                continue
+            shutil.rmtree(doomed, ignore_errors=True)
+            total -= size
+            with self._lock:
+                self.evictions += 1
@@ -1,16 +1,26 @@
-import zipfile
 import os
-import shutil
 import time
 import json
 import sys
 import argparse
-from pathlib import Path
-from typing import List, Dict, Any
-import uuid
+from typing import List, Dict, Any, Optional, Callable, Coroutine, AsyncIterator, Tuple
+import asyncio
+import contextlib
+import threading
+import concurrent.futures
+from urllib.parse import quote, urlsplit
 
-from playwright.sync_api import sync_playwright, Page, Dialog, Error, \
-    TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Page, Dialog, BrowserContext, Route, Error, TimeoutError as PlaywrightTimeoutError
+
+try:
+    from grader.browser_pool import BrowserPool, get_browser_pool, shutdown_browser_pool
+    from grader.submission_bundle import SubmissionBundle
+except ImportError:  # Chạy trực tiếp dạng script
+    from browser_pool import BrowserPool, get_browser_pool, shutdown_browser_pool
+    from submission_bundle import SubmissionBundle
+
+# Số trang (phiên test case độc lập) chạy song song tối đa trong một bài nộp
+MAX_PARALLEL_PAGES = int(os.getenv("GRADER_FRONTEND_PARALLEL_PAGES", "4"))
 
 # <<< CẢI TIẾN >>>: Thêm thư viện cssutils để chuẩn hóa giá trị CSS tốt hơn trong tương lai (hiện tại chỉ dùng cho màu)
 # Bạn có thể cần cài đặt: pip install cssutils
@@ -25,19 +35,17 @@ except ImportError:
 
 
 class SubmissionResultData:
-    def __init__(self, test: str, result: str):
+    def __init__(self, test: str, result: str, waits: Optional[List[Dict[str, Any]]] = None):
         self.test = test
         self.result = result
+        # Thời gian chờ thực tế của từng bước chờ trong test case (xem WaitTracker)
+        self.waits = waits
 
     def to_dict(self):
-        return self.__dict__
-
-
-def unzip_submission(zip_path: str, target_dir: str):
-    os.makedirs(target_dir, exist_ok=True)
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(target_dir)
-    print(f"[GraderScript] Đã giải nén {zip_path} sang {target_dir}")
+        data = {"test": self.test, "result": self.result}
+        if self.waits is not None:
+            data["waits"] = self.waits
+        return data
 
 
 # <<< CẢI TIẾN >>>: Mở rộng đáng kể hàm chuẩn hóa màu sắc
@@ -77,8 +85,107 @@ def _normalize_color(color_string: str) -> str:
     return processed_string.replace(" ", "")
 
 
+# === PHỤC VỤ BÀI NỘP TỪ BỘ NHỚ ===
+# Origin giả để trình duyệt tải bài nộp: mọi request tới origin này được trả từ ZIP trong bộ nhớ
+SUBMISSION_ORIGIN = "http://submission.grader"
+# Cho phép bài nộp tải tài nguyên bên ngoài (CDN...); mặc định chặn để việc tải trang nhanh và ổn định
+ALLOW_EXTERNAL_REQUESTS = os.getenv("GRADER_FRONTEND_ALLOW_NETWORK", "0") == "1"
+# Loại tài nguyên không ảnh hưởng tới DOM/CSS được kiểm tra nên không cần tải
+BLOCKED_RESOURCE_TYPES = frozenset(
+    filter(None, os.getenv("GRADER_FRONTEND_BLOCKED_RESOURCES", "media,font,websocket,eventsource,manifest").split(",")))
+
+
+async def _serve_submission(route: Route, bundle: SubmissionBundle):
+    """Trả file của bài nộp cho request tới SUBMISSION_ORIGIN, chặn các request khác (trừ khi được cho phép)."""
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort("blockedbyclient")
+        return
+    url = urlsplit(request.url)
+    if f"{url.scheme}://{url.netloc}" == SUBMISSION_ORIGIN:
+        resolved = bundle.resolve(url.path)
+        if resolved is None:
+            await route.fulfill(status=404, content_type="text/plain", body="Not Found")
+        else:
+            body, content_type = resolved
+            await route.fulfill(status=200, content_type=content_type, body=body)
+    elif ALLOW_EXTERNAL_REQUESTS:
+        await route.continue_()
+    else:
+        await route.abort("blockedbyclient")
+
+
+# === CHỜ THEO SỰ KIỆN ===
+# Thời gian chờ tối đa mặc định (ms); test case có trường `timeout` (ms) thì dùng giá trị đó cho mọi bước chờ
+ACTION_TIMEOUT_MS = 5000      # click/fill/hover và chờ trang tải lại
+SETTLE_TIMEOUT_MS = 1000      # chờ DOM ổn định sau mỗi hành động
+DIALOG_TIMEOUT_MS = 1000      # chờ alert/confirm/prompt xuất hiện
+HIDDEN_TIMEOUT_MS = 2000      # chờ phần tử biến mất (element_does_not_exist)
+PAGE_LOAD_TIMEOUT_MS = 15000  # tải trang lần đầu
+# DOM không thay đổi trong khoảng này (ms) thì coi là đã ổn định
+DOM_QUIET_MS = int(os.getenv("GRADER_FRONTEND_DOM_QUIET_MS", "100"))
+
+# Resolve true khi DOM không thay đổi trong quietMs, false nếu vẫn còn thay đổi sau timeoutMs
+_DOM_SETTLE_SCRIPT = """
+([quietMs, timeoutMs]) => new Promise((resolve) => {
+    let quietTimer = null;
+    let limitTimer = null;
+    const finish = (settled) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(limitTimer);
+        resolve(settled);
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    limitTimer = setTimeout(() => finish(false), timeoutMs);
+})
+"""
+
+
+class WaitTracker:
+    """Thời gian chờ tối đa của các bước chờ trong một test case và thời gian chờ thực tế của từng bước."""
+
+    def __init__(self, timeout_ms: Optional[int] = None):
+        self.action = timeout_ms or ACTION_TIMEOUT_MS
+        self.settle = timeout_ms or SETTLE_TIMEOUT_MS
+        self.dialog = timeout_ms or DIALOG_TIMEOUT_MS
+        self.hidden = timeout_ms or HIDDEN_TIMEOUT_MS
+        self.page_load = timeout_ms or PAGE_LOAD_TIMEOUT_MS
+        self.waits: List[Dict[str, Any]] = []
+
+    def record(self, kind: str, started: float, ok: bool = True):
+        self.waits.append({"wait": kind, "ms": round((time.perf_counter() - started) * 1000, 1), "ok": ok})
+
+
+async def _wait_for_load(page: Page, tracker: WaitTracker):
+    started = time.perf_counter()
+    try:
+        await page.wait_for_load_state("load", timeout=tracker.action)
+        tracker.record("load", started)
+    except PlaywrightTimeoutError:
+        tracker.record("load", started, ok=False)
+
+
+async def _wait_for_dom_settle(page: Page, tracker: WaitTracker):
+    """Chờ DOM ngừng thay đổi sau một hành động (thay cho việc ngủ cố định)."""
+    started = time.perf_counter()
+    try:
+        settled = await page.evaluate(_DOM_SETTLE_SCRIPT, [DOM_QUIET_MS, tracker.settle])
+    except Error:
+        # Hành động làm trang chuyển hướng (submit form, click link...): chờ trang mới tải xong
+        tracker.record("dom_settle", started, ok=False)
+        await _wait_for_load(page, tracker)
+        return
+    tracker.record("dom_settle", started, ok=bool(settled))
+
+
 # <<< CẢI TIẾN >>>: Mở rộng trigger với 'hover', 'submit', 'refresh'
-def _execute_trigger_actions(page: Page, trigger_string: str):
+async def _execute_trigger_actions(page: Page, trigger_string: str, tracker: WaitTracker):
     """
     Phân tích và thực thi một chuỗi các hành động trigger.
     Hỗ trợ: 'click:selector', 'input:selector=value', 'hover:selector', 'submit:selector', 'refresh'
@@ -93,7 +200,7 @@ def _execute_trigger_actions(page: Page, trigger_string: str):
         if action_str.startswith("click:"):
             selector = action_str.split("click:", 1)[1].strip()
             if not selector: raise ValueError("Selector trong trigger 'click' không được rỗng.")
-            page.click(selector, timeout=5000)
+            await page.click(selector, timeout=tracker.action)
 
         elif action_str.startswith("input:"):
             try:
@@ -101,222 +208,546 @@ def _execute_trigger_actions(page: Page, trigger_string: str):
                 selector = parts[0].split("input:", 1)[1].strip()
                 value_to_fill = parts[1]
                 if not selector: raise ValueError("Selector trong trigger 'input' không được rỗng.")
-                page.fill(selector, value_to_fill, timeout=5000)
+                await page.fill(selector, value_to_fill, timeout=tracker.action)
             except (IndexError, ValueError) as e:
                 raise ValueError(f"Định dạng trigger 'input' không hợp lệ: '{action_str}'. Lỗi: {e}")
 
         elif action_str.startswith("hover:"):  # Mới
             selector = action_str.split("hover:", 1)[1].strip()
             if not selector: raise ValueError("Selector trong trigger 'hover' không được rỗng.")
-            page.hover(selector, timeout=5000)
+            await page.hover(selector, timeout=tracker.action)
 
         elif action_str.startswith("submit:"):  # Mới
             selector = action_str.split("submit:", 1)[1].strip()
             if not selector: raise ValueError("Selector trong trigger 'submit' không được rỗng.")
-            page.eval_on_selector(selector, "form => form.submit()")
+            # Nếu form chuyển trang, bước chờ DOM ổn định bên dưới sẽ chờ trang mới tải xong
+            await page.eval_on_selector(selector, "form => form.submit()")
 
         elif action_str == "refresh":  # Mới
-            page.reload(wait_until="networkidle")
+            # Trang được phục vụ từ bộ nhớ: sự kiện load là đủ, không cần chờ networkidle
+            started = time.perf_counter()
+            await page.reload(wait_until="load", timeout=tracker.action)
+            tracker.record("load", started)
 
         else:
             raise ValueError(f"Hành động trigger không được hỗ trợ: '{action_str}'")
 
-        page.wait_for_timeout(300)  # Đợi một chút để UI cập nhật
+        await _wait_for_dom_settle(page, tracker)  # Chờ UI cập nhật xong
+
+
+# === CHỤP TRẠNG THÁI DOM ===
+# Loại test case chỉ đọc DOM/URL: các test case loại này không có trigger cùng nhìn thấy một trạng thái trang
+READ_ONLY_TYPES = frozenset({"element_exists", "text_equals", "attribute_equals", "url_contains"})
+CSS_PROPERTIES = ["color", "font-family", "font-size", "display", "visibility", "opacity", "width", "position",
+                  "bottom", "border-radius", "box-shadow", "padding", "margin", "text-align", "justify-content",
+                  "align-items", "grid-template-columns", "transition-property", "transition-duration"]
+
+# Mỗi selector -> {visible, text, attributes, styles} của phần tử đầu tiên khớp selector.
+# Selector không phải CSS thuần (cú pháp riêng của Playwright) hoặc không khớp phần tử nào thì bị bỏ qua,
+# test case tương ứng được kiểm tra bằng các lệnh Playwright như bình thường.
+# Cách xét "hiển thị" giống Playwright: visibility visible và kích thước khác 0 (display: contents xét các con).
+_DOM_SNAPSHOT_SCRIPT = """
+(probes) => {
+    const isVisible = (node) => {
+        if (node.nodeType === Node.TEXT_NODE) {
+            const range = document.createRange();
+            range.selectNode(node);
+            const rect = range.getBoundingClientRect();
+            return rect.width > 0 && rect.height > 0;
+        }
+        if (node.nodeType !== Node.ELEMENT_NODE) {
+            return false;
+        }
+        const style = window.getComputedStyle(node);
+        if (style.display === 'contents') {
+            return Array.from(node.childNodes).some(isVisible);
+        }
+        if (typeof node.checkVisibility === 'function' && !node.checkVisibility()) {
+            return false;
+        }
+        if (style.visibility !== 'visible') {
+            return false;
+        }
+        const rect = node.getBoundingClientRect();
+        return rect.width > 0 && rect.height > 0;
+    };
+    const snapshot = {};
+    for (const probe of probes) {
+        let element = null;
+        try {
+            element = document.querySelector(probe.selector);
+        } catch (e) {
+            continue;
+        }
+        if (!element) {
+            continue;
+        }
+        const style = window.getComputedStyle(element);
+        snapshot[probe.selector] = {
+            visible: isVisible(element),
+            text: element.textContent,
+            attributes: Object.fromEntries(probe.attributes.map((name) => [name, element.getAttribute(name)])),
+            styles: Object.fromEntries(probe.styles.map((name) => [name, style.getPropertyValue(name)])),
+        };
+    }
+    return snapshot;
+}
+"""
+
+
+def _css_property(attribute_name: str) -> Optional[str]:
+    """Thuộc tính CSS (computed style) cần đọc cho attribute_equals; None nếu là thuộc tính HTML thông thường."""
+    prop_to_query = attribute_name.lower()
+    if prop_to_query == 'background':
+        prop_to_query = 'background-color'
+    if "-" in prop_to_query or prop_to_query in CSS_PROPERTIES:
+        return prop_to_query
+    return None
+
+
+async def _take_dom_snapshot(page: Page, testcases: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Đọc mọi thông tin DOM mà các test case cần (hiển thị, text, thuộc tính, computed style) trong một lần evaluate,
+    thay vì một round-trip Playwright cho mỗi lần đọc. Trả về {} nếu không có gì cần đọc hoặc không đọc được.
+    """
+    probes: Dict[str, Dict[str, List[str]]] = {}
+    for tc_data in testcases:
+        selector = tc_data.get('selector')
+        tc_type = tc_data.get('type')
+        if not selector or tc_type not in ("element_exists", "text_equals", "attribute_equals"):
+            continue
+        probe = probes.setdefault(selector, {"selector": selector, "attributes": [], "styles": []})
+        attribute_name = tc_data.get('attributeName')
+        if tc_type == "attribute_equals" and attribute_name:
+            css_property = _css_property(attribute_name)
+            target, name = (probe["styles"], css_property) if css_property else (probe["attributes"], attribute_name)
+            if name not in target:
+                target.append(name)
+    if not probes:
+        return {}
+    try:
+        return await page.evaluate(_DOM_SNAPSHOT_SCRIPT, list(probes.values()))
+    except Error as e:
+        print(f"[GraderScript]     Không chụp được trạng thái DOM, kiểm tra từng phần tử: {e}")
+        return {}
+
+
+async def _run_testcase(page: Page, tc_data: Dict[str, Any], tracker: WaitTracker,
+                        snapshot: Optional[Dict[str, Dict[str, Any]]] = None) -> SubmissionResultData:
+    """
+    Chạy trigger (nếu có) rồi kiểm tra một test case trên trang đã tải.
+    snapshot: trạng thái DOM đã chụp sẵn cho trang hiện tại (test case không có trigger); nếu không có thì
+    chụp sau khi chạy trigger.
+    """
+    tc_name = tc_data.get('name', f"Test Case Vô Danh {tc_data.get('id', '')}")
+    tc_type = tc_data.get('type', 'unknown')
+    tc_selector = tc_data.get('selector')
+    tc_expected = tc_data.get('expected')
+    tc_trigger = tc_data.get('trigger')
+    tc_attribute_name = tc_data.get('attributeName')
+
+    print(f"[GraderScript]   Đang chạy test case: '{tc_name}' (Loại: {tc_type})")
+
+    try:
+        # 1. THỰC THI TRIGGER (TRỪ js_alert sẽ xử lý riêng)
+        if tc_type != "js_alert":
+            await _execute_trigger_actions(page, tc_trigger, tracker)
+
+        # 2. CHỤP TRẠNG THÁI DOM (một lần evaluate); phần tử không có trong snapshot được đọc bằng Playwright
+        if snapshot is None:
+            snapshot = await _take_dom_snapshot(page, [tc_data])
+        element_snapshot = snapshot.get(tc_selector) if tc_selector else None
+
+        # 3. THỰC HIỆN KIỂM TRA
+        if tc_type == "element_exists":
+            if not tc_selector: raise ValueError("Selector là bắt buộc")
+            if element_snapshot is not None:
+                visible = element_snapshot["visible"]
+            else:
+                element = await page.query_selector(tc_selector)
+                visible = bool(element and await element.is_visible())
+            if visible:
+                return SubmissionResultData(test=tc_name, result="✅ Passed")
+            return SubmissionResultData(test=tc_name,
+                                        result=f"❌ Failed (Phần tử '{tc_selector}' không tồn tại hoặc không hiển thị)")
+
+        elif tc_type == "text_equals":
+            if not tc_selector: raise ValueError("Selector là bắt buộc")
+            if tc_expected is None: raise ValueError("Expected text là bắt buộc")
+            if element_snapshot is not None:
+                actual_text = (element_snapshot["text"] or "").strip()
+            else:
+                element = await page.query_selector(tc_selector)
+                actual_text = (await element.text_content()).strip() if element else ""
+            expected_text = str(tc_expected).strip()
+            if actual_text == expected_text:
+                return SubmissionResultData(test=tc_name, result="✅ Passed")
+            return SubmissionResultData(test=tc_name,
+                                        result=f"❌ Failed (Mong đợi text '{expected_text}', nhận được '{actual_text}')")
+
+        elif tc_type == "attribute_equals":
+            if not tc_selector: raise ValueError("Selector là bắt buộc")
+            if not tc_attribute_name: raise ValueError("AttributeName là bắt buộc")
+            if tc_expected is None: raise ValueError("Expected value là bắt buộc")
+
+            locator = page.locator(tc_selector).first
+
+            # 💡 Cải tiến cốt lõi nằm ở đây
+            prop_to_query = _css_property(tc_attribute_name)
+            if tc_attribute_name.lower() == 'background':
+                print("[GraderScript]     Phát hiện 'background', tự động chuyển sang kiểm tra 'background-color'.")
+
+            # Xử lý các thuộc tính CSS
+            if prop_to_query is not None:
+                if element_snapshot is not None:
+                    actual_value = element_snapshot["styles"][prop_to_query]
+                else:
+                    actual_value = await locator.evaluate(
+                        f"el => window.getComputedStyle(el).getPropertyValue('{prop_to_query}')")
+                expected_to_compare = str(tc_expected)
+
+                if "color" in prop_to_query or "background" in prop_to_query:
+                    actual_value = _normalize_color(actual_value)
+                    expected_to_compare = _normalize_color(expected_to_compare)
+                else:
+                    actual_value = actual_value.strip().replace('"', '')
+                    expected_to_compare = expected_to_compare.strip().replace('"', '')
+
+            # Xử lý các thuộc tính HTML thông thường
+            else:
+                if element_snapshot is not None:
+                    actual_value = element_snapshot["attributes"][tc_attribute_name] or ""
+                else:
+                    actual_value = await locator.get_attribute(tc_attribute_name) or ""
+                expected_to_compare = str(tc_expected)
+                if tc_attribute_name == 'disabled':
+                    actual_value = "true" if actual_value is not None else "false"
+
+            if actual_value == expected_to_compare:
+                return SubmissionResultData(test=tc_name, result="✅ Passed")
+            # Sử dụng tc_attribute_name gốc để hiển thị lỗi cho người dùng
+            return SubmissionResultData(test=tc_name,
+                                        result=f"❌ Failed (Thuộc tính '{tc_attribute_name}': mong đợi '{expected_to_compare}', nhận được '{actual_value}')")
+
+        # <<< CẢI TIẾN >>>: Đổi tên thành element_does_not_exist cho rõ ràng
+        elif tc_type == "element_does_not_exist" or tc_type == "element_not_exists":
+            if not tc_selector: raise ValueError("Selector là bắt buộc")
+            started = time.perf_counter()
+            try:
+                # Chờ cho phần tử biến mất hoặc bị ẩn đi, timeout ngắn
+                await page.locator(tc_selector).wait_for(state='hidden', timeout=tracker.hidden)
+                tracker.record("hidden", started)
+                return SubmissionResultData(test=tc_name, result="✅ Passed")
+            except PlaywrightTimeoutError:
+                tracker.record("hidden", started, ok=False)
+                return SubmissionResultData(test=tc_name,
+                                            result=f"❌ Failed (Phần tử '{tc_selector}' vẫn tồn tại/hiển thị)")
+
+        elif tc_type == "url_contains":
+            if tc_expected is None: raise ValueError("Expected URL substring là bắt buộc")
+            if str(tc_expected) in page.url:
+                return SubmissionResultData(test=tc_name, result="✅ Passed")
+            return SubmissionResultData(test=tc_name,
+                                        result=f"❌ Failed (URL mong đợi chứa '{tc_expected}', nhưng URL hiện tại là '{page.url}')")
+
+        # <<< CẢI TIẾN >>>: Logic js_alert được viết lại hoàn toàn, an toàn và chính xác
+        elif tc_type == "js_alert":
+            if tc_expected is None: raise ValueError("Expected alert text là bắt buộc")
+
+            dialog_message: asyncio.Future = asyncio.get_running_loop().create_future()
+
+            async def handle_dialog(dialog: Dialog):
+                print(f"[GraderScript]     Bắt được dialog với message: '{dialog.message}'")
+                if not dialog_message.done():
+                    dialog_message.set_result(dialog.message)
+                await dialog.dismiss()
+
+            # 1. Gắn trình nghe sự kiện TRƯỚC khi thực hiện hành động
+            page.once("dialog", handle_dialog)
+
+            # 2. Thực thi trigger
+            await _execute_trigger_actions(page, tc_trigger, tracker)
+
+            # 3. Chờ sự kiện dialog (kết thúc ngay khi dialog xuất hiện, tối đa tracker.dialog ms)
+            started = time.perf_counter()
+            try:
+                alert_message = await asyncio.wait_for(asyncio.shield(dialog_message), tracker.dialog / 1000)
+                tracker.record("dialog", started)
+            except asyncio.TimeoutError:
+                alert_message = None
+                tracker.record("dialog", started, ok=False)
+
+            if alert_message is not None and alert_message.strip() == str(tc_expected).strip():
+                return SubmissionResultData(test=tc_name, result="✅ Passed")
+            return SubmissionResultData(test=tc_name,
+                                        result=f"❌ Failed (Mong đợi alert '{tc_expected}', nhận được '{alert_message}')")
+
+        return SubmissionResultData(test=tc_name, result=f"⚠️ Skipped (Loại test không xác định: {tc_type})")
+
+    except (Error, ValueError, Exception) as e:
+        error_detail = f"{type(e).__name__}: {str(e)}"
+        return SubmissionResultData(test=tc_name, result=f"❌ Error: {error_detail}")
 
 
-def run_grading_logic(exercise_data: Dict[str, Any], index_path: Path) -> List[Dict[str, Any]]:
-    results_list: List[SubmissionResultData] = []
-    print(f"[GraderScript] Bắt đầu Playwright ĐỒNG BỘ để chấm điểm {index_path.resolve()}")
+def _split_into_sessions(testcases: List[Dict[str, Any]]) -> List[List[int]]:
+    """
+    Chia test case (theo chỉ số) thành các phiên độc lập, mỗi phiên chạy trên một trang mới tải:
+    test case không có trigger được kiểm tra trên trang vừa tải (tương đương tải lại trang trước khi kiểm tra
+    như cách chạy tuần tự cũ). Các test case loại chỉ đọc (READ_ONLY_TYPES) liền nhau dùng chung một phiên
+    và một lần chụp DOM; các loại khác (chờ phần tử biến mất, chờ alert) đứng riêng.
+    Các test case có trigger liên tiếp nhau tạo thành một chuỗi chạy tuần tự trên cùng trang
+    vì mỗi bước phụ thuộc trạng thái mà bước trước để lại.
+    Các phiên giữ đúng thứ tự của test case (cần khi phải chạy lại tuần tự, xem run_grading_logic).
+    """
+    sessions: List[List[int]] = []
+    read_only: List[int] = []
+    chain: List[int] = []
+    for index, tc_data in enumerate(testcases):
+        if tc_data.get('trigger'):
+            read_only = []
+            chain.append(index)
+            continue
+        if chain:
+            sessions.append(chain)
+            chain = []
+        if tc_data.get('type') in READ_ONLY_TYPES:
+            if not read_only:
+                sessions.append(read_only)
+            read_only.append(index)
+        else:
+            read_only = []
+            sessions.append([index])
+    if chain:
+        sessions.append(chain)
+    return sessions
+
+
+@contextlib.asynccontextmanager
+async def _submission_context(pool: BrowserPool, bundle: SubmissionBundle) -> AsyncIterator[BrowserContext]:
+    """BrowserContext mới (storage riêng) phục vụ bài nộp từ bộ nhớ; service worker không đi qua routing nên bị chặn."""
+    async with pool.context(service_workers="block") as context:
+        await context.route("**/*", lambda route: _serve_submission(route, bundle))
+        yield context
+
+
+async def _has_stored_state(context: BrowserContext) -> bool:
+    """Trang đã để lại dữ liệu lưu trữ (cookie, localStorage, IndexedDB) mà phiên sau trong cùng context sẽ thấy."""
+    state = await context.storage_state(indexed_db=True)
+    return bool(state.get("cookies")) or any(origin.get("localStorage") or origin.get("indexedDB")
+                                             for origin in state.get("origins", []))
+
+
+async def run_grading_logic(exercise_data: Dict[str, Any], bundle: SubmissionBundle, entry: str,
+                            on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    initial_url = f"{SUBMISSION_ORIGIN}/{quote(entry)}"
+    print(f"[GraderScript] Bắt đầu Playwright (async) để chấm điểm {initial_url}")
+    testcases = exercise_data.get("frontend_testcases", exercise_data.get("testcases", []))
+    if not testcases:
+        return [SubmissionResultData(test="Setup", result="⚠️ Không có test case nào được định nghĩa.").to_dict()]
+
+    results: List[Optional[SubmissionResultData]] = [None] * len(testcases)
+    # Giới hạn số trang mở đồng thời của một bài nộp
+    page_slots = asyncio.Semaphore(MAX_PARALLEL_PAGES)
+
+    def report(index: int, result: SubmissionResultData):
+        results[index] = result
+        # Báo kết quả của test case vừa chấm xong (dùng để stream kết quả cho client)
+        if on_result is not None:
+            on_result(index, result.to_dict())
+
+    async def run_session(context: BrowserContext, indexes: List[int]) -> List[Tuple[int, SubmissionResultData]]:
+        """Chạy một phiên trên trang mới của `context`, trả về kết quả (chỉ số, kết quả) theo thứ tự."""
+        session_results: List[Tuple[int, SubmissionResultData]] = []
+        page = await context.new_page()
+        # Thời gian tải trang được tính vào test case đầu tiên của phiên
+        tracker = WaitTracker(testcases[indexes[0]].get('timeout'))
+        try:
+            try:
+                # Trang được phục vụ từ bộ nhớ, request ra ngoài bị chặn: chờ sự kiện load rồi chờ DOM ổn định
+                started = time.perf_counter()
+                await page.goto(initial_url, wait_until="load", timeout=tracker.page_load)
+                tracker.record("load", started)
+                await _wait_for_dom_settle(page, tracker)
+            except Exception as e:
+                for index in indexes:
+                    tc_name = testcases[index].get('name', f"Test Case Vô Danh {testcases[index].get('id', '')}")
+                    session_results.append((index, SubmissionResultData(
+                        test=tc_name, result=f"❌ Error: Không tải được trang - {type(e).__name__}: {e}")))
+                return session_results
+            # Phiên không có trigger: trạng thái trang không đổi, chụp DOM một lần cho mọi test case của phiên
+            snapshot = None
+            if not testcases[indexes[0]].get('trigger'):
+                snapshot = await _take_dom_snapshot(page, [testcases[index] for index in indexes])
+            for position, index in enumerate(indexes):
+                if position > 0:
+                    tracker = WaitTracker(testcases[index].get('timeout'))
+                result = await _run_testcase(page, testcases[index], tracker, snapshot)
+                result.waits = tracker.waits
+                session_results.append((index, result))
+            return session_results
+        finally:
+            await page.close()
+
+    async def run_sequential(pool: BrowserPool, sessions: List[List[int]], skip_first: bool = False):
+        # Như cách chạy tuần tự cũ: mọi phiên dùng chung một context, phiên sau thấy storage mà phiên trước để lại
+        async with _submission_context(pool, bundle) as context:
+            for position, indexes in enumerate(sessions):
+                session_results = await run_session(context, indexes)
+                if not (skip_first and position == 0):
+                    for index, result in session_results:
+                        report(index, result)
+
+    async def run_isolated(pool: BrowserPool, indexes: List[int]) -> Tuple[List[Tuple[int, SubmissionResultData]], bool]:
+        async with page_slots, _submission_context(pool, bundle) as context:
+            session_results = await run_session(context, indexes)
+            return session_results, await _has_stored_state(context)
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
-
-            # <<< CẢI TIẾN >>>: Tải trang một lần duy nhất ở đầu
-            initial_url = f"file://{index_path.resolve()}"
-            page.goto(initial_url)
-            page.wait_for_load_state('networkidle', timeout=15000)
-            print(f"[GraderScript] Trang đã được tải lần đầu: {page.url}")
-
-            testcases = exercise_data.get("frontend_testcases", exercise_data.get("testcases", []))
-            exercise_id = exercise_data.get("id", "N/A")
-
-            if not testcases:
-                results_list.append(
-                    SubmissionResultData(test="Setup", result="⚠️ Không có test case nào được định nghĩa."))
-
-            for tc_data in testcases:
-                tc_name = tc_data.get('name', f"Test Case Vô Danh {tc_data.get('id', '')}")
-                tc_type = tc_data.get('type', 'unknown')
-                tc_selector = tc_data.get('selector')
-                tc_expected = tc_data.get('expected')
-                tc_trigger = tc_data.get('trigger')
-                tc_attribute_name = tc_data.get('attributeName')
-
-                print(f"[GraderScript]   Đang chạy test case: '{tc_name}' (Loại: {tc_type})")
-
-                try:
-                    # <<< CẢI TIẾN QUẢN LÝ TRẠNG THÁI >>>
-                    # Chỉ tải lại trang nếu test case không có trigger,
-                    # để đảm bảo trạng thái được giữ nguyên cho các test case có tương tác.
-                    if not tc_trigger:
-                        print(f"[GraderScript]     Reset trạng thái trang (tải lại) cho test case không có trigger.")
-                        page.reload(wait_until="networkidle")
-                        page.wait_for_timeout(200)  # Đợi thêm chút cho ổn định
-
-                    # 1. THỰC THI TRIGGER (TRỪ js_alert sẽ xử lý riêng)
-                    if tc_type != "js_alert":
-                        _execute_trigger_actions(page, tc_trigger)
-
-                    # 2. THỰC HIỆN KIỂM TRA
-                    if tc_type == "element_exists":
-                        if not tc_selector: raise ValueError("Selector là bắt buộc")
-                        element = page.query_selector(tc_selector)
-                        if element and element.is_visible():
-                            results_list.append(SubmissionResultData(test=tc_name, result="✅ Passed"))
-                        else:
-                            results_list.append(SubmissionResultData(test=tc_name,
-                                                                     result=f"❌ Failed (Phần tử '{tc_selector}' không tồn tại hoặc không hiển thị)"))
-
-                    elif tc_type == "text_equals":
-                        if not tc_selector: raise ValueError("Selector là bắt buộc")
-                        if tc_expected is None: raise ValueError("Expected text là bắt buộc")
-                        element = page.query_selector(tc_selector)
-                        actual_text = element.text_content().strip() if element else ""
-                        expected_text = str(tc_expected).strip()
-                        if actual_text == expected_text:
-                            results_list.append(SubmissionResultData(test=tc_name, result="✅ Passed"))
-                        else:
-                            results_list.append(SubmissionResultData(test=tc_name,
-                                                                     result=f"❌ Failed (Mong đợi text '{expected_text}', nhận được '{actual_text}')"))
-
-                    # <<< THAY THẾ BẰNG ĐOẠN CODE NÀY >>>
-                    elif tc_type == "attribute_equals":
-                        if not tc_selector: raise ValueError("Selector là bắt buộc")
-                        if not tc_attribute_name: raise ValueError("AttributeName là bắt buộc")
-                        if tc_expected is None: raise ValueError("Expected value là bắt buộc")
-
-                        locator = page.locator(tc_selector).first
-
-                        # 💡 Cải tiến cốt lõi nằm ở đây
-                        prop_to_query = tc_attribute_name.lower()
-                        if prop_to_query == 'background':
-                            print(
-                                "[GraderScript]     Phát hiện 'background', tự động chuyển sang kiểm tra 'background-color'.")
-                            prop_to_query = 'background-color'
-
-                        # Xử lý các thuộc tính CSS
-                        if "-" in prop_to_query or prop_to_query in ["color", "font-family", "font-size", "display",
-                                                                     "visibility", "opacity", "width", "position",
-                                                                     "bottom", "border-radius", "box-shadow", "padding",
-                                                                     "margin", "text-align", "justify-content",
-                                                                     "align-items", "grid-template-columns",
-                                                                     "transition-property", "transition-duration"]:
-                            actual_value = locator.evaluate(
-                                f"el => window.getComputedStyle(el).getPropertyValue('{prop_to_query}')")
-                            expected_to_compare = str(tc_expected)
-
-                            if "color" in prop_to_query or "background" in prop_to_query:
-                                actual_value = _normalize_color(actual_value)
-                                expected_to_compare = _normalize_color(expected_to_compare)
-                            else:
-                                actual_value = actual_value.strip().replace('"', '')
-                                expected_to_compare = expected_to_compare.strip().replace('"', '')
-
-                        # Xử lý các thuộc tính HTML thông thường
-                        else:
-                            actual_value = locator.get_attribute(tc_attribute_name) or ""
-                            expected_to_compare = str(tc_expected)
-                            if tc_attribute_name == 'disabled':
-                                actual_value = "true" if actual_value is not None else "false"
-
-                        if actual_value == expected_to_compare:
-                            results_list.append(SubmissionResultData(test=tc_name, result="✅ Passed"))
-                        else:
-                            # Sử dụng tc_attribute_name gốc để hiển thị lỗi cho người dùng
-                            results_list.append(SubmissionResultData(test=tc_name,
-                                                                     result=f"❌ Failed (Thuộc tính '{tc_attribute_name}': mong đợi '{expected_to_compare}', nhận được '{actual_value}')"))
-
-                    # <<< CẢI TIẾN >>>: Đổi tên thành element_does_not_exist cho rõ ràng
-                    elif tc_type == "element_does_not_exist" or tc_type == "element_not_exists":
-                        if not tc_selector: raise ValueError("Selector là bắt buộc")
-                        try:
-                            # Chờ cho phần tử biến mất hoặc bị ẩn đi, timeout ngắn
-                            page.locator(tc_selector).wait_for(state='hidden', timeout=2000)
-                            results_list.append(SubmissionResultData(test=tc_name, result="✅ Passed"))
-                        except PlaywrightTimeoutError:
-                            results_list.append(SubmissionResultData(test=tc_name,
-                                                                     result=f"❌ Failed (Phần tử '{tc_selector}' vẫn tồn tại/hiển thị)"))
-
-                    elif tc_type == "url_contains":
-                        if tc_expected is None: raise ValueError("Expected URL substring là bắt buộc")
-                        if str(tc_expected) in page.url:
-                            results_list.append(SubmissionResultData(test=tc_name, result="✅ Passed"))
-                        else:
-                            results_list.append(SubmissionResultData(test=tc_name,
-                                                                     result=f"❌ Failed (URL mong đợi chứa '{tc_expected}', nhưng URL hiện tại là '{page.url}')"))
-
-                    # <<< CẢI TIẾN >>>: Logic js_alert được viết lại hoàn toàn, an toàn và chính xác
-                    elif tc_type == "js_alert":
-                        if tc_expected is None: raise ValueError("Expected alert text là bắt buộc")
-
-                        alert_message = None
-
-                        def handle_dialog(dialog: Dialog):
-                            nonlocal alert_message
-                            alert_message = dialog.message
-                            print(f"[GraderScript]     Bắt được dialog với message: '{alert_message}'")
-                            dialog.dismiss()
-
-                        # 1. Gắn trình nghe sự kiện TRƯỚC khi thực hiện hành động
-                        page.once("dialog", handle_dialog)
-
-                        # 2. Thực thi trigger
-                        _execute_trigger_actions(page, tc_trigger)
-
-                        # 3. Đợi và kiểm tra kết quả (với timeout ngắn)
-                        page.wait_for_timeout(1000)  # Đợi 1s để dialog có thời gian xuất hiện
-
-                        if alert_message is not None and alert_message.strip() == str(tc_expected).strip():
-                            results_list.append(SubmissionResultData(test=tc_name, result="✅ Passed"))
-                        else:
-                            results_list.append(SubmissionResultData(test=tc_name,
-                                                                     result=f"❌ Failed (Mong đợi alert '{tc_expected}', nhận được '{alert_message}')"))
-
-                    else:
-                        results_list.append(SubmissionResultData(test=tc_name,
-                                                                 result=f"⚠️ Skipped (Loại test không xác định: {tc_type})"))
-
-
-                except (Error, ValueError, Exception) as e:
-
-                    error_detail = f"{type(e).__name__}: {str(e)}"
-
-                    results_list.append(SubmissionResultData(test=tc_name, result=f"❌ Error: {error_detail}"))
-
-            # <<< CẢI TIẾN >>>: Đóng browser ở cuối
-            browser.close()
+        pool = await get_browser_pool()
+        sessions = _split_into_sessions(testcases)
+        if len(sessions) == 1 or MAX_PARALLEL_PAGES <= 1:
+            await run_sequential(pool, sessions)
+        else:
+            # Chromium chạy sẵn trong pool; các phiên chạy song song, mỗi phiên một BrowserContext riêng
+            # để không thấy storage (cookie, localStorage, IndexedDB) của phiên chạy cùng lúc.
+            # Kết quả được báo theo thứ tự phiên: kết quả của một phiên chỉ chắc chắn đúng như khi chạy tuần tự
+            # nếu mọi phiên trước nó không để lại storage.
+            tasks = [asyncio.ensure_future(run_isolated(pool, indexes)) for indexes in sessions]
+            try:
+                for position, task in enumerate(tasks):
+                    session_results, stored = await task
+                    for index, result in session_results:
+                        report(index, result)
+                    if stored and position < len(sessions) - 1:
+                        # Các phiên sau có thể phụ thuộc storage này: không cô lập được, chạy lại tuần tự
+                        # (chạy lại cả phiên này, không báo lại kết quả, để tạo lại đúng storage)
+                        print(f"[GraderScript] Bài nộp lưu dữ liệu vào storage, chạy tuần tự từ phiên {position + 1}.")
+                        for pending in tasks[position + 1:]:
+                            pending.cancel()
+                        await asyncio.gather(*tasks[position + 1:], return_exceptions=True)
+                        await run_sequential(pool, sessions[position:], skip_first=True)
+                        break
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
     except Exception as outer_exception:
         error_type_name = type(outer_exception).__name__
         error_message_detail = str(outer_exception)
         full_error_msg = f"{error_type_name}: {error_message_detail}" if error_message_detail else error_type_name
         print(f"[GraderScript] Lỗi nghiêm trọng trong run_grading_logic: {full_error_msg}")
-        if not any(r.test == "Hệ thống chấm điểm" for r in results_list):
-            results_list.append(SubmissionResultData(test="Hệ thống chấm điểm",
-                                                     result=f"❌ Error: Lỗi Playwright setup - {full_error_msg}"))
+        finished = [r for r in results if r is not None]
+        return [r.to_dict() for r in finished] + [
+            SubmissionResultData(test="Hệ thống chấm điểm",
+                                 result=f"❌ Error: Lỗi Playwright setup - {full_error_msg}").to_dict()]
 
-    finally:
-        print(f"[GraderScript] Kết thúc Playwright. Số kết quả: {len(results_list)}")
+    print(f"[GraderScript] Kết thúc Playwright. Số kết quả: {len(results)}")
+    return [r.to_dict() for r in results]
+
+
+async def grade_frontend_submission_async(exercise_data: Dict[str, Any], zip_file_path: str,
+                                          on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None
+                                          ) -> List[Dict[str, Any]]:
+    """
+    Đọc bài nộp (ZIP) vào bộ nhớ và chấm, trả về danh sách kết quả dạng dict.
+    Chạy trên event loop của FrontendEngine; nhiều bài nộp được chấm xen kẽ trên cùng event loop.
+    """
+    try:
+        bundle = await asyncio.to_thread(SubmissionBundle.from_zip, zip_file_path)
+        entry = bundle.entry_page()
+        if entry is None:
+            print(f"[GraderScript] Lỗi: Không tìm thấy file .html nào trong {zip_file_path}")
+            return [SubmissionResultData(test="Thiết lập",
+                                         result="❌ Error: Không tìm thấy file .html nào trong bài nộp.").to_dict()]
+        if entry != "index.html":
+            print(f"[GraderScript] Cảnh báo: không tìm thấy 'index.html', sử dụng file '{entry}' thay thế.")
+        return await run_grading_logic(exercise_data, bundle, entry, on_result)
+
+    except Exception as e:
+        error_msg = f"{type(e).__name__}: {str(e)}"
+        print(f"[GraderScript] Lỗi không xác định khi chấm bài: {error_msg}")
+        return [SubmissionResultData(test="System Error", result=f"❌ Error: {error_msg}").to_dict()]
+
+
+class FrontendEngine:
+    """
+    Event loop của máy chấm frontend, chạy trong một thread riêng của tiến trình.
+    Mọi bài nộp frontend (và pool Chromium) dùng chung event loop này, nên nhiều bài nộp được chấm đồng thời
+    mà không cần thêm thread hay tiến trình.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="frontend-grader", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, Any]) -> concurrent.futures.Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    def stop(self, timeout: float = 30):
+        """Đóng pool Chromium rồi dừng event loop."""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown_browser_pool(), loop).result(timeout)
+        except Exception as e:
+            print(f"[GraderScript] Lỗi khi đóng pool trình duyệt: {type(e).__name__}: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
 
-    return [r.to_dict() for r in results_list]
+
+FRONTEND_ENGINE = FrontendEngine()
+
+
+async def _warm_up_async():
+    try:
+        await get_browser_pool()
+    except Exception as e:
+        print(f"[GraderScript] Không khởi động được pool trình duyệt: {type(e).__name__}: {e}")
+
+
+def warm_up():
+    """Khởi động sẵn event loop và pool Chromium (không chờ) để bài nộp đầu tiên không phải chờ."""
+    FRONTEND_ENGINE.submit(_warm_up_async())
+
+
+def shutdown():
+    FRONTEND_ENGINE.stop()
+
+
+def submit_frontend_submission(exercise_data: Dict[str, Any], zip_file_path: str,
+                               on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None
+                               ) -> concurrent.futures.Future:
+    """Đưa bài nộp vào event loop của máy chấm frontend; trả về Future của danh sách kết quả."""
+    return FRONTEND_ENGINE.submit(grade_frontend_submission_async(exercise_data, zip_file_path, on_result))
+
+
+def grade_frontend_submission(exercise_data: Dict[str, Any], zip_file_path: str,
+                              on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None
+                              ) -> List[Dict[str, Any]]:
+    """Chấm một bài nộp frontend và chờ kết quả (dùng khi chạy như một script)."""
+    return submit_frontend_submission(exercise_data, zip_file_path, on_result).result()
 
 
 def main():
     parser = argparse.ArgumentParser(description="Chấm điểm bài nộp HTML/JS.")
-    parser.add_argument("exercise_json_str", help="Một chuỗi JSON chứa thông tin bài tập (Exercise object).")
+    parser.add_argument("exercise_json_str",
+                        help="Một chuỗi JSON chứa thông tin bài tập (Exercise object), "
+                             "hoặc '@<đường dẫn>' tới file JSON của bài tập.")
     parser.add_argument("zip_file_path", help="Đường dẫn đến file ZIP bài nộp.")
     parser.add_argument("output_file_path", help="Đường dẫn để ghi file JSON kết quả.")
     args = parser.parse_args()
@@ -331,68 +762,30 @@ def main():
     print(f"[GraderScript] Nhận được zip_file_path: {args.zip_file_path}")
     print(f"[GraderScript] Nhận được output_file_path: {args.output_file_path}")
 
-    results_for_json = []
-    extract_dir = None
-
     try:
-        exercise_data = json.loads(args.exercise_json_str)
-        # <<< CẢI TIẾN >>>: Đổi tên thư mục giải nén để dễ debug hơn
-        exercise_id = exercise_data.get("id", "unknown_id")
-        timestamp = str(int(time.time()))
-        base_submissions_dir = Path(__file__).resolve().parent / "temp_submissions"
-        base_submissions_dir.mkdir(exist_ok=True)
-        unique_folder_name = f"exercise-{exercise_id}_{timestamp}"
-        extract_dir = base_submissions_dir / unique_folder_name
-
-        unzip_submission(args.zip_file_path, str(extract_dir))
-        index_path = extract_dir / "index.html"
-
-        if not index_path.exists():
-            # Thử tìm các file html khác nếu không có index.html
-            html_files = list(extract_dir.glob('*.html'))
-            if not html_files:
-                print(f"[GraderScript] Lỗi: Không tìm thấy file .html nào trong {extract_dir}")
-                results_for_json = [SubmissionResultData(test="Thiết lập",
-                                                         result="❌ Error: Không tìm thấy file .html nào trong bài nộp.").to_dict()]
-            else:
-                index_path = html_files[0]
-                print(
-                    f"[GraderScript] Cảnh báo: không tìm thấy 'index.html', sử dụng file '{index_path.name}' thay thế.")
-                results_for_json = run_grading_logic(exercise_data, index_path)
+        if args.exercise_json_str.startswith("@"):
+            with open(args.exercise_json_str[1:], 'r', encoding='utf-8') as f:
+                exercise_data = json.load(f)
         else:
-            results_for_json = run_grading_logic(exercise_data, index_path)
-
+            exercise_data = json.loads(args.exercise_json_str)
+        results_for_json = grade_frontend_submission(exercise_data, args.zip_file_path)
     except json.JSONDecodeError as e:
         results_for_json = [
             SubmissionResultData(test="Setup Error", result=f"❌ Error: Lỗi định dạng JSON của bài tập - {e}").to_dict()]
-    except Exception as e:
-        error_msg = f"{type(e).__name__}: {str(e)}"
-        print(f"[GraderScript] Lỗi không xác định trong main(): {error_msg}")
-        if not results_for_json: results_for_json = []
-        results_for_json.append(SubmissionResultData(test="System Error", result=f"❌ Error: {error_msg}").to_dict())
     finally:
-        if extract_dir and extract_dir.exists():
-            try:
-                # Giữ lại thư mục nếu có lỗi để debug, xóa nếu chạy thành công
-                if any("Error" in r['result'] for r in results_for_json):
-                    print(f"[GraderScript] Phát hiện lỗi, giữ lại thư mục để debug: {extract_dir}")
-                else:
-                    shutil.rmtree(extract_dir)
-                    print(f"[GraderScript] Đã dọn dẹp thư mục thành công: {extract_dir}")
-            except OSError as e_rm:
-                print(f"[GraderScript] Lỗi khi dọn dẹp thư mục {extract_dir}: {e_rm}")
+        shutdown()
 
-        try:
-            with open(args.output_file_path, 'w', encoding='utf-8') as f:
-                json.dump(results_for_json, f, ensure_ascii=False, indent=4)
-            print(f"[GraderScript] Đã ghi kết quả vào {args.output_file_path}")
-        except Exception as e_write:
-            print(f"[GraderScript] Lỗi khi ghi file kết quả {args.output_file_path}: {e_write}")
-            # In ra console nếu không ghi được file
-            print("---RESULTS_START---")
-            print(json.dumps(results_for_json, ensure_ascii=False, indent=4))
-            print("---RESULTS_END---")
+    try:
+        with open(args.output_file_path, 'w', encoding='utf-8') as f:
+            json.dump(results_for_json, f, ensure_ascii=False, indent=4)
+        print(f"[GraderScript] Đã ghi kết quả vào {args.output_file_path}")
+    except Exception as e_write:
+        print(f"[GraderScript] Lỗi khi ghi file kết quả {args.output_file_path}: {e_write}")
+        # In ra console nếu không ghi được file
+        print("---RESULTS_START---")
+        print(json.dumps(results_for_json, ensure_ascii=False, indent=4))
+        print("---RESULTS_END---")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
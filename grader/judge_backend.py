@@ -5,236 +5,794 @@ import json
 import subprocess
 import os
 import pathlib
+import shutil
 import tempfile
-from typing import List, Dict
+import time
+import math
+import mmap
+import signal
+import contextlib
+import argparse
+import selectors
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Callable, BinaryIO, Iterator, Union, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: không có setrlimit/wait4, chạy bài nộp không giới hạn tài nguyên
+    resource = None
+
+try:
+    from grader.compile_cache import CompileCache
+    from grader.checkers import OutputChecker, checker_factory, is_program_checker, validate_program_checker
+    from grader.testcase_store import load_backend_testcases
+    from grader import zygote
+    from grader.toolchains import TOOLCHAINS, get_toolchain, precompiled_header_flags
+except ImportError:  # Chạy trực tiếp dạng script: python grader/judge_backend.py
+    from compile_cache import CompileCache
+    from checkers import OutputChecker, checker_factory, is_program_checker, validate_program_checker
+    from testcase_store import load_backend_testcases
+    import zygote
+    from toolchains import TOOLCHAINS, get_toolchain, precompiled_header_flags
 
 # ==============================================================================
-# --- CẤU HÌNH ĐƯỜNG DẪN TRÌNH BIÊN DỊCH ---
-# Vui lòng thay đổi các đường dẫn này cho phù hợp với máy của bạn.
+# --- TRÌNH BIÊN DỊCH ---
+# Được dò tự động khi khởi động (xem grader/toolchains.py):
+#   C++ : biến môi trường CXX, hoặc g++ trong PATH
+#   Java: biến môi trường JAVA_HOME, hoặc javac/java trong PATH
 # ==============================================================================
 
-# 1. Trỏ đến thư mục 'bin' của JDK (chứa javac.exe và java.exe)
-# Ví dụ: r"C:\Program Files\Java\jdk-21\bin"
-JDK_BIN_PATH = pathlib.Path(r"D:\jdk-23_windows-x64_bin\jdk-23.0.1\bin")
+# === CẤU HÌNH CHẠY TEST CASE ===
+
+# Timeout mặc định cho mỗi test case (giây)
+DEFAULT_CASE_TIMEOUT = 5
+# Ngân sách thời gian thực cho cả bài nộp = time_limit * số test case * hệ số này + phần dự phòng
+SUBMISSION_BUDGET_FACTOR = 2
+SUBMISSION_BUDGET_OVERHEAD = 2
+# Khi bài tập có time_limit: timeout thời gian thực của mỗi test case = time_limit * hệ số này + phần dự phòng
+# (time_limit được áp dụng trên thời gian CPU; timeout thời gian thực chỉ để bắt chương trình bị treo khi chờ I/O)
+WALL_TIME_FACTOR = 3
+WALL_TIME_OVERHEAD = 1
+# Hệ số nhân time_limit theo ngôn ngữ (JVM tốn thêm CPU khi khởi động)
+TIME_LIMIT_MULTIPLIERS = {"java": 2.0}
+# Phần không gian địa chỉ cho phép thêm ngoài memory_limit (thư viện động, stack...), tính bằng KB
+ADDRESS_SPACE_SLACK_KB = 16 * 1024
+# Dấu hiệu trong stderr cho thấy chương trình chết vì không cấp phát được bộ nhớ
+OUT_OF_MEMORY_MARKERS = ("MemoryError", "std::bad_alloc", "java.lang.OutOfMemoryError")
+# Giới hạn stdout mặc định của mỗi test case (KB) khi bài tập không khai báo output_limit
+DEFAULT_OUTPUT_LIMIT_KB = 16 * 1024
+# stdout được đọc từ pipe theo từng đoạn cỡ này; chỉ giữ lại một phần đầu để trả về cho người dùng
+READ_CHUNK_SIZE = 64 * 1024
+OUTPUT_PREVIEW_BYTES = 64 * 1024
+STDERR_CAPTURE_BYTES = 64 * 1024
+
+
+def _available_cores() -> int:
+    """Số lõi CPU mà tiến trình được phép dùng (tôn trọng CPU affinity/cgroup cpuset nếu có)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
 
-# 2. Trỏ đến thư mục 'bin' của trình biên dịch C++ (ví dụ: MinGW-w64)
-# Ví dụ: r"C:\msys64\mingw64\bin"
-# Nếu bạn đã thêm g++ vào PATH hệ thống, có thể để trống: CPP_COMPILER_DIR = None
-CPP_COMPILER_DIR = pathlib.Path(r"C:\msys64\mingw64\bin")
-# === CÁC HÀM CHẤM BÀI CHO TỪNG NGÔN NGỮ ===
 
-def judge_python(user_code_path: str, test_case: Dict) -> Dict:
-    """Chấm một test case cho code Python."""
-    stdin_data = test_case.get("stdin", "")
-    expected_stdout = test_case.get("expected_stdout", "")
-    case_id = test_case.get("id", "N/A")
+# Số test case tối đa chạy song song cho một bài nộp (có thể ghi đè bằng biến môi trường)
+MAX_PARALLEL_TEST_CASES = int(os.getenv("GRADER_MAX_PARALLEL_TEST_CASES", "0")) or _available_cores()
 
-    try:
-        process = subprocess.run(
-            [sys.executable, user_code_path],
-            input=stdin_data,
-            capture_output=True,
-            text=True,
-            timeout=5,
-            check=False
-        )
-        actual_stdout = process.stdout.strip()
 
-        if process.returncode != 0:
-            return {"test_case_id": case_id, "status": "RUNTIME_ERROR", "detail": process.stderr.strip()}
+# === GIAI ĐOẠN 1: BIÊN DỊCH (MỘT LẦN CHO MỖI BÀI NỘP) ===
 
-        if actual_stdout == expected_stdout.strip():
-            return {"test_case_id": case_id, "status": "ACCEPTED", "output": actual_stdout}
-        else:
-            return {"test_case_id": case_id, "status": "WRONG_ANSWER", "output": actual_stdout,
-                    "expected": expected_stdout}
+CPP_COMPILE_FLAGS = ["-std=c++17"]
 
-    except subprocess.TimeoutExpired:
-        return {"test_case_id": case_id, "status": "TIME_LIMIT_EXCEEDED"}
-    except Exception as e:
-        return {"test_case_id": case_id, "status": "GRADER_ERROR", "detail": str(e)}
+# Cache bản biên dịch dùng chung giữa các bài nộp có mã nguồn giống hệt nhau (xem grader/compile_cache.py)
+COMPILE_CACHE = CompileCache()
 
+# Bài nộp Python được fork từ một trình thông dịch khởi động sẵn thay vì chạy `python` mới cho mỗi test case
+# (xem grader/zygote.py); đặt GRADER_PYTHON_ZYGOTE=0 để tắt
+PYTHON_ZYGOTE = (zygote.PythonZygote() if os.getenv("GRADER_PYTHON_ZYGOTE", "1") != "0"
+                 and resource is not None and zygote.is_supported() else None)
 
-def judge_cpp(user_code_path: str, test_case: Dict) -> Dict:
-    """Biên dịch và chấm một test case cho code C++."""
-    source_path = pathlib.Path(user_code_path)
-    case_id = test_case.get("id", "N/A")
+class CompiledSubmission:
+    """Kết quả biên dịch một bài nộp: lệnh chạy và thư mục làm việc dùng chung cho mọi test case."""
+
+    def __init__(self, run_cmd: List[str], cwd: Optional[str] = None, language: Optional[str] = None,
+                 script: Optional[str] = None):
+        self.run_cmd = run_cmd
+        self.cwd = cwd
+        self.language = language
+        # File nguồn của bài nộp Python (chạy qua zygote)
+        self.script = script
+
+    def command(self, memory_limit: Optional[int] = None) -> List[str]:
+        """Lệnh chạy bài nộp; với Java, memory_limit được áp dụng lên heap (-Xmx) thay vì không gian địa chỉ."""
+        if self.language == "java" and memory_limit:
+            return self.run_cmd[:1] + [f"-Xmx{memory_limit}k"] + self.run_cmd[1:]
+        return self.run_cmd
+
+
+class CompilationError(Exception):
+    """Bài nộp không biên dịch được; `detail` là thông báo lỗi của trình biên dịch."""
 
-    # Tạo file thực thi trong một thư mục tạm thời để tránh xung đột
-    with tempfile.TemporaryDirectory() as temp_dir:
-        executable_name = "solution.exe" if sys.platform == "win32" else "solution"
-        executable_path = pathlib.Path(temp_dir) / executable_name
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
 
-        # --- Bước 1: Biên dịch ---
+
+def compile_python(user_code_path: str, work_dir: str) -> CompiledSubmission:
+    """Python không cần biên dịch, chỉ chạy trực tiếp file nguồn."""
+    # Đường dẫn tuyệt đối: zygote chạy với thư mục hiện tại khác với tiến trình gọi
+    script = os.path.abspath(user_code_path)
+    return CompiledSubmission([sys.executable, script], language="python", script=script)
+
+
+def _build_cached(language: str, user_code_path: str, flags: List[str], work_dir: str,
+                  build: Callable[[pathlib.Path], None]) -> pathlib.Path:
+    """
+    Trả về thư mục chứa bản biên dịch: lấy từ cache nếu mã nguồn + cờ biên dịch đã từng được biên dịch,
+    nếu không thì gọi `build` (vào cache, hoặc vào thư mục làm việc khi cache bị tắt).
+    """
+    if not COMPILE_CACHE.enabled:
+        build(pathlib.Path(work_dir))
+        return pathlib.Path(work_dir)
+    source = pathlib.Path(user_code_path).read_bytes()
+    return COMPILE_CACHE.get_or_build(COMPILE_CACHE.key(language, source, flags), build)
+
+
+def compile_cpp(user_code_path: str, work_dir: str) -> CompiledSubmission:
+    """Biên dịch code C++ (hoặc dùng lại bản biên dịch của mã nguồn giống hệt trong cache)."""
+    executable_name = "solution.exe" if sys.platform == "win32" else "solution"
+    toolchain = get_toolchain("cpp")
+
+    def build(output_dir: pathlib.Path):
         compile_process = subprocess.run(
-            ["g++", str(source_path), "-o", str(executable_path), "-std=c++17"],
+            [toolchain.compiler, str(pathlib.Path(user_code_path)), "-o", str(output_dir / executable_name)]
+            + CPP_COMPILE_FLAGS + precompiled_header_flags(toolchain, CPP_COMPILE_FLAGS),
             capture_output=True,
             text=True
         )
+        if compile_process.returncode != 0:
+            raise CompilationError(compile_process.stderr.strip())
+
+    build_dir = _build_cached("cpp", user_code_path, [toolchain.fingerprint] + CPP_COMPILE_FLAGS, work_dir, build)
+    return CompiledSubmission([str(build_dir / executable_name)], cwd=work_dir, language="cpp")
 
+
+def compile_java(user_code_path: str, work_dir: str) -> CompiledSubmission:
+    """Biên dịch code Java (hoặc dùng lại các file .class của mã nguồn giống hệt trong cache)."""
+    # SỬA LỖI: Tạo file Main.java để biên dịch
+    # Java yêu cầu tên file phải trùng với tên class public.
+    # Boilerplate của chúng ta dùng `public class Main`.
+    main_class_name = "Main"
+    toolchain = get_toolchain("java")
+
+    def build(output_dir: pathlib.Path):
+        correct_source_path = output_dir / f"{main_class_name}.java"
+        shutil.copyfile(user_code_path, correct_source_path)
+        compile_process = subprocess.run(
+            [toolchain.compiler, str(correct_source_path)],
+            capture_output=True,
+            text=True,
+            encoding='utf-8',
+            cwd=str(output_dir)
+        )
         if compile_process.returncode != 0:
-            return {"test_case_id": case_id, "status": "COMPILATION_ERROR", "detail": compile_process.stderr.strip()}
+            raise CompilationError(compile_process.stderr.strip())
 
-        # --- Bước 2: Thực thi ---
-        stdin_data = test_case.get("stdin", "")
-        expected_stdout = test_case.get("expected_stdout", "")
+    build_dir = _build_cached("java", user_code_path, [toolchain.fingerprint], work_dir, build)
+    return CompiledSubmission([toolchain.runtime, "-cp", str(build_dir), main_class_name], cwd=work_dir,
+                              language="java")
 
+
+def warm_up():
+    """Chuẩn bị trước phần tốn thời gian của bài nộp đầu tiên (precompiled header cho C++)."""
+    try:
+        precompiled_header_flags(get_toolchain("cpp"), CPP_COMPILE_FLAGS)
+    except FileNotFoundError:
+        pass
+
+
+# Ánh xạ đuôi file -> hàm biên dịch của ngôn ngữ tương ứng
+LANGUAGE_COMPILERS = {
+    '.py': compile_python,
+    '.cpp': compile_cpp,
+    '.java': compile_java,
+}
+
+
+# === GIAI ĐOẠN 2: CHẠY TỪNG TEST CASE TRÊN CÙNG BẢN BIÊN DỊCH ===
+
+# Bộ so sánh output được tạo từ (expected output, test case)
+CheckerFactory = Callable[[Union[bytes, mmap.mmap], Dict], OutputChecker]
+
+class ExecutionResult:
+    """Kết quả một lần chạy bài nộp: mã thoát, output và tài nguyên đã dùng (đo qua rusage của tiến trình con)."""
+
+    def __init__(self, returncode: int, stdout: str, stderr: str, wall_time_ms: float,
+                 cpu_time_ms: Optional[float] = None, max_rss_kb: Optional[int] = None, timed_out: bool = False,
+                 output_exceeded: bool = False, output_matched: Optional[bool] = None, stopped_early: bool = False):
+        self.returncode = returncode
+        # Chỉ giữ tối đa OUTPUT_PREVIEW_BYTES đầu tiên của stdout
+        self.stdout = stdout
+        self.stderr = stderr
+        self.wall_time_ms = wall_time_ms
+        self.cpu_time_ms = cpu_time_ms
+        self.max_rss_kb = max_rss_kb
+        self.timed_out = timed_out
+        self.output_exceeded = output_exceeded
+        # False nếu output đã chắc chắn sai ngay khi đọc (kể cả khi bài nộp bị dừng sớm), None nếu chưa biết:
+        # bộ so sánh chỉ được `finish()` sau khi bài nộp kết thúc bình thường (xem run_test_case)
+        self.output_matched = output_matched
+        # Bài nộp bị máy chấm dừng vì output đã chắc chắn sai
+        self.stopped_early = stopped_early
+
+
+def _limited_command(cmd: List[str], cpu_limit: Optional[float], address_space_kb: Optional[int]) -> List[str]:
+    """
+    Lệnh chạy `cmd` qua /bin/sh, đặt RLIMIT_CPU/RLIMIT_AS bằng `ulimit` ngay trước exec.
+    Không dùng preexec_fn: chạy code Python trong tiến trình con sau fork không an toàn khi máy chấm
+    đang chạy nhiều thread (các test case song song, thread của grader service).
+    """
+    limits = []
+    if cpu_limit is not None:
+        cpu_seconds = max(1, math.ceil(cpu_limit))
+        # Vượt giới hạn mềm: SIGXCPU; vượt giới hạn cứng: SIGKILL (đặt giới hạn mềm trước để luôn mềm <= cứng)
+        limits += [f"ulimit -S -t {cpu_seconds}", f"ulimit -H -t {cpu_seconds + 1}"]
+    if address_space_kb is not None:
+        limits.append(f"ulimit -v {int(address_space_kb)}")
+    if not limits:
+        return cmd
+    # Không đặt được giới hạn thì không chạy bài nộp
+    return ["/bin/sh", "-c", " && ".join(limits) + ' && exec "$@"', "sh"] + list(cmd)
+
+
+def _execute_unlimited(cmd: List[str], cwd: Optional[str], stdin_file: BinaryIO, wall_timeout: float,
+                       checker: Optional[OutputChecker], output_limit_bytes: Optional[int]) -> ExecutionResult:
+    """Phương án dự phòng khi không có setrlimit/wait4 (Windows): đọc toàn bộ output rồi mới so sánh."""
+    started_at = time.monotonic()
+    try:
+        process = subprocess.run(cmd, stdin=stdin_file, capture_output=True, timeout=wall_timeout, check=False,
+                                 cwd=cwd)
+    except subprocess.TimeoutExpired:
+        return ExecutionResult(-1, "", "", round((time.monotonic() - started_at) * 1000, 1), timed_out=True)
+    output_exceeded = bool(output_limit_bytes) and len(process.stdout) > output_limit_bytes
+    output_matched = None
+    if checker is not None and not checker.feed(process.stdout):
+        output_matched = False
+    return ExecutionResult(process.returncode,
+                           process.stdout[:OUTPUT_PREVIEW_BYTES].decode("utf-8", errors="replace"),
+                           process.stderr[:STDERR_CAPTURE_BYTES].decode("utf-8", errors="replace"),
+                           round((time.monotonic() - started_at) * 1000, 1),
+                           output_exceeded=output_exceeded, output_matched=output_matched)
+
+
+class _PopenChild:
+    """Bài nộp chạy bằng Popen trong session riêng; `kill` và `wait` có thể được gọi từ hai thread khác nhau."""
+
+    def __init__(self, cmd: List[str], cwd: Optional[str], stdin_file: BinaryIO, stdout_fd: int, stderr_fd: int,
+                 cpu_limit: Optional[float], address_space_kb: Optional[int]):
+        # Tiến trình chạy trong session riêng để có thể kill cả các tiến trình con mà bài nộp tạo ra
+        self.process = subprocess.Popen(_limited_command(cmd, cpu_limit, address_space_kb), stdin=stdin_file,
+                                        stdout=stdout_fd, stderr=stderr_fd, cwd=cwd, start_new_session=True)
+        self._lock = threading.Lock()
+        self._reaped = False
+
+    def _kill_group(self):
         try:
-            execute_process = subprocess.run(
-                [str(executable_path)],
-                input=stdin_data,
-                capture_output=True,
-                text=True,
-                timeout=5,
-                check=False
-            )
-            actual_stdout = execute_process.stdout.strip()
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
 
-            if execute_process.returncode != 0:
-                return {"test_case_id": case_id, "status": "RUNTIME_ERROR", "detail": execute_process.stderr.strip()}
+    def kill(self):
+        with self._lock:
+            if not self._reaped:
+                self._kill_group()
 
-            if actual_stdout == expected_stdout.strip():
-                return {"test_case_id": case_id, "status": "ACCEPTED", "output": actual_stdout}
-            else:
-                return {"test_case_id": case_id, "status": "WRONG_ANSWER", "output": actual_stdout,
-                        "expected": expected_stdout}
+    def wait(self):
+        """Chờ tiến trình kết thúc, trả về (wait status, thời gian CPU (ms), bộ nhớ đỉnh (KB))."""
+        # Chờ nhưng chưa thu hồi (WNOWAIT), để `kill` không thể kill nhầm một pid đã tái sử dụng
+        os.waitid(os.P_PID, self.process.pid, os.WEXITED | os.WNOWAIT)
+        with self._lock:
+            # Dọn các tiến trình con còn sót lại của bài nộp
+            self._kill_group()
+            self._reaped = True
+        _, wait_status, usage = os.wait4(self.process.pid, 0)
+        self.process.returncode = os.waitstatus_to_exitcode(wait_status)
+        return wait_status, (usage.ru_utime + usage.ru_stime) * 1000, usage.ru_maxrss  # Linux: ru_maxrss tính bằng KB
 
-        except subprocess.TimeoutExpired:
-            return {"test_case_id": case_id, "status": "TIME_LIMIT_EXCEEDED"}
-        except Exception as e:
-            return {"test_case_id": case_id, "status": "GRADER_ERROR", "detail": str(e)}
 
+# Tạo tiến trình bài nộp: (stdin, fd ghi stdout, fd ghi stderr) -> đối tượng có kill() và wait()
+ChildSpawner = Callable[[BinaryIO, int, int], object]
 
-def judge_java(user_code_path: str, test_case: Dict) -> Dict:
-    """Biên dịch và chấm một test case cho code Java."""
-    original_source_path = pathlib.Path(user_code_path)
-    case_id = test_case.get("id", "N/A")
 
-    # SỬA LỖI: Tạo file Main.java để biên dịch
-    # Java yêu cầu tên file phải trùng với tên class public.
-    # Boilerplate của chúng ta dùng `public class Main`.
-    main_class_name = "Main"
-    # Tạo file Main.java trong cùng thư mục với file tạm
-    correct_source_path = original_source_path.parent / f"{main_class_name}.java"
-    class_file_path = correct_source_path.with_suffix(".class")
+def _popen_spawner(cmd: List[str], cwd: Optional[str], cpu_limit: Optional[float] = None,
+                   address_space_kb: Optional[int] = None) -> ChildSpawner:
+    return lambda stdin_file, stdout_fd, stderr_fd: _PopenChild(cmd, cwd, stdin_file, stdout_fd, stderr_fd,
+                                                                cpu_limit, address_space_kb)
+
+
+def _zygote_spawner(compiled: CompiledSubmission, cpu_limit: Optional[float] = None,
+                    address_space_kb: Optional[int] = None, args: Sequence[str] = ()) -> ChildSpawner:
+    """Chạy bài nộp Python bằng fork từ zygote; quay về Popen nếu zygote không dùng được."""
+    fallback = _popen_spawner(compiled.command() + list(args), compiled.cwd, cpu_limit, address_space_kb)
+
+    def spawn(stdin_file: BinaryIO, stdout_fd: int, stderr_fd: int):
+        try:
+            return PYTHON_ZYGOTE.spawn(
+                compiled.script, compiled.cwd, stdin_file.fileno(), stdout_fd, stderr_fd,
+                cpu_seconds=max(1, math.ceil(cpu_limit)) if cpu_limit is not None else None,
+                address_space=address_space_kb * 1024 if address_space_kb is not None else None,
+                args=args,
+            )
+        except (OSError, RuntimeError, ValueError) as e:
+            print(f"[judge_backend] Zygote Python không dùng được, chạy bằng tiến trình mới: {e}", file=sys.stderr)
+            return fallback(stdin_file, stdout_fd, stderr_fd)
+
+    return spawn
+
 
+def _execute(spawn: ChildSpawner, stdin_file: BinaryIO, wall_timeout: float,
+             checker: Optional[OutputChecker] = None, output_limit_bytes: Optional[int] = None) -> ExecutionResult:
+    """
+    Chạy bài nộp (tạo bởi `spawn`, đã có giới hạn CPU/bộ nhớ), đo thời gian CPU và bộ nhớ đỉnh bằng wait4.
+    stdin của bài nộp được nối thẳng vào `stdin_file` (file test case trên đĩa), không đi qua bộ nhớ của máy chấm.
+    stdout được đọc theo từng đoạn và đưa ngay vào `checker`; bài nộp bị dừng ngay khi output
+    đã chắc chắn sai hoặc vượt quá `output_limit_bytes`, nên bộ nhớ của máy chấm không phụ thuộc vào output.
+    `checker.finish()` không được gọi ở đây.
+    """
+    started_at = time.monotonic()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
     try:
-        # Đọc nội dung từ file tạm và ghi vào file Main.java
-        with open(original_source_path, 'r', encoding='utf-8') as f_in:
-            code_content = f_in.read()
-        with open(correct_source_path, 'w', encoding='utf-8') as f_out:
-            f_out.write(code_content)
-
-    except IOError as e:
-        return {"test_case_id": case_id, "status": "GRADER_ERROR", "detail": f"Lỗi khi xử lý file code: {e}"}
-
-    javac_path = JDK_BIN_PATH / "javac.exe"
-    java_path = JDK_BIN_PATH / "java.exe"
-
-    if not javac_path.exists() or not java_path.exists():
-        return {"test_case_id": case_id, "status": "GRADER_ERROR",
-                "detail": f"Không tìm thấy trình biên dịch Java tại: {JDK_BIN_PATH}"}
-
-    # --- Bước 1: Biên dịch file Main.java ---
-    compile_process = subprocess.run(
-        [str(javac_path), str(correct_source_path)],  # Compile the correctly named file
-        capture_output=True,
-        text=True,
-        encoding='utf-8',
-        cwd=correct_source_path.parent
-    )
+        child = spawn(stdin_file, stdout_w, stderr_w)
+    except BaseException:
+        os.close(stdout_r)
+        os.close(stderr_r)
+        raise
+    finally:
+        # Chỉ tiến trình bài nộp giữ đầu ghi, để đọc được EOF khi nó kết thúc
+        os.close(stdout_w)
+        os.close(stderr_w)
+
+    timed_out = threading.Event()
 
-    if compile_process.returncode != 0:
-        if correct_source_path.exists(): os.remove(correct_source_path)
-        return {"test_case_id": case_id, "status": "COMPILATION_ERROR", "detail": compile_process.stderr.strip()}
+    def on_timeout():
+        timed_out.set()
+        child.kill()
 
-    # --- Bước 2: Thực thi ---
-    stdin_data = test_case.get("stdin", "")
-    expected_stdout = test_case.get("expected_stdout", "")
+    timer = threading.Timer(wall_timeout, on_timeout)
+    timer.start()
 
+    stdout_preview = bytearray()
+    stderr_data = bytearray()
+    stdout_size = 0
+    output_exceeded = False
+    diverged = False
     try:
-        execute_process = subprocess.run(
-            [str(java_path), main_class_name],  # Run 'java Main'
-            input=stdin_data,
-            capture_output=True,
-            text=True,
-            timeout=5,
-            check=False,
-            encoding='utf-8',
-            cwd=correct_source_path.parent
-        )
-        actual_stdout = execute_process.stdout.strip()
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(stdout_r, selectors.EVENT_READ)
+                selector.register(stderr_r, selectors.EVENT_READ)
+                while selector.get_map() and not (output_exceeded or diverged):
+                    for key, _ in selector.select():
+                        chunk = os.read(key.fd, READ_CHUNK_SIZE)
+                        if not chunk:
+                            selector.unregister(key.fd)
+                            continue
+                        if key.fd == stderr_r:
+                            if len(stderr_data) < STDERR_CAPTURE_BYTES:
+                                stderr_data += chunk[:STDERR_CAPTURE_BYTES - len(stderr_data)]
+                            continue
+                        stdout_size += len(chunk)
+                        if len(stdout_preview) < OUTPUT_PREVIEW_BYTES:
+                            stdout_preview += chunk[:OUTPUT_PREVIEW_BYTES - len(stdout_preview)]
+                        if output_limit_bytes and stdout_size > output_limit_bytes:
+                            output_exceeded = True
+                        elif checker is not None and not checker.feed(chunk):
+                            diverged = True
+                        if output_exceeded or diverged:
+                            child.kill()
+                            break
+        finally:
+            os.close(stdout_r)
+            os.close(stderr_r)
+        wait_status, cpu_time_ms, max_rss_kb = child.wait()
+    finally:
+        timer.cancel()
+    wall_time_ms = round((time.monotonic() - started_at) * 1000, 1)
+
+    return ExecutionResult(
+        os.waitstatus_to_exitcode(wait_status),
+        bytes(stdout_preview).decode("utf-8", errors="replace"),
+        bytes(stderr_data).decode("utf-8", errors="replace"),
+        wall_time_ms,
+        cpu_time_ms=round(cpu_time_ms, 1),
+        max_rss_kb=max_rss_kb,
+        timed_out=timed_out.is_set(),
+        output_exceeded=output_exceeded,
+        output_matched=False if diverged else None,
+        stopped_early=diverged,
+    )
 
-        if execute_process.returncode != 0:
-            return {"test_case_id": case_id, "status": "RUNTIME_ERROR", "detail": execute_process.stderr.strip()}
 
-        if actual_stdout == expected_stdout.strip():
-            return {"test_case_id": case_id, "status": "ACCEPTED", "output": actual_stdout}
-        else:
-            return {"test_case_id": case_id, "status": "WRONG_ANSWER", "output": actual_stdout,
-                    "expected": expected_stdout}
+def _run_compiled(compiled: CompiledSubmission, stdin_file: BinaryIO, timeout: float,
+                  checker: Optional[OutputChecker], output_limit_bytes: Optional[int],
+                  cpu_limit: Optional[float] = None, address_space_kb: Optional[int] = None,
+                  memory_limit: Optional[int] = None, args: Sequence[str] = ()) -> ExecutionResult:
+    """Chạy một chương trình đã biên dịch (bài nộp hoặc checker) theo cách nhanh nhất mà ngôn ngữ hỗ trợ."""
+    if resource is None:
+        return _execute_unlimited(compiled.command(memory_limit) + list(args), compiled.cwd, stdin_file, timeout,
+                                  checker, output_limit_bytes)
+    if compiled.language == "python" and PYTHON_ZYGOTE is not None:
+        spawn = _zygote_spawner(compiled, cpu_limit, address_space_kb, args)
+    else:
+        spawn = _popen_spawner(compiled.command(memory_limit) + list(args), compiled.cwd, cpu_limit,
+                               address_space_kb)
+    return _execute(spawn, stdin_file, timeout, checker, output_limit_bytes)
+
+
+@contextlib.contextmanager
+def _open_test_input(test_case: Dict) -> Iterator[BinaryIO]:
+    """stdin của test case: file trên đĩa (test case lưu dạng file) hoặc file tạm chứa chuỗi stdin."""
+    if "stdin_path" in test_case:
+        with open(test_case["stdin_path"], "rb") as f:
+            yield f
+        return
+    with tempfile.TemporaryFile() as f:
+        f.write(str(test_case.get("stdin", "")).encode("utf-8"))
+        f.seek(0)
+        yield f
+
+
+@contextlib.contextmanager
+def _open_expected_output(test_case: Dict) -> Iterator[Union[bytes, mmap.mmap]]:
+    """Expected output của test case: mmap của file expected (không đọc vào bộ nhớ) hoặc bytes của chuỗi."""
+    if "expected_path" not in test_case:
+        yield str(test_case.get("expected_stdout", "")).encode("utf-8")
+        return
+    with open(test_case["expected_path"], "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            yield mapped
+
+
+def run_test_case(compiled: CompiledSubmission, test_case: Dict, timeout: float = DEFAULT_CASE_TIMEOUT,
+                  time_limit: Optional[float] = None, memory_limit: Optional[int] = None,
+                  make_checker: Optional[CheckerFactory] = None,
+                  output_limit: Optional[int] = None) -> Dict:
+    """
+    Chạy một test case trên bài nộp đã biên dịch và so sánh kết quả.
+    - time_limit (giây): giới hạn thời gian CPU của test case.
+    - memory_limit (KB): giới hạn bộ nhớ; vượt quá cho verdict MEMORY_LIMIT_EXCEEDED.
+    - make_checker: tạo bộ so sánh output từ (expected output, test case) (mặc định: so sánh sau khi strip như trước).
+    - output_limit (KB): giới hạn kích thước stdout; vượt quá cho verdict OUTPUT_LIMIT_EXCEEDED.
+    Test case có thể chứa dữ liệu trực tiếp ("stdin", "expected_stdout") hoặc tham chiếu file
+    ("stdin_path", "expected_path", xem grader/testcase_store.py).
+    """
+    case_id = test_case.get("id", "N/A")
 
-    except subprocess.TimeoutExpired:
-        return {"test_case_id": case_id, "status": "TIME_LIMIT_EXCEEDED"}
+    if timeout <= 0:
+        return {"test_case_id": case_id, "status": "TIME_LIMIT_EXCEEDED",
+                "detail": "Đã hết ngân sách thời gian của bài nộp."}
+
+    # Với Java, giới hạn bộ nhớ được áp dụng qua -Xmx vì JVM cần dự trữ nhiều không gian địa chỉ ảo
+    limit_address_space = bool(memory_limit) and compiled.language != "java"
+
+    try:
+        with _open_test_input(test_case) as stdin_file, _open_expected_output(test_case) as expected:
+            checker = (make_checker or checker_factory(None))(expected, test_case)
+            try:
+                execution = _run_compiled(
+                    compiled, stdin_file, timeout, checker,
+                    output_limit_bytes=(output_limit or DEFAULT_OUTPUT_LIMIT_KB) * 1024,
+                    cpu_limit=time_limit or None,
+                    address_space_kb=memory_limit + ADDRESS_SPACE_SLACK_KB if limit_address_space else None,
+                    memory_limit=memory_limit,
+                )
+                return _judge_execution(case_id, execution, checker, expected, time_limit, memory_limit,
+                                        limit_address_space)
+            finally:
+                checker.close()
     except Exception as e:
         return {"test_case_id": case_id, "status": "GRADER_ERROR", "detail": str(e)}
-    finally:
-        # Dọn dẹp file .class và file Main.java
-        if class_file_path.exists():
-            os.remove(class_file_path)
-        if correct_source_path.exists():
-            os.remove(correct_source_path)
+
+
+def _judge_execution(case_id: object, execution: ExecutionResult, checker: OutputChecker,
+                     expected: Union[bytes, mmap.mmap], time_limit: Optional[float], memory_limit: Optional[int],
+                     limit_address_space: bool) -> Dict:
+    """
+    Verdict của một lần chạy. Các verdict về tài nguyên và lỗi runtime được xét trước;
+    chỉ khi bài nộp kết thúc bình thường thì bộ so sánh mới được `finish()` (checker dạng chương trình mới được chạy),
+    nên một bài nộp đã TLE/RE không tốn thời gian của special judge và không thành GRADER_ERROR vì checker.
+    """
+    usage = {"time_ms": execution.cpu_time_ms if execution.cpu_time_ms is not None else execution.wall_time_ms,
+             "wall_time_ms": execution.wall_time_ms, "memory_kb": execution.max_rss_kb}
+    actual_stdout = execution.stdout.strip()
+
+    if execution.output_exceeded:
+        return {"test_case_id": case_id, "status": "OUTPUT_LIMIT_EXCEEDED", **usage}
+
+    killed_by_cpu_limit = resource is not None and execution.returncode == -signal.SIGXCPU
+    over_cpu_time = (time_limit and execution.cpu_time_ms is not None
+                     and execution.cpu_time_ms > time_limit * 1000)
+    if execution.timed_out or killed_by_cpu_limit or over_cpu_time:
+        return {"test_case_id": case_id, "status": "TIME_LIMIT_EXCEEDED", **usage}
+
+    if memory_limit:
+        out_of_memory = execution.returncode != 0 and any(m in execution.stderr for m in OUT_OF_MEMORY_MARKERS)
+        over_rss = (limit_address_space and execution.max_rss_kb is not None
+                    and execution.max_rss_kb > memory_limit)
+        if out_of_memory or over_rss:
+            return {"test_case_id": case_id, "status": "MEMORY_LIMIT_EXCEEDED", **usage}
+
+    expected_preview = expected[:OUTPUT_PREVIEW_BYTES].decode("utf-8", errors="replace")
+    # Output đã sai trước khi chương trình kết thúc: bài nộp bị dừng sớm, không tính là lỗi runtime
+    if execution.stopped_early:
+        return {"test_case_id": case_id, "status": "WRONG_ANSWER", "output": actual_stdout,
+                "expected": expected_preview, **usage}
+
+    if execution.returncode != 0:
+        return {"test_case_id": case_id, "status": "RUNTIME_ERROR", "detail": execution.stderr.strip(), **usage}
+
+    output_matched = execution.output_matched is not False and checker.finish()
+    if checker.message:
+        usage["checker_message"] = checker.message
+    if not output_matched:
+        return {"test_case_id": case_id, "status": "WRONG_ANSWER", "output": actual_stdout,
+                "expected": expected_preview, **usage}
+
+    return {"test_case_id": case_id, "status": "ACCEPTED", "output": actual_stdout, **usage}
+
+
+# === CHECKER DẠNG CHƯƠNG TRÌNH (SPECIAL JUDGE) ===
+
+# Mã thoát của checker: 0 = đúng; 1, 2 = sai (quy ước của testlib: WA, PE); mã khác = checker lỗi
+CHECKER_REJECT_CODES = (1, 2)
+# Giới hạn output của checker (KB), chỉ dùng làm thông báo cho người nộp
+CHECKER_OUTPUT_LIMIT_KB = 64
+CHECKER_MESSAGE_MAX_CHARS = 1000
+CHECKER_SOURCE_FILES = {"cpp": "checker.cpp", "python": "checker.py"}
+CHECKER_DIR_NAME = "checker"
+
+
+def compile_checker(spec: Dict, work_dir: str) -> CompiledSubmission:
+    """
+    Biên dịch checker của bài tập; bản biên dịch nằm trong cache bản biên dịch nên mỗi mã nguồn checker
+    chỉ được biên dịch một lần. Checker Python (đã kiểm tra cú pháp) được lưu vào cache và chạy qua zygote.
+    """
+    validate_program_checker(spec)
+    language = spec["language"]
+    # Thư mục riêng của checker: khi cache bị tắt, bản biên dịch nằm trong thư mục làm việc
+    # và không được trùng với bản biên dịch của bài nộp
+    checker_dir = pathlib.Path(work_dir) / CHECKER_DIR_NAME
+    checker_dir.mkdir(exist_ok=True)
+    source_path = checker_dir / CHECKER_SOURCE_FILES[language]
+    source_path.write_text(spec["source"], encoding="utf-8")
+    try:
+        if language == "cpp":
+            return compile_cpp(str(source_path), str(checker_dir))
+
+        def build(output_dir: pathlib.Path):
+            source = source_path.read_bytes()
+            try:
+                compile(source, source_path.name, "exec")
+            except SyntaxError as e:
+                raise CompilationError(f"{e.msg} (dòng {e.lineno})")
+            (output_dir / source_path.name).write_bytes(source)
+
+        script = str(_build_cached("python-checker", str(source_path), [], str(checker_dir), build) / source_path.name)
+        return CompiledSubmission([sys.executable, script], cwd=str(checker_dir), language="python", script=script)
+    except CompilationError as e:
+        raise RuntimeError(f"Checker của bài tập không biên dịch được: {e.detail}")
+
+
+def prepare_checker(spec: Dict) -> Dict:
+    """Biên dịch sẵn checker khi bài tập được tạo, để bài nộp đầu tiên không phải chờ biên dịch checker."""
+    with tempfile.TemporaryDirectory(prefix="checker_") as work_dir:
+        compile_checker(spec, work_dir)
+    return {"language": spec["language"], "cached": COMPILE_CACHE.enabled}
+
+
+@contextlib.contextmanager
+def _test_case_file(test_case: Dict, path_key: str, data_key: str) -> Iterator[str]:
+    """Đường dẫn file chứa một phần dữ liệu của test case (ghi ra file tạm nếu test case chứa dữ liệu trực tiếp)."""
+    if path_key in test_case:
+        yield test_case[path_key]
+        return
+    with tempfile.NamedTemporaryFile(prefix="case_") as f:
+        f.write(str(test_case.get(data_key, "")).encode("utf-8"))
+        f.flush()
+        yield f.name
+
+
+def _program_checker_runner(program: CompiledSubmission, time_limit: Optional[float]):
+    """
+    Hàm chạy checker `program <input> <expected> <actual>` cho một test case.
+    Checker có cùng giới hạn CPU/thời gian thực như một test case của bài nộp.
+    """
+    timeout = time_limit * WALL_TIME_FACTOR + WALL_TIME_OVERHEAD if time_limit else DEFAULT_CASE_TIMEOUT
+
+    def run(test_case: Dict, actual_path: str) -> Tuple[bool, str]:
+        with _test_case_file(test_case, "stdin_path", "stdin") as input_path, \
+                _test_case_file(test_case, "expected_path", "expected_stdout") as expected_path, \
+                open(os.devnull, "rb") as devnull:
+            execution = _run_compiled(program, devnull, timeout, None, CHECKER_OUTPUT_LIMIT_KB * 1024,
+                                      cpu_limit=time_limit or None, args=[input_path, expected_path, actual_path])
+        message = (execution.stdout.strip() or execution.stderr.strip())[:CHECKER_MESSAGE_MAX_CHARS]
+        if execution.timed_out or (resource is not None and execution.returncode == -signal.SIGXCPU):
+            raise RuntimeError("Checker của bài tập vượt quá giới hạn thời gian của test case.")
+        if execution.returncode == 0:
+            return True, message
+        if execution.returncode in CHECKER_REJECT_CODES:
+            return False, message
+        raise RuntimeError(f"Checker của bài tập lỗi (mã thoát {execution.returncode}): {message}")
+
+    return run
+
+
+def _make_checker_factory(spec: Optional[object], work_dir: str, time_limit: Optional[float]) -> CheckerFactory:
+    if not is_program_checker(spec):
+        return checker_factory(spec)
+    program = compile_checker(spec, work_dir)
+    return checker_factory(spec, _program_checker_runner(program, time_limit))
 
 
 # === HÀM CHÍNH ĐIỀU PHỐI ===
 
-def run_backend_grader(user_code_path: str, test_cases_json: str) -> List[Dict]:
+# Callback nhận (vị trí test case, kết quả) ngay khi một test case chấm xong
+TestResultCallback = Callable[[int, Dict], None]
+
+
+def _run_test_cases(compiled: CompiledSubmission, test_cases: List[Dict], time_limit: Optional[float],
+                    fail_fast: bool, max_workers: int, on_result: Optional[TestResultCallback] = None,
+                    memory_limit: Optional[int] = None,
+                    make_checker: Optional[CheckerFactory] = None,
+                    output_limit: Optional[int] = None) -> List[Dict]:
     """
-    Điều phối việc chấm bài dựa trên đuôi file.
+    Chạy các test case song song trên một pool giới hạn theo số lõi, trả kết quả theo đúng thứ tự test case.
+    - fail_fast: ngay khi một test case bất kỳ có verdict khác ACCEPTED, các test case chưa bắt đầu
+      bị hủy và có verdict SKIPPED (test case đang chạy vẫn chạy xong).
+    - time_limit: nếu có, là giới hạn CPU của mỗi test case, và cả bài nộp bị giới hạn bởi một ngân sách
+      thời gian thực chung.
+    - memory_limit (KB): giới hạn bộ nhớ của mỗi test case.
+    - make_checker / output_limit: bộ so sánh output và giới hạn stdout (KB), xem run_test_case.
+    - on_result: được gọi ngay khi từng test case xong (theo thứ tự hoàn thành, không theo thứ tự test case).
     """
+    deadline = None
+    case_timeout = DEFAULT_CASE_TIMEOUT
+    if time_limit:
+        time_limit = time_limit * TIME_LIMIT_MULTIPLIERS.get(compiled.language, 1.0)
+        case_timeout = time_limit * WALL_TIME_FACTOR + WALL_TIME_OVERHEAD
+        budget = time_limit * len(test_cases) * SUBMISSION_BUDGET_FACTOR + SUBMISSION_BUDGET_OVERHEAD
+        deadline = time.monotonic() + budget
+
+    # Được đặt khi có verdict khác ACCEPTED (fail_fast): test case chưa bắt đầu thì không chạy nữa
+    stop_scheduling = threading.Event()
+
+    def skipped(index: int) -> Dict:
+        return {"test_case_id": test_cases[index].get("id", "N/A"), "status": "SKIPPED",
+                "detail": "Bỏ qua do một test case trước đó không đạt (fail-fast)."}
+
+    def run_one(index: int) -> Dict:
+        if stop_scheduling.is_set():
+            return skipped(index)
+        timeout = case_timeout
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        return run_test_case(compiled, test_cases[index], timeout, time_limit, memory_limit, make_checker,
+                             output_limit)
+
+    def on_done(index: int, future: Future):
+        if future.cancelled():
+            result = skipped(index)
+        elif future.exception() is not None:
+            return
+        else:
+            result = future.result()
+        # Xét ngay khi từng test case xong (không chờ các test case đứng trước), hủy các test case còn trong hàng đợi
+        if fail_fast and result["status"] != "ACCEPTED" and not stop_scheduling.is_set():
+            stop_scheduling.set()
+            for pending in futures:
+                pending.cancel()
+        if on_result is not None:
+            on_result(index, result)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(test_cases)))) as executor:
+        futures = [executor.submit(run_one, i) for i in range(len(test_cases))]
+        for index, future in enumerate(futures):
+            future.add_done_callback(lambda f, i=index: on_done(i, f))
+
+    return [skipped(index) if future.cancelled() else future.result() for index, future in enumerate(futures)]
+
+
+def run_backend_grader(user_code_path: str, test_cases_json: str, time_limit: Optional[float] = None,
+                       fail_fast: bool = False, max_workers: int = MAX_PARALLEL_TEST_CASES,
+                       memory_limit: Optional[int] = None, checker: Optional[object] = None,
+                       output_limit: Optional[int] = None) -> List[Dict]:
+    """Phiên bản nhận test case dạng chuỗi JSON (dùng cho chế độ chạy script)."""
     try:
         test_cases = json.loads(test_cases_json)
     except json.JSONDecodeError:
         return [{"status": "GRADER_ERROR", "detail": "Invalid test cases JSON format."}]
+    return grade_backend_submission(user_code_path, test_cases, time_limit, fail_fast, max_workers,
+                                    memory_limit=memory_limit, checker=checker, output_limit=output_limit)
+
 
+def grade_backend_submission(user_code_path: str, test_cases: List[Dict], time_limit: Optional[float] = None,
+                             fail_fast: bool = False, max_workers: int = MAX_PARALLEL_TEST_CASES,
+                             on_result: Optional[TestResultCallback] = None,
+                             memory_limit: Optional[int] = None, checker: Optional[object] = None,
+                             output_limit: Optional[int] = None) -> List[Dict]:
+    """
+    Điều phối việc chấm bài dựa trên đuôi file:
+    biên dịch một lần vào thư mục làm việc riêng của bài nộp, sau đó chạy mọi test case trên cùng bản biên dịch.
+    time_limit (giây), memory_limit (KB), checker (xem grader/checkers.py) và output_limit (KB)
+    lấy từ cấu hình của bài tập.
+    """
     # Xác định ngôn ngữ dựa trên đuôi file
     file_extension = pathlib.Path(user_code_path).suffix
-
-    judge_function = None
-    if file_extension == '.py':
-        judge_function = judge_python
-    elif file_extension == '.cpp':
-        judge_function = judge_cpp
-    elif file_extension == '.java':
-        judge_function = judge_java
-    else:
+    compile_function = LANGUAGE_COMPILERS.get(file_extension)
+    if compile_function is None:
         return [{"status": "GRADER_ERROR", "detail": f"Unsupported file type: {file_extension}"}]
 
-    results = []
-    for case in test_cases:
-        result = judge_function(user_code_path, case)
-        results.append(result)
-        # Nếu gặp lỗi nghiêm trọng (biên dịch, runtime), có thể dừng sớm
-        if result["status"] in ["COMPILATION_ERROR", "GRADER_ERROR"]:
-            # Điền nốt các test case còn lại với cùng lỗi để người dùng biết
-            remaining_cases = len(test_cases) - len(results)
-            for _ in range(remaining_cases):
-                results.append(result)
-            break
+    with tempfile.TemporaryDirectory(prefix="submission_") as work_dir:
+        try:
+            make_checker = _make_checker_factory(checker, work_dir, time_limit)
+            compiled = compile_function(user_code_path, work_dir)
+        except CompilationError as e:
+            # Lỗi biên dịch: một verdict chung cho tất cả test case, không chạy thêm gì
+            results = [{"test_case_id": case.get("id", "N/A"), "status": "COMPILATION_ERROR", "detail": e.detail}
+                       for case in test_cases]
+        except Exception as e:
+            results = [{"test_case_id": case.get("id", "N/A"), "status": "GRADER_ERROR", "detail": str(e)}
+                       for case in test_cases]
+        else:
+            return _run_test_cases(compiled, test_cases, time_limit, fail_fast, max_workers, on_result,
+                                   memory_limit, make_checker, output_limit)
 
+    if on_result is not None:
+        for index, result in enumerate(results):
+            on_result(index, result)
     return results
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
+    parser = argparse.ArgumentParser(description="Chấm điểm bài nộp backend (Python/C++/Java).")
+    parser.add_argument("user_code_path", help="Đường dẫn đến file code của người dùng.")
+    parser.add_argument("test_cases_json", nargs="?", default=None,
+                        help="Chuỗi JSON chứa danh sách test case (không cần nếu dùng --testcase-dir).")
+    parser.add_argument("--testcase-dir", default=None,
+                        help="Thư mục test case đã lưu dạng file (xem grader/testcase_store.py).")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="time_limit của bài tập (giây): giới hạn CPU của mỗi test case.")
+    parser.add_argument("--memory-limit", type=int, default=None,
+                        help="memory_limit của bài tập (KB): giới hạn bộ nhớ của mỗi test case.")
+    parser.add_argument("--checker", type=json.loads, default=None,
+                        help='Cấu hình bộ so sánh output dạng JSON, ví dụ \'"tokens"\' hoặc \'{"type": "float"}\'.')
+    parser.add_argument("--output-limit", type=int, default=None,
+                        help="Giới hạn stdout của mỗi test case (KB).")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="Dừng chạy các test case còn lại khi gặp verdict khác ACCEPTED.")
+    try:
+        args = parser.parse_args()
+    except SystemExit:
         usage_error = [
-            {"status": "GRADER_ERROR", "detail": "Usage: python judge_backend.py <user_code_path> <test_cases_json>"}]
+            {"status": "GRADER_ERROR",
+             "detail": "Usage: python judge_backend.py <user_code_path> (<test_cases_json> | --testcase-dir DIR) "
+                       "[--time-limit S] [--memory-limit KB] [--checker JSON] [--output-limit KB] [--fail-fast]"}]
         print(json.dumps(usage_error))
         sys.exit(1)
 
-    user_code_path_arg = sys.argv[1]
-    test_cases_json_arg = sys.argv[2]
-
-    final_results = run_backend_grader(user_code_path_arg, test_cases_json_arg)
+    if args.testcase_dir:
+        final_results = grade_backend_submission(args.user_code_path, load_backend_testcases(args.testcase_dir),
+                                                 time_limit=args.time_limit, fail_fast=args.fail_fast,
+                                                 memory_limit=args.memory_limit, checker=args.checker,
+                                                 output_limit=args.output_limit)
+    else:
+        final_results = run_backend_grader(args.user_code_path, args.test_cases_json or "",
+                                           time_limit=args.time_limit, fail_fast=args.fail_fast,
+                                           memory_limit=args.memory_limit, checker=args.checker,
+                                           output_limit=args.output_limit)
 
     print(json.dumps(final_results, indent=4))
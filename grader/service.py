@@ -0,0 +1,458 @@
+# grader/service.py
+"""
+Grader service: một pool các tiến trình chấm bài sống lâu dài.
+
+Mỗi worker là một tiến trình `python -m grader.service --fd N` đã import sẵn các module chấm bài
+(judge_backend, judge + Playwright) và khởi động sẵn pool Chromium (grader/browser_pool.py).
+API giao tiếp với worker qua một Unix socket (socketpair) bằng các message dạng dict:
+
+    request : {"request_id", "type": "grade_backend" | "grade_frontend" | "prepare_checker" | "ping" | "cancel",
+               "payload": {...}}
+    event   : {"request_id", "type": "event", "event": {...}}      (tiến độ, tùy loại request)
+    response: {"request_id", "type": "result", "ok": bool, "result" | "error"}
+
+"cancel" (payload {"request_id"}) hủy một request đã quá thời gian chờ phía API: request còn trong hàng đợi
+hoặc bài frontend (coroutine) được hủy; bài backend đang chạy thì không hủy được và kết quả là {"cancelled": False}.
+"""
+import os
+import sys
+import time
+import uuid
+import socket
+import argparse
+import threading
+import traceback
+import subprocess
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Connection
+from typing import List, Optional, Any, Dict, Callable
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Số tiến trình worker trong pool (mỗi worker gunicorn có một pool riêng)
+GRADER_POOL_SIZE = int(os.getenv("GRADER_POOL_SIZE", "2"))
+# Thời gian tối đa chờ một request chấm bài (giây) trước khi coi worker bị treo và khởi động lại
+GRADER_REQUEST_TIMEOUT = float(os.getenv("GRADER_REQUEST_TIMEOUT", "300"))
+HEALTH_CHECK_TIMEOUT = 5
+# Chu kỳ kiểm tra (giây) khi chờ worker bị thay thế chấm xong các request còn lại
+DRAIN_POLL_INTERVAL = 0.2
+
+
+class GraderServiceError(Exception):
+    """Lỗi của grader service (worker chết, quá thời gian, request không hợp lệ...)."""
+
+
+def is_supported() -> bool:
+    """Grader service dùng Unix socket và pass_fds nên chỉ hỗ trợ trên hệ POSIX."""
+    return os.name == "posix"
+
+
+# ==============================================================================
+# === PHÍA WORKER (chạy trong tiến trình con) ===
+# ==============================================================================
+
+def _testcase_event_emitter(emit: Callable[[Dict[str, Any]], None]) -> Callable[[int, Dict], None]:
+    """Chuyển callback kết quả từng test case của máy chấm thành sự kiện 'testcase' gửi về API."""
+    return lambda index, result: emit({"type": "testcase", "index": index, "result": result})
+
+
+def _handle_grade_backend(payload: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]) -> List[Dict]:
+    from grader import judge_backend
+    from grader.testcase_store import load_backend_testcases
+    # Test case được truyền bằng tham chiếu tới thư mục file (hoặc trực tiếp trong payload, cách cũ)
+    test_cases = payload.get("test_cases")
+    if test_cases is None:
+        test_cases = load_backend_testcases(payload["testcase_dir"])
+    return judge_backend.grade_backend_submission(
+        payload["user_code_path"],
+        test_cases,
+        time_limit=payload.get("time_limit"),
+        fail_fast=payload.get("fail_fast", False),
+        memory_limit=payload.get("memory_limit"),
+        checker=payload.get("checker"),
+        output_limit=payload.get("output_limit"),
+        on_result=_testcase_event_emitter(emit),
+    )
+
+
+def _handle_grade_frontend(payload: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]) -> Future:
+    from grader import judge
+    return judge.submit_frontend_submission(payload["exercise"], payload["zip_path"],
+                                            on_result=_testcase_event_emitter(emit))
+
+
+def _handle_prepare_checker(payload: Dict[str, Any], emit: Callable[[Dict[str, Any]], None]) -> Dict:
+    from grader import judge_backend
+    return judge_backend.prepare_checker(payload["checker"])
+
+
+# Chạy lần lượt trên thread chấm bài của worker
+REQUEST_HANDLERS = {
+    "grade_backend": _handle_grade_backend,
+    "prepare_checker": _handle_prepare_checker,
+}
+# Trả về Future ngay; được chấm đồng thời trên event loop của máy chấm frontend (grader/judge.py)
+ASYNC_REQUEST_HANDLERS = {
+    "grade_frontend": _handle_grade_frontend,
+}
+
+
+def _browser_pool_stats() -> Optional[Dict[str, Any]]:
+    try:
+        from grader.browser_pool import browser_pool_stats
+    except ImportError:  # Không có Playwright
+        return None
+    return browser_pool_stats()
+
+
+def _worker_stats(started_at: float, handled: int) -> Dict[str, Any]:
+    from grader import judge_backend
+    return {"pid": os.getpid(), "uptime": round(time.monotonic() - started_at, 1), "handled": handled,
+            "compile_cache": judge_backend.COMPILE_CACHE.stats,
+            "toolchains": {language: toolchain.compiler for language, toolchain in judge_backend.TOOLCHAINS.items()},
+            "browser_pool": _browser_pool_stats()}
+
+
+def worker_main(fd: int):
+    """
+    Vòng lặp chính của một worker: nhận request, chấm bài và gửi kết quả về.
+    Bài backend được chấm trên thread riêng, bài frontend trên event loop của máy chấm frontend.
+    """
+    # Import sẵn các module chấm bài để mỗi bài nộp không phải trả chi phí import nữa
+    from grader import judge_backend
+    threading.Thread(target=judge_backend.warm_up, daemon=True).start()
+    try:
+        from grader import judge  # (kéo theo Playwright)
+    except Exception as e:
+        judge = None
+        print(f"[GraderService] Không import được máy chấm frontend: {e}")
+
+    conn = Connection(fd)
+    send_lock = threading.Lock()
+    stats_lock = threading.Lock()
+    executor = ThreadPoolExecutor(max_workers=1)
+    if judge is not None:
+        judge.warm_up()
+    started_at = time.monotonic()
+    handled = 0
+    # Request đang chấm hoặc đang chờ, theo request_id (để hủy khi API hết thời gian chờ)
+    running: Dict[Optional[str], Future] = {}
+
+    def track(request_id: Optional[str], future: Future):
+        with stats_lock:
+            running[request_id] = future
+        future.add_done_callback(lambda _: untrack(request_id, future))
+
+    def untrack(request_id: Optional[str], future: Future):
+        with stats_lock:
+            if running.get(request_id) is future:
+                del running[request_id]
+
+    def cancel(request_id: Optional[str]) -> bool:
+        with stats_lock:
+            future = running.get(request_id)
+        # Request đã xong (hoặc không tồn tại) thì không còn gì phải hủy
+        return future is None or future.cancel()
+
+    def send(message: Dict[str, Any]):
+        with send_lock:
+            conn.send(message)
+
+    def event_sender(request_id: Optional[str]) -> Callable[[Dict[str, Any]], None]:
+        return lambda event: send({"request_id": request_id, "type": "event", "event": event})
+
+    def reply(request_id: Optional[str], result: Any = None, error: Optional[BaseException] = None):
+        nonlocal handled
+        with stats_lock:
+            handled += 1
+        if error is None:
+            send({"request_id": request_id, "type": "result", "ok": True, "result": result})
+        else:
+            traceback.print_exception(type(error), error, error.__traceback__)
+            send({"request_id": request_id, "type": "result", "ok": False,
+                  "error": f"{type(error).__name__}: {error}"})
+
+    def handle(request: Dict[str, Any]):
+        request_id = request.get("request_id")
+        try:
+            handler = REQUEST_HANDLERS[request["type"]]
+            result = handler(request.get("payload") or {}, event_sender(request_id))
+        except Exception as e:
+            reply(request_id, error=e)
+            return
+        reply(request_id, result)
+
+    def handle_async(request: Dict[str, Any]):
+        request_id = request.get("request_id")
+
+        def done(future: Future):
+            if future.cancelled():
+                # Bị hủy theo yêu cầu của API (đã bỏ chờ request này): không cần trả lời
+                return
+            try:
+                result = future.result()
+            except Exception as e:
+                reply(request_id, error=e)
+                return
+            reply(request_id, result)
+
+        try:
+            handler = ASYNC_REQUEST_HANDLERS[request["type"]]
+            future = handler(request.get("payload") or {}, event_sender(request_id))
+            track(request_id, future)
+            future.add_done_callback(done)
+        except Exception as e:
+            reply(request_id, error=e)
+
+    print(f"[GraderService] Worker {os.getpid()} sẵn sàng.")
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        request_type = request.get("type")
+        if request_type == "shutdown":
+            break
+        if request_type == "ping":
+            # Trả lời ngay cả khi đang chấm bài, vì việc chấm chạy trong thread của executor
+            send({"request_id": request.get("request_id"), "type": "result", "ok": True,
+                  "result": _worker_stats(started_at, handled)})
+            continue
+        if request_type == "cancel":
+            target = (request.get("payload") or {}).get("request_id")
+            send({"request_id": request.get("request_id"), "type": "result", "ok": True,
+                  "result": {"cancelled": cancel(target)}})
+            continue
+        if request_type in ASYNC_REQUEST_HANDLERS:
+            handle_async(request)
+            continue
+        if request_type not in REQUEST_HANDLERS:
+            send({"request_id": request.get("request_id"), "type": "result", "ok": False,
+                  "error": f"Loại request không được hỗ trợ: {request_type}"})
+            continue
+        track(request.get("request_id"), executor.submit(handle, request))
+
+    executor.shutdown(wait=False)
+    if judge is not None:
+        judge.shutdown()
+    conn.close()
+
+
+# ==============================================================================
+# === PHÍA API (chạy trong tiến trình FastAPI) ===
+# ==============================================================================
+
+class GraderWorker:
+    """Handle tới một tiến trình worker, với một thread đọc message và định tuyến theo request_id."""
+
+    def __init__(self):
+        parent_sock, child_sock = socket.socketpair()
+        env = os.environ.copy()
+        env['PYTHONUTF8'] = '1'
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "grader.service", "--fd", str(child_sock.fileno())],
+            pass_fds=(child_sock.fileno(),),
+            cwd=str(PROJECT_ROOT),
+            env=env,
+        )
+        child_sock.close()
+        self.conn = Connection(parent_sock.detach())
+        self._send_lock = threading.Lock()
+        self._pending: Dict[str, Future] = {}
+        self._event_callbacks: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.alive = True
+        self._reader = threading.Thread(target=self._read_loop, name=f"grader-reader-{self.process.pid}",
+                                         daemon=True)
+        self._reader.start()
+
+    @property
+    def inflight(self) -> int:
+        return len(self._pending)
+
+    def _read_loop(self):
+        while True:
+            try:
+                message = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            request_id = message.get("request_id")
+            if message.get("type") == "event":
+                callback = self._event_callbacks.get(request_id)
+                if callback is not None:
+                    try:
+                        callback(message["event"])
+                    except Exception as e:
+                        print(f"[GraderService] Lỗi trong callback sự kiện: {e}")
+                continue
+            future = self._pending.pop(request_id, None)
+            self._event_callbacks.pop(request_id, None)
+            if future is None:
+                continue
+            if message.get("ok"):
+                future.set_result(message.get("result"))
+            else:
+                future.set_exception(GraderServiceError(message.get("error", "Lỗi không xác định")))
+
+        # Worker đã chết: báo lỗi cho mọi request đang chờ
+        self.alive = False
+        for request_id, future in list(self._pending.items()):
+            if not future.done():
+                future.set_exception(GraderServiceError("Tiến trình chấm bài đã dừng đột ngột."))
+        self._pending.clear()
+        self._event_callbacks.clear()
+
+    def submit(self, request_type: str, payload: Optional[Dict[str, Any]] = None,
+               on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+               request_id: Optional[str] = None) -> Future:
+        request_id = request_id or uuid.uuid4().hex
+        future: Future = Future()
+        self._pending[request_id] = future
+        if on_event is not None:
+            self._event_callbacks[request_id] = on_event
+        try:
+            with self._send_lock:
+                self.conn.send({"request_id": request_id, "type": request_type, "payload": payload})
+        except (OSError, ValueError) as e:
+            self._pending.pop(request_id, None)
+            self._event_callbacks.pop(request_id, None)
+            self.alive = False
+            future.set_exception(GraderServiceError(f"Không gửi được request tới worker: {e}"))
+        return future
+
+    def abandon(self, request_id: str) -> bool:
+        """
+        Bỏ chờ một request (đã quá thời gian chờ) và yêu cầu worker hủy nó; kết quả đến sau bị bỏ qua.
+        Trả về True nếu worker đã hủy được request (các request khác của worker không bị ảnh hưởng).
+        """
+        self._pending.pop(request_id, None)
+        self._event_callbacks.pop(request_id, None)
+        try:
+            result = self.submit("cancel", {"request_id": request_id}).result(timeout=HEALTH_CHECK_TIMEOUT)
+        except Exception:
+            return False
+        return bool(result.get("cancelled"))
+
+    def drain_and_stop(self, timeout: float = GRADER_REQUEST_TIMEOUT):
+        """Chờ các request còn lại của worker xong (tối đa `timeout` giây) rồi dừng worker."""
+        deadline = time.monotonic() + timeout
+        while self._pending and self.alive and time.monotonic() < deadline:
+            time.sleep(DRAIN_POLL_INTERVAL)
+        self.stop()
+
+    def stop(self):
+        self.alive = False
+        try:
+            with self._send_lock:
+                self.conn.send({"type": "shutdown"})
+        except (OSError, ValueError):
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.conn.close()
+
+
+def _stop_in_background(stop: Callable[[], None]):
+    threading.Thread(target=stop, name="grader-worker-stop", daemon=True).start()
+
+
+class GraderPool:
+    """Pool các worker chấm bài. An toàn khi gọi từ nhiều thread."""
+
+    def __init__(self, size: int = GRADER_POOL_SIZE):
+        self.size = max(1, size)
+        self._workers: List[GraderWorker] = []
+        # Worker đã bị thay thế nhưng còn đang chấm nốt request (xem _replace_worker)
+        self._draining: List[GraderWorker] = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            while len(self._workers) < self.size:
+                self._workers.append(GraderWorker())
+        print(f"[GraderService] Đã khởi động {self.size} worker chấm bài.")
+
+    def _acquire_worker(self) -> GraderWorker:
+        replaced = []
+        with self._lock:
+            # Thay thế các worker đã chết trước khi chọn
+            for i, worker in enumerate(self._workers):
+                if not worker.alive or worker.process.poll() is not None:
+                    print(f"[GraderService] Worker {worker.process.pid} đã dừng, khởi động lại.")
+                    self._workers[i] = GraderWorker()
+                    replaced.append(worker)
+            while len(self._workers) < self.size:
+                self._workers.append(GraderWorker())
+            # Chọn worker đang ít việc nhất
+            chosen = min(self._workers, key=lambda w: w.inflight)
+        # Dừng worker cũ ngoài khóa để không chặn các lời gọi khác
+        for worker in replaced:
+            _stop_in_background(worker.stop)
+        return chosen
+
+    def _replace_worker(self, worker: GraderWorker):
+        """
+        Đưa một worker mới vào chỗ của `worker` (worker mới nhận các request tiếp theo);
+        worker cũ chấm nốt các request đang có rồi mới dừng, ngoài khóa.
+        """
+        with self._lock:
+            if worker not in self._workers:
+                return
+            self._workers[self._workers.index(worker)] = GraderWorker()
+            self._draining.append(worker)
+        print(f"[GraderService] Worker {worker.process.pid} bị treo, thay bằng worker mới.")
+
+        def drain():
+            worker.drain_and_stop()
+            with self._lock:
+                self._draining.remove(worker)
+
+        _stop_in_background(drain)
+
+    def call(self, request_type: str, payload: Optional[Dict[str, Any]] = None,
+             timeout: float = GRADER_REQUEST_TIMEOUT,
+             on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> Any:
+        """Gửi một request và chờ kết quả (blocking, nên gọi qua asyncio.to_thread từ endpoint async)."""
+        worker = self._acquire_worker()
+        request_id = uuid.uuid4().hex
+        future = worker.submit(request_type, payload, on_event, request_id=request_id)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # Chỉ request này thất bại: worker hủy request nếu được (còn trong hàng đợi, bài frontend).
+            # Không hủy được (ví dụ trình duyệt/bài nộp bị treo) thì thay worker, các request khác của nó vẫn chạy xong
+            if not worker.abandon(request_id):
+                self._replace_worker(worker)
+            raise GraderServiceError(f"Quá thời gian chờ chấm bài ({timeout}s).")
+
+    def health_check(self) -> List[Dict[str, Any]]:
+        """Ping từng worker, trả về trạng thái của từng worker (pid, uptime, số bài đã chấm, độ trễ)."""
+        with self._lock:
+            workers = list(self._workers)
+        report = []
+        for worker in workers:
+            started = time.monotonic()
+            entry: Dict[str, Any] = {"pid": worker.process.pid, "inflight": worker.inflight}
+            try:
+                stats = worker.submit("ping").result(timeout=HEALTH_CHECK_TIMEOUT)
+                entry.update(stats, healthy=True, latency_ms=round((time.monotonic() - started) * 1000, 2))
+            except Exception as e:
+                entry.update(healthy=False, error=str(e))
+            report.append(entry)
+        return report
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers + self._draining, []
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker của grader service (được khởi động bởi GraderPool).")
+    parser.add_argument("--fd", type=int, required=True, help="File descriptor của Unix socket kết nối với API.")
+    args = parser.parse_args()
+    worker_main(args.fd)
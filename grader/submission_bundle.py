@@ -0,0 +1,63 @@
+# grader/submission_bundle.py
+"""
+Bài nộp frontend (file ZIP) được đọc vào bộ nhớ để máy chấm phục vụ trực tiếp cho trình duyệt
+(qua request routing của Playwright, xem grader/judge.py) thay vì giải nén ra đĩa.
+
+Đường dẫn trong ZIP được chuẩn hóa về dạng `a/b/c.js` (bỏ thư mục, bỏ mục có `..` hoặc đường dẫn tuyệt đối).
+Tổng dung lượng sau giải nén bị giới hạn để tránh ZIP bomb.
+"""
+import os
+import zipfile
+import mimetypes
+import posixpath
+from urllib.parse import unquote
+from typing import Dict, Optional, Tuple
+
+# Tổng dung lượng tối đa của các file trong bài nộp sau khi giải nén (bytes)
+MAX_BUNDLE_BYTES = int(os.getenv("GRADER_FRONTEND_MAX_BUNDLE_BYTES", str(50 * 1024 * 1024)))
+MAX_BUNDLE_ENTRIES = 2000
+
+
+class SubmissionBundle:
+    def __init__(self, files: Dict[str, bytes]):
+        self.files = files
+
+    @classmethod
+    def from_zip(cls, zip_path: str) -> "SubmissionBundle":
+        files: Dict[str, bytes] = {}
+        total = 0
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if info.is_dir():
+                    continue
+                name = posixpath.normpath(info.filename.replace("\\", "/")).lstrip("/")
+                if name.startswith("../") or name in ("", ".", ".."):
+                    continue
+                total += info.file_size
+                if total > MAX_BUNDLE_BYTES or len(files) >= MAX_BUNDLE_ENTRIES:
+                    raise ValueError(f"Bài nộp quá lớn (tối đa {MAX_BUNDLE_BYTES // (1024 * 1024)}MB, "
+                                     f"{MAX_BUNDLE_ENTRIES} file).")
+                files[name] = zip_ref.read(info)
+        print(f"[GraderScript] Đã đọc {len(files)} file ({total} bytes) từ {zip_path}")
+        return cls(files)
+
+    def entry_page(self) -> Optional[str]:
+        """index.html ở thư mục gốc, nếu không có thì file .html đầu tiên ở thư mục gốc."""
+        if "index.html" in self.files:
+            return "index.html"
+        html_files = sorted(name for name in self.files if "/" not in name and name.lower().endswith(".html"))
+        return html_files[0] if html_files else None
+
+    def resolve(self, url_path: str) -> Optional[Tuple[bytes, str]]:
+        """Nội dung và Content-Type của file ứng với đường dẫn URL (thư mục -> index.html); None nếu không có."""
+        name = posixpath.normpath(unquote(url_path)).lstrip("/")
+        if name in ("", "."):
+            name = "index.html"
+        body = self.files.get(name)
+        if body is None:
+            body = self.files.get(posixpath.join(name, "index.html"))
+            name = posixpath.join(name, "index.html")
+        if body is None:
+            return None
+        content_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        return body, content_type
@@ -1 +0,0 @@
-// Viết code JavaScript của bạn ở đây
@@ -0,0 +1,129 @@
+# grader/testcase_store.py
+"""
+Lưu test case của bài tập thành file trên đĩa để truyền cho máy chấm bằng tham chiếu (đường dẫn thư mục)
+thay vì nhét toàn bộ dữ liệu vào argv hoặc message.
+
+Mỗi phiên bản test case của một bài tập là một thư mục `<exercise_id>-<hash>/`:
+    manifest.json          [{"id", "stdin", "expected_stdout"}] (tên file tương đối)
+    <i>.in / <i>.out       stdin và expected output của test case thứ i
+    exercise.json          (bài frontend) toàn bộ thông tin bài tập cho máy chấm frontend
+Thư mục được dựng ở chỗ tạm rồi đổi tên nguyên tử; nội dung không bao giờ bị sửa sau khi tạo,
+nên máy chấm có thể cache manifest đã đọc theo đường dẫn thư mục.
+"""
+import os
+import json
+import uuid
+import time
+import shutil
+import hashlib
+import pathlib
+import threading
+from collections import OrderedDict
+from typing import List, Any, Dict, Callable
+
+PROJECT_ROOT = pathlib.Path(__file__).resolve().parent.parent
+
+TESTCASE_STORE_DIR = pathlib.Path(os.getenv("GRADER_TESTCASE_DIR", str(PROJECT_ROOT / ".grader_cache" / "testcases")))
+MANIFEST_FILE = "manifest.json"
+EXERCISE_FILE = "exercise.json"
+# Phiên bản test case cũ của một bài tập không được dùng trong khoảng này (giây) thì bị xóa
+# khi bài tập có phiên bản test case mới
+STALE_VERSION_SECONDS = 3600
+# Số manifest tối đa được giữ trong bộ nhớ của mỗi tiến trình chấm bài
+LOADED_MANIFESTS_MAX = 256
+
+_loaded_manifests: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+_loaded_lock = threading.Lock()
+
+
+def _content_hash(value: Any) -> str:
+    encoded = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def _prune_stale_versions(root: pathlib.Path, exercise_id: Any, keep: pathlib.Path):
+    now = time.time()
+    for entry in root.glob(f"{exercise_id}-*"):
+        if entry == keep or entry.name.startswith("."):
+            continue
+        try:
+            if now - entry.stat().st_mtime > STALE_VERSION_SECONDS:
+                shutil.rmtree(entry, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _materialize(exercise_id: Any, content: Any, write: Callable[[pathlib.Path], None],
+                 root: pathlib.Path = TESTCASE_STORE_DIR) -> str:
+    directory = root / f"{exercise_id}-{_content_hash(content)}"
+    if (directory / MANIFEST_FILE).exists():
+        return str(directory)
+
+    root.mkdir(parents=True, exist_ok=True)
+    staging = root / f".{directory.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    staging.mkdir()
+    try:
+        write(staging)
+        try:
+            os.rename(staging, directory)
+        except OSError:
+            # Tiến trình khác vừa tạo cùng phiên bản
+            if not (directory / MANIFEST_FILE).exists():
+                raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    _prune_stale_versions(root, exercise_id, directory)
+    return str(directory)
+
+
+def store_backend_testcases(exercise_id: Any, test_cases: List[Dict[str, Any]]) -> str:
+    """Ghi test case backend ra file (nếu phiên bản này chưa có) và trả về đường dẫn thư mục."""
+    def write(directory: pathlib.Path):
+        manifest = []
+        for index, case in enumerate(test_cases):
+            (directory / f"{index}.in").write_bytes(str(case.get("stdin", "")).encode("utf-8"))
+            (directory / f"{index}.out").write_bytes(str(case.get("expected_stdout", "")).encode("utf-8"))
+            manifest.append({"id": case.get("id", "N/A"), "stdin": f"{index}.in", "expected_stdout": f"{index}.out"})
+        (directory / MANIFEST_FILE).write_text(json.dumps(manifest), encoding="utf-8")
+
+    return _materialize(exercise_id, test_cases, write)
+
+
+def store_exercise_file(exercise: Dict[str, Any]) -> str:
+    """Ghi toàn bộ bài tập (dùng cho máy chấm frontend) ra file và trả về đường dẫn file."""
+    def write(directory: pathlib.Path):
+        (directory / EXERCISE_FILE).write_text(json.dumps(exercise, ensure_ascii=False), encoding="utf-8")
+        (directory / MANIFEST_FILE).write_text("[]", encoding="utf-8")
+
+    return str(pathlib.Path(_materialize(exercise.get("id"), exercise, write)) / EXERCISE_FILE)
+
+
+def load_backend_testcases(directory: str) -> List[Dict[str, Any]]:
+    """
+    Trả về danh sách test case dạng tham chiếu file {"id", "stdin_path", "expected_path"}.
+    Manifest của mỗi thư mục chỉ được đọc một lần cho mỗi tiến trình.
+    """
+    # Đánh dấu phiên bản đang được dùng để không bị dọn khi bài tập có test case mới
+    try:
+        os.utime(directory)
+    except OSError:
+        pass
+    with _loaded_lock:
+        cached = _loaded_manifests.get(directory)
+        if cached is not None:
+            _loaded_manifests.move_to_end(directory)
+            return cached
+
+    base = pathlib.Path(directory)
+    with open(base / MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    test_cases = [{"id": entry["id"],
+                   "stdin_path": str(base / entry["stdin"]),
+                   "expected_path": str(base / entry["expected_stdout"])} for entry in manifest]
+
+    with _loaded_lock:
+        _loaded_manifests[directory] = test_cases
+        while len(_loaded_manifests) > LOADED_MANIFESTS_MAX:
+            _loaded_manifests.popitem(last=False)
+    return test_cases
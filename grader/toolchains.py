@@ -0,0 +1,160 @@
+# grader/toolchains.py
+"""
+Danh sách trình biên dịch/runtime của máy chấm backend, được dò một lần khi nạp module.
+
+    C++   : biến môi trường CXX, hoặc g++ / c++ / clang++ trong PATH
+    Java  : $JAVA_HOME/bin/javac và java, hoặc javac / java trong PATH
+
+Với profile C++17, header `bits/stdc++.h` được biên dịch sẵn (precompiled header) một lần cho mỗi
+trình biên dịch + bộ cờ, lưu cạnh cache bản biên dịch và dùng chung giữa các worker. Nếu trình biên dịch
+không hỗ trợ (ví dụ clang, hoặc không có bits/stdc++.h) thì biên dịch bình thường không có PCH.
+"""
+import os
+import sys
+import uuid
+import shutil
+import hashlib
+import pathlib
+import threading
+import subprocess
+from typing import List, Optional, Dict
+
+try:
+    from grader.compile_cache import COMPILE_CACHE_DIR, toolchain_fingerprint
+except ImportError:  # Chạy trực tiếp dạng script
+    from compile_cache import COMPILE_CACHE_DIR, toolchain_fingerprint
+
+_EXE_SUFFIX = ".exe" if sys.platform == "win32" else ""
+
+PCH_DIR = pathlib.Path(os.getenv("GRADER_PCH_DIR", str(COMPILE_CACHE_DIR.parent / "pch")))
+# Đặt GRADER_CPP_PCH=0 để không dùng precompiled header
+CPP_PCH_ENABLED = os.getenv("GRADER_CPP_PCH", "1") != "0"
+PCH_HEADER = "bits/stdc++.h"
+
+
+class Toolchain:
+    """Trình biên dịch (và runtime, với Java) của một ngôn ngữ."""
+
+    def __init__(self, language: str, compiler: str, runtime: Optional[str] = None):
+        self.language = language
+        self.compiler = compiler
+        self.runtime = runtime
+
+    @property
+    def fingerprint(self) -> str:
+        return toolchain_fingerprint(self.compiler)
+
+    def __repr__(self) -> str:
+        return f"Toolchain({self.language!r}, compiler={self.compiler!r}, runtime={self.runtime!r})"
+
+
+def _find_cpp() -> Optional[Toolchain]:
+    candidates = [os.getenv("CXX"), "g++", "c++", "clang++"]
+    for candidate in candidates:
+        if candidate and shutil.which(candidate):
+            return Toolchain("cpp", shutil.which(candidate))
+    return None
+
+
+def _find_java() -> Optional[Toolchain]:
+    java_home = os.getenv("JAVA_HOME")
+    if java_home:
+        bin_dir = pathlib.Path(java_home) / "bin"
+        javac, java = bin_dir / f"javac{_EXE_SUFFIX}", bin_dir / f"java{_EXE_SUFFIX}"
+        if javac.exists() and java.exists():
+            return Toolchain("java", str(javac), str(java))
+    javac = shutil.which("javac")
+    if javac is None:
+        return None
+    # Ưu tiên `java` cùng thư mục với javac (javac trong PATH thường là symlink vào JDK)
+    sibling = pathlib.Path(os.path.realpath(javac)).parent / f"java{_EXE_SUFFIX}"
+    java = str(sibling) if sibling.exists() else shutil.which("java")
+    if java is None:
+        return None
+    return Toolchain("java", javac, java)
+
+
+def discover_toolchains() -> Dict[str, Toolchain]:
+    toolchains = {}
+    for language, find in (("cpp", _find_cpp), ("java", _find_java)):
+        toolchain = find()
+        if toolchain is not None:
+            toolchains[language] = toolchain
+    return toolchains
+
+
+TOOLCHAINS = discover_toolchains()
+
+
+def get_toolchain(language: str) -> Toolchain:
+    """Trả về toolchain của ngôn ngữ; ném FileNotFoundError nếu máy chấm không có trình biên dịch tương ứng."""
+    toolchain = TOOLCHAINS.get(language)
+    if toolchain is None:
+        hints = {"cpp": "đặt biến môi trường CXX hoặc thêm g++ vào PATH",
+                 "java": "đặt biến môi trường JAVA_HOME hoặc thêm javac/java vào PATH"}
+        raise FileNotFoundError(f"Không tìm thấy trình biên dịch cho '{language}' ({hints.get(language, '')}).")
+    return toolchain
+
+
+# === PRECOMPILED HEADER CHO C++ ===
+
+_pch_lock = threading.Lock()
+# Thư mục include chứa PCH theo (trình biên dịch, cờ), None nếu không tạo được
+_pch_dirs: Dict[str, Optional[pathlib.Path]] = {}
+
+
+def _locate_header(toolchain: Toolchain, flags: List[str]) -> Optional[str]:
+    """Đường dẫn thật của bits/stdc++.h theo cách trình biên dịch tìm header (lấy từ danh sách phụ thuộc -M)."""
+    process = subprocess.run([toolchain.compiler, "-x", "c++", *flags, "-M", "-"],
+                             input=f"#include <{PCH_HEADER}>\n", capture_output=True, text=True)
+    if process.returncode != 0:
+        return None
+    for token in process.stdout.replace("\\\n", " ").split():
+        if token.replace("\\", "/").endswith(PCH_HEADER):
+            return token
+    return None
+
+
+def _build_pch(toolchain: Toolchain, flags: List[str], target: pathlib.Path) -> bool:
+    header = _locate_header(toolchain, flags)
+    if header is None:
+        return False
+    PCH_DIR.mkdir(parents=True, exist_ok=True)
+    staging = PCH_DIR / f".{target.name}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    (staging / "bits").mkdir(parents=True)
+    try:
+        process = subprocess.run([toolchain.compiler, "-x", "c++-header", *flags, header,
+                                  "-o", str(staging / f"{PCH_HEADER}.gch")], capture_output=True, text=True)
+        if process.returncode != 0:
+            print(f"[toolchains] Không tạo được precompiled header: {process.stderr.strip()[:500]}", file=sys.stderr)
+            return False
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # Worker khác vừa tạo xong
+            if not (target / f"{PCH_HEADER}.gch").exists():
+                raise
+        return True
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def precompiled_header_flags(toolchain: Toolchain, flags: List[str]) -> List[str]:
+    """
+    Cờ bổ sung để trình biên dịch dùng bits/stdc++.h đã biên dịch sẵn (tạo ở lần gọi đầu tiên).
+    Trình biên dịch chỉ dùng file .gch khi cờ khớp với lúc tạo; nếu không, nó tìm tiếp header gốc như bình thường.
+    """
+    if not CPP_PCH_ENABLED:
+        return []
+    key = hashlib.sha256("\0".join([toolchain.fingerprint, *flags]).encode("utf-8")).hexdigest()[:16]
+    with _pch_lock:
+        if key not in _pch_dirs:
+            target = PCH_DIR / key
+            try:
+                ready = (target / f"{PCH_HEADER}.gch").exists() or _build_pch(toolchain, flags, target)
+            except OSError as e:
+                print(f"[toolchains] Không tạo được precompiled header: {e}", file=sys.stderr)
+                ready = False
+            _pch_dirs[key] = target if ready else None
+        pch_dir = _pch_dirs[key]
+    return ["-I", str(pch_dir)] if pch_dir is not None else []
@@ -0,0 +1,359 @@
+# grader/zygote.py
+"""
+Zygote cho bài nộp Python: một trình thông dịch đã khởi động sẵn (đã import các module chuẩn hay dùng),
+fork ra một tiến trình con mới cho mỗi lần chạy test case thay vì khởi động `python` từ đầu.
+
+Giao thức (Unix socket SOCK_SEQPACKET, mỗi lần chạy một kết nối):
+    máy chấm -> zygote : {"script", "args", "cwd", "cpu_seconds", "address_space"} + 3 fd (stdin, stdout, stderr) qua SCM_RIGHTS
+    zygote -> máy chấm : {"pid"}                              ngay sau khi fork
+    máy chấm -> zygote : b"kill"                             (tùy chọn) dừng tiến trình con
+    zygote -> máy chấm : {"status", "utime", "stime", "maxrss"} khi tiến trình con kết thúc (kết quả wait4)
+
+Zygote là cha của mọi tiến trình con nên chỉ zygote gửi tín hiệu và thu hồi chúng, không bao giờ kill nhầm pid
+đã được tái sử dụng. Zygote tự thoát (và kill các tiến trình con) khi tiến trình máy chấm đóng đầu ghi của lifeline.
+Mỗi tiến trình con có session, giới hạn tài nguyên và bộ nhớ (copy-on-write) riêng như khi chạy `python` mới.
+"""
+import os
+import sys
+import gc
+import json
+import types
+import signal
+import socket
+import shutil
+import tempfile
+import argparse
+import selectors
+import threading
+import subprocess
+import traceback
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows: không dùng zygote
+    resource = None
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Các module chuẩn hay được bài nộp dùng, import sẵn trong zygote
+PRELOAD_MODULES = ("math", "re", "collections", "itertools", "functools", "heapq", "bisect", "string",
+                   "decimal", "fractions", "random", "statistics", "datetime", "json", "typing", "io", "array")
+MESSAGE_MAX_BYTES = 64 * 1024
+
+
+def is_supported() -> bool:
+    return resource is not None and hasattr(socket, "send_fds") and hasattr(socket, "SOCK_SEQPACKET")
+
+
+# ==============================================================================
+# === PHÍA ZYGOTE (tiến trình `python -m grader.zygote`) ===
+# ==============================================================================
+
+def _exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code & 0xFF
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def _run_main(script: str):
+    """Chạy file như `python script.py`: biên dịch rồi exec trong một module __main__ mới."""
+    with open(script, "rb") as f:
+        source = f.read()
+    main = types.ModuleType("__main__")
+    main.__file__ = script
+    sys.modules["__main__"] = main
+    exec(compile(source, script, "exec"), main.__dict__)
+
+
+def _run_child(request: Dict[str, Any], fds: Tuple[int, int, int]):
+    """Chạy trong tiến trình con vừa fork: chuẩn bị môi trường như `python script.py` rồi chạy bài nộp."""
+    code = 1
+    try:
+        os.setsid()
+        signal.set_wakeup_fd(-1)
+        signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+        for target, fd in enumerate(fds):
+            os.dup2(fd, target)
+        # Đóng socket, lifeline và các fd khác của zygote (các object tương ứng vẫn được giữ tham chiếu)
+        os.closerange(3, os.sysconf("SC_OPEN_MAX") if hasattr(os, "sysconf") else 1024)
+
+        if request.get("cpu_seconds"):
+            seconds = request["cpu_seconds"]
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+        if request.get("address_space"):
+            resource.setrlimit(resource.RLIMIT_AS, (request["address_space"], request["address_space"]))
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+
+        script = request["script"]
+        sys.argv = [script, *request.get("args", [])]
+        sys.path[0] = os.path.dirname(os.path.abspath(script))
+        # Trạng thái random được kế thừa từ zygote: seed lại để mỗi lần chạy khác nhau như tiến trình mới
+        if "random" in sys.modules:
+            sys.modules["random"].seed()
+
+        try:
+            _run_main(script)
+            code = 0
+        except SystemExit as e:
+            code = _exit_code(e)
+        except BaseException as e:
+            # Bỏ các frame của zygote (_run_child, _run_main) để traceback giống khi chạy `python script.py`
+            tb = e.__traceback__
+            for _ in range(2):
+                tb = tb.tb_next if tb is not None and tb.tb_next is not None else tb
+            traceback.print_exception(type(e), e, tb)
+            code = 1
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+    except BaseException:
+        try:
+            traceback.print_exc()
+        except Exception:
+            pass
+    finally:
+        os._exit(code)
+
+
+def _kill_child(pid: int):
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        # Tiến trình con có thể chưa kịp setsid
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def zygote_main(listener_fd: int, lifeline_fd: int):
+    for name in PRELOAD_MODULES:
+        try:
+            __import__(name)
+        except ImportError:
+            pass
+    # Lần biên dịch đầu tiên trong một tiến trình tốn vài ms khởi tạo: làm sẵn trong zygote
+    exec(compile(b"pass\n", "<zygote>", "exec"), {})
+    # Các object đã có không bao giờ được GC quét trong tiến trình con, tránh sao chép trang nhớ (copy-on-write)
+    gc.collect()
+    gc.freeze()
+
+    listener = socket.socket(fileno=listener_fd)
+    wakeup_r, wakeup_w = socket.socketpair()
+    wakeup_r.setblocking(False)
+    wakeup_w.setblocking(False)
+    signal.set_wakeup_fd(wakeup_w.fileno())
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ, "accept")
+    selector.register(wakeup_r, selectors.EVENT_READ, "sigchld")
+    selector.register(lifeline_fd, selectors.EVENT_READ, "lifeline")
+    children: Dict[int, socket.socket] = {}
+    running: Dict[socket.socket, int] = {}
+
+    def reap():
+        while children:
+            try:
+                exited = os.waitid(os.P_ALL, 0, os.WEXITED | os.WNOHANG | os.WNOWAIT)
+            except ChildProcessError:
+                return
+            if exited is None:
+                return
+            pid = exited.si_pid
+            # Dọn các tiến trình con còn sót lại của bài nộp trước khi thu hồi (pid chưa thể bị tái sử dụng)
+            _kill_child(pid)
+            _, status, usage = os.wait4(pid, 0)
+            conn = children.pop(pid, None)
+            if conn is None:
+                continue
+            running.pop(conn, None)
+            try:
+                conn.send(json.dumps({"status": status, "utime": usage.ru_utime, "stime": usage.ru_stime,
+                                      "maxrss": usage.ru_maxrss}).encode("utf-8"))
+            except OSError:
+                pass
+            try:
+                selector.unregister(conn)
+            except KeyError:
+                # Máy chấm đã đóng kết nối trước đó
+                pass
+            conn.close()
+
+    while True:
+        for key, _ in selector.select():
+            kind = key.data
+            if kind == "lifeline":
+                for pid in list(children):
+                    _kill_child(pid)
+                return
+            if kind == "accept":
+                conn, _ = listener.accept()
+                selector.register(conn, selectors.EVENT_READ, "conn")
+                continue
+            if kind == "sigchld":
+                try:
+                    while wakeup_r.recv(4096):
+                        pass
+                except (BlockingIOError, OSError):
+                    pass
+                continue
+
+            conn = key.fileobj
+            if conn in running:
+                # Kết nối của một tiến trình đang chạy: yêu cầu kill, hoặc máy chấm đã đóng kết nối
+                data = conn.recv(MESSAGE_MAX_BYTES)
+                _kill_child(running[conn])
+                if not data:
+                    selector.unregister(conn)
+                continue
+
+            try:
+                message, fds, _, _ = socket.recv_fds(conn, MESSAGE_MAX_BYTES, 3)
+            except OSError:
+                message, fds = b"", []
+            if not message or len(fds) != 3:
+                for fd in fds:
+                    os.close(fd)
+                selector.unregister(conn)
+                conn.close()
+                continue
+
+            sys.stdout.flush()
+            sys.stderr.flush()
+            request = json.loads(message)
+            pid = os.fork()
+            if pid == 0:
+                _run_child(request, tuple(fds))
+            for fd in fds:
+                os.close(fd)
+            children[pid] = conn
+            running[conn] = pid
+            conn.send(json.dumps({"pid": pid}).encode("utf-8"))
+        reap()
+
+
+# ==============================================================================
+# === PHÍA MÁY CHẤM (trong tiến trình judge_backend) ===
+# ==============================================================================
+
+class ZygoteChild:
+    """Một lần chạy bài nộp trong zygote; `kill` và `wait` an toàn khi gọi từ hai thread khác nhau."""
+
+    def __init__(self, conn: socket.socket, pid: int):
+        self.conn = conn
+        self.pid = pid
+
+    def kill(self):
+        try:
+            self.conn.send(b"kill")
+        except OSError:
+            pass
+
+    def wait(self) -> Tuple[int, float, int]:
+        """Chờ tiến trình con kết thúc, trả về (wait status, thời gian CPU (ms), bộ nhớ đỉnh (KB))."""
+        try:
+            message = self.conn.recv(MESSAGE_MAX_BYTES)
+        finally:
+            self.conn.close()
+        if not message:
+            raise RuntimeError("Zygote Python đã dừng đột ngột.")
+        result = json.loads(message)
+        return result["status"], (result["utime"] + result["stime"]) * 1000, result["maxrss"]
+
+
+class PythonZygote:
+    """Handle tới tiến trình zygote của máy chấm này, khởi động (lại) khi cần."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        self._directory: Optional[str] = None
+        self._lifeline: Optional[int] = None
+
+    @property
+    def socket_path(self) -> str:
+        return os.path.join(self._directory, "zygote.sock")
+
+    def _start(self):
+        self._stop_locked()
+        self._directory = tempfile.mkdtemp(prefix="zygote_")
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        listener.bind(self.socket_path)
+        listener.listen(128)
+        lifeline_r, self._lifeline = os.pipe()
+        env = os.environ.copy()
+        env['PYTHONUTF8'] = '1'
+        try:
+            self._process = subprocess.Popen(
+                [sys.executable, "-m", "grader.zygote", "--fd", str(listener.fileno()),
+                 "--lifeline", str(lifeline_r)],
+                pass_fds=(listener.fileno(), lifeline_r),
+                stdin=subprocess.DEVNULL,
+                cwd=str(PROJECT_ROOT),
+                env=env,
+            )
+        finally:
+            listener.close()
+            os.close(lifeline_r)
+
+    def _stop_locked(self):
+        if self._lifeline is not None:
+            os.close(self._lifeline)
+            self._lifeline = None
+        if self._process is not None:
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+            self._process = None
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
+
+    def _connect(self) -> socket.socket:
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            path = self.socket_path
+        # Socket đã listen trước khi khởi động zygote nên có thể kết nối ngay, kết nối chờ trong backlog
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        conn.connect(path)
+        return conn
+
+    def spawn(self, script: str, cwd: Optional[str], stdin_fd: int, stdout_fd: int, stderr_fd: int,
+              cpu_seconds: Optional[int] = None, address_space: Optional[int] = None,
+              args: Sequence[str] = ()) -> ZygoteChild:
+        conn = self._connect()
+        try:
+            request = {"script": script, "args": list(args), "cwd": cwd, "cpu_seconds": cpu_seconds,
+                       "address_space": address_space}
+            socket.send_fds(conn, [json.dumps(request).encode("utf-8")], [stdin_fd, stdout_fd, stderr_fd])
+            reply = conn.recv(MESSAGE_MAX_BYTES)
+            if not reply:
+                raise RuntimeError("Zygote Python không phản hồi.")
+            return ZygoteChild(conn, json.loads(reply)["pid"])
+        except BaseException:
+            conn.close()
+            raise
+
+    def stop(self):
+        with self._lock:
+            self._stop_locked()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zygote cho bài nộp Python (được khởi động bởi máy chấm backend).")
+    parser.add_argument("--fd", type=int, required=True, help="File descriptor của Unix socket đang listen.")
+    parser.add_argument("--lifeline", type=int, required=True,
+                        help="File descriptor đầu đọc của pipe; zygote thoát khi đầu ghi bị đóng.")
+    args = parser.parse_args()
+    zygote_main(args.fd, args.lifeline)
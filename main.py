@@ -1,10 +1,12 @@
 # main.py
 import asyncio
+import gc
 import platform
 import os
 import json
 import uuid
 import shutil
+import hashlib
 import traceback
 import sys
 import pathlib
@@ -12,11 +14,11 @@ import tempfile
 import subprocess
 import io
 import pandas as pd
-from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Path
+from fastapi import FastAPI, HTTPException, Query, UploadFile, File, Form, Path, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field, ValidationError
-from typing import List, Optional, Any, Dict
+from typing import List, Optional, Any, Dict, Callable
 from sqlalchemy.orm import Session
 from fastapi import Depends, status
 from fastapi.security import OAuth2PasswordRequestForm
@@ -31,6 +33,12 @@ from urllib.parse import quote
 
 # Tích hợp module đọc file
 from file_parser import extract_text
+from grader import service as grader_service
+from grader import testcase_store
+from grader.checkers import is_program_checker
+from submission_queue import SubmissionQueue, QueueFullError, QueueClosedError, QUEUE_FULL_RETRY_AFTER
+from submission_events import SubmissionEventHub, is_terminal_event, SUBMISSION_EVENTS_KEEPALIVE
+from problem_catalog import ProblemCatalog, project_fields, compact_problems, load_snapshot, save_snapshot
 
 
 
@@ -81,69 +89,123 @@ load_tags_from_file()
 
 # --- CẬP NHẬT LOGIC TẢI BÀI TẬP ---
 PROBLEMS_FILE = "problems.json"
+# Snapshot nhị phân của problems.json đã chuẩn hóa, tự được tạo lại khi problems.json thay đổi
+PROBLEMS_SNAPSHOT_FILE = "problems.snapshot"
 LOADED_ALL_PROBLEMS = []
+PROBLEM_CATALOG = ProblemCatalog()
+# Tem phiên bản của kho bài tập tại lần đồng bộ gần nhất (xem sync_problem_catalog)
+CATALOG_STORE_VERSION = None
+
+
+def _standardize_db_exercise(ex_obj: models.Exercise) -> Dict[str, Any]:
+    """
+    Chuẩn hóa một Exercise lưu trong DB về cùng định dạng với các bài trong problems.json.
+    Bài Backend được chấm bằng máy chấm backend (giữ test case, checker, output_limit);
+    bản ghi cũ không khai báo rõ loại nhưng chỉ có test case frontend vẫn được coi là bài Frontend.
+    """
+    # SỬA LỖI: Chuyển đổi đối tượng Pydantic thành dict một cách an toàn
+    ex_dict = ex_obj.model_dump()
+    frontend_testcases = ex_dict.get("frontend_testcases") or []
+    backend_testcases = ex_dict.get("backend_testcases") or []
+    is_frontend = (ex_obj.exercise_type == models.ExerciseType.FRONTEND
+                   or (bool(frontend_testcases) and not backend_testcases))
+
+    # Tạo một dict chuẩn hóa, đảm bảo có 'title'
+    # (model Exercise đã yêu cầu 'title', nên ex_dict chắc chắn có)
+    return {
+        "id": ex_dict.get("id"),
+        "title": ex_dict.get("title"),
+        "name": ex_dict.get("title"),  # Dùng title cho cả name để nhất quán
+        "description": ex_dict.get("description"),
+        "level": ex_dict.get("level"),
+        "is_frontend": is_frontend,
+        "exercise_type": "frontend" if is_frontend else "backend",
+        "group": {"name": "Bài tập Frontend" if is_frontend else "Bài tập Backend"},
+        "sub_group": None,
+        # Giữ cả hai key testcases để tương thích
+        "testcases": frontend_testcases if is_frontend else [],
+        "frontend_testcases": frontend_testcases if is_frontend else [],
+        "backend_testcases": [] if is_frontend else backend_testcases,
+        "checker": ex_dict.get("checker"),
+        "output_limit": ex_dict.get("output_limit"),
+    }
 
 
 def load_and_merge_all_problems():
     """
     Tải và chuẩn hóa dữ liệu từ tất cả các nguồn.
     """
-    global LOADED_ALL_PROBLEMS
+    global LOADED_ALL_PROBLEMS, PROBLEM_CATALOG, CATALOG_STORE_VERSION
     all_problems = []
+    store_version = None
 
-    # 1. Tải các bài tập Backend từ problems.json
+    # 1. Tải các bài tập Backend từ snapshot nhị phân (nếu còn khớp) hoặc từ problems.json
     try:
-        with open(PROBLEMS_FILE, "r", encoding="utf-8") as f:
-            general_problems = json.load(f)
-            for prob in general_problems:
-                # Đảm bảo các trường cần thiết tồn tại
-                prob['is_frontend'] = False
-                if 'title' not in prob and 'name' in prob:
-                    prob['title'] = prob['name']
-            all_problems.extend(general_problems)
-        print(f"Đã tải thành công {len(general_problems)} bài tập chung từ {PROBLEMS_FILE}")
+        general_problems = load_snapshot(PROBLEMS_SNAPSHOT_FILE, PROBLEMS_FILE)
+        if general_problems is not None:
+            print(f"Đã tải thành công {len(general_problems)} bài tập chung từ snapshot {PROBLEMS_SNAPSHOT_FILE}")
+        else:
+            with open(PROBLEMS_FILE, "r", encoding="utf-8") as f:
+                general_problems = json.load(f)
+                for prob in general_problems:
+                    # Đảm bảo các trường cần thiết tồn tại
+                    prob['is_frontend'] = False
+                    if 'title' not in prob and 'name' in prob:
+                        prob['title'] = prob['name']
+            general_problems = compact_problems(general_problems)
+            print(f"Đã tải thành công {len(general_problems)} bài tập chung từ {PROBLEMS_FILE}")
+            try:
+                save_snapshot(general_problems, PROBLEMS_SNAPSHOT_FILE, PROBLEMS_FILE)
+            except OSError as e:
+                print(f"Không thể ghi snapshot {PROBLEMS_SNAPSHOT_FILE}: {e}")
+        all_problems.extend(general_problems)
     except Exception as e:
         print(f"Lỗi khi tải {PROBLEMS_FILE}: {e}")
 
-    # 2. Tải và chuẩn hóa các bài tập Frontend từ DB
+    # 2. Tải và chuẩn hóa các bài tập (chủ yếu là Frontend) từ DB
     try:
-        frontend_exercises = database.get_all_exercises()  # Hàm này trả về List[Exercise]
-        standardized_fe_problems = []
-        for ex_obj in frontend_exercises:
-            # SỬA LỖI: Chuyển đổi đối tượng Pydantic thành dict một cách an toàn
-            ex_dict = ex_obj.model_dump()
-
-            # Tạo một dict chuẩn hóa, đảm bảo có 'title'
-            # (model Exercise đã yêu cầu 'title', nên ex_dict chắc chắn có)
-            standardized_prob = {
-                "id": ex_dict.get("id"),
-                "title": ex_dict.get("title"),
-                "name": ex_dict.get("title"),  # Dùng title cho cả name để nhất quán
-                "description": ex_dict.get("description"),
-                "level": ex_dict.get("level"),
-                "is_frontend": True,
-                "exercise_type": "frontend",
-                "group": {"name": "Bài tập Frontend"},
-                "sub_group": None,
-                # Giữ cả hai key testcases để tương thích
-                "testcases": ex_dict.get("frontend_testcases", []),
-                "frontend_testcases": ex_dict.get("frontend_testcases", []),
-                "backend_testcases": []
-            }
-            standardized_fe_problems.append(standardized_prob)
+        store_version = database.get_exercises_version()
+        db_exercises = database.get_all_exercises()  # Hàm này trả về List[Exercise]
+        standardized_db_problems = [_standardize_db_exercise(ex_obj) for ex_obj in db_exercises]
 
-        all_problems.extend(standardized_fe_problems)
-        print(f"Đã tải và chuẩn hóa thành công {len(frontend_exercises)} bài tập Frontend từ DB")
+        all_problems.extend(standardized_db_problems)
+        print(f"Đã tải và chuẩn hóa thành công {len(db_exercises)} bài tập từ DB")
     except Exception as e:
-        print(f"Lỗi khi tải hoặc chuẩn hóa bài tập Frontend: {e}")
+        print(f"Lỗi khi tải hoặc chuẩn hóa bài tập từ DB: {e}")
 
-    LOADED_ALL_PROBLEMS = all_problems
+    # Dựng danh mục có chỉ mục một lần để các endpoint tra cứu O(1) thay vì duyệt tuyến tính
+    PROBLEM_CATALOG = ProblemCatalog(all_problems)
+    LOADED_ALL_PROBLEMS = PROBLEM_CATALOG.problems
+    CATALOG_STORE_VERSION = store_version
     print(f"Tổng số bài tập đã gộp: {len(LOADED_ALL_PROBLEMS)}")
 
 
+def sync_problem_catalog():
+    """
+    Đồng bộ danh mục của worker hiện tại với kho bài tập.
+    Chỉ tốn một truy vấn tem phiên bản khi kho không đổi; khi một worker khác đã ghi,
+    chỉ các bài tập thay đổi được đọc và cập nhật vào danh mục (không tải lại problems.json).
+    """
+    global CATALOG_STORE_VERSION
+    try:
+        if database.get_exercises_version() == CATALOG_STORE_VERSION:
+            return
+
+        changed_exercises, CATALOG_STORE_VERSION = database.get_exercises_changed_since(CATALOG_STORE_VERSION)
+        changed = sum(PROBLEM_CATALOG.upsert(_standardize_db_exercise(ex_obj))
+                      for ex_obj in changed_exercises)
+        if changed:
+            print(f"Đã đồng bộ {changed} bài tập thay đổi từ kho bài tập vào danh mục")
+    except Exception as e:
+        print(f"Lỗi khi đồng bộ danh mục bài tập: {e}")
+
+
 
 # Chạy hàm tải dữ liệu khi khởi động
 load_and_merge_all_problems()
+# Khi chạy gunicorn với --preload, danh mục được dựng một lần ở tiến trình master và chia sẻ
+# copy-on-write cho các worker; freeze để GC không chạm vào (và sao chép) các trang nhớ này.
+gc.freeze()
 
 # Khởi tạo ứng dụng FastAPI
 app = FastAPI(
@@ -584,9 +646,11 @@ def batch_create_users_from_file(
 @app.post("/analyze_cv_comprehensive", response_model=schemas.ComprehensiveCVAnalysisResponse,
           summary="Phân tích CV toàn diện: trích xuất, gợi ý VÀ TẠO FILE PDF",
           tags=["Core CV Analysis"],
-          dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT]))])
+          dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT])),
+                        Depends(sync_problem_catalog)])
 async def analyze_cv_comprehensive_endpoint(
-        file: UploadFile = File(..., description="File CV định dạng .pdf, .docx, hoặc .txt")
+        file: UploadFile = File(..., description="File CV định dạng .pdf, .docx, hoặc .txt"),
+        expand_problems: bool = Query(False, description="Trả về bài tập gợi ý đầy đủ thay vì bản tóm tắt gọn")
 ):
     # 1. Đọc và trích xuất văn bản từ file
     with tempfile.TemporaryDirectory() as temp_dir:
@@ -654,10 +718,13 @@ async def analyze_cv_comprehensive_endpoint(
                                            GEMINI_API_KEY) if missing_skills else asyncio.sleep(0, result="")
 
     suggested_level = gemini_suggestions_dict.get("level_goi_y")
-    final_problems = [p for p in LOADED_ALL_PROBLEMS if p.get("level") == suggested_level and not p.get("is_frontend")]
+    final_problems = PROBLEM_CATALOG.by_level(suggested_level)
     if is_frontend_profile(detailed_cv_info_obj):
-        final_problems.extend([p for p in LOADED_ALL_PROBLEMS if p.get("is_frontend")])
+        final_problems.extend(PROBLEM_CATALOG.frontend_problems())
     unique_problems = list({p['id']: p for p in final_problems}.values())
+    if not expand_problems:
+        # Mặc định chỉ trả bản tóm tắt gọn (không lộ testcases ẩn, giảm kích thước payload)
+        unique_problems = PROBLEM_CATALOG.summaries(unique_problems)
 
     learning_path = await learning_path_task
 
@@ -699,10 +766,11 @@ async def download_cv_pdf(filename: str):
     raise HTTPException(status_code=404, detail="Không tìm thấy file.")
 
 @app.get("/exercises/{exercise_id}", summary="Lấy thông tin chi tiết bài tập theo ID từ danh sách tổng hợp",
-         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT]))])
+         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT])),
+                       Depends(sync_problem_catalog)])
 async def get_exercise_info_by_id_endpoint(
         exercise_id: str = Path(..., description="ID của bài tập cần lấy thông tin")):
-    exercise = next((prob for prob in LOADED_ALL_PROBLEMS if str(prob.get('id')) == exercise_id), None)
+    exercise = PROBLEM_CATALOG.get(exercise_id)
 
     if not exercise:
         raise HTTPException(status_code=404, detail=f"Không tìm thấy bài tập với ID: {exercise_id}")
@@ -711,26 +779,122 @@ async def get_exercise_info_by_id_endpoint(
     return exercise
 
 
-@app.get("/get_all_problems", summary="Lấy toàn bộ danh sách bài tập",
-         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT]))])
-async def get_all_problems_endpoint():
-    return {"count": len(LOADED_ALL_PROBLEMS), "results": LOADED_ALL_PROBLEMS}
+def _parse_fields_param(fields: Optional[str]) -> Optional[tuple]:
+    if not fields:
+        return None
+    return tuple(sorted({f.strip() for f in fields.split(",") if f.strip()})) or None
+
+
+def _project_problems(problems: List[Dict[str, Any]], view: str, fields: Optional[tuple]) -> List[Dict[str, Any]]:
+    """
+    Chọn dạng trả về cho danh sách bài tập: mặc định là bản tóm tắt gọn tính sẵn,
+    'full' trả về đầy đủ, còn `fields` cho phép chọn trường cụ thể từ bản đầy đủ.
+    """
+    if fields:
+        return [project_fields(p, fields) for p in problems]
+    if view == "full":
+        return problems
+    return PROBLEM_CATALOG.summaries(problems)
+
+
+def _cached_listing_response(request: Request, cache_key: tuple, problems_source, offset: int,
+                             limit: Optional[int], fields: Optional[tuple], view: str) -> Response:
+    """
+    Trả về một trang danh sách bài tập đã được mã hóa JSON sẵn trong danh mục,
+    kèm ETag mạnh và hỗ trợ 304 Not Modified qua header If-None-Match.
+    """
+
+    def build_payload():
+        problems = problems_source()
+        page = problems[offset:offset + limit] if limit is not None else problems[offset:]
+        next_offset = offset + len(page)
+        return {
+            "count": len(problems),
+            "offset": offset,
+            "limit": limit,
+            "next_offset": next_offset if next_offset < len(problems) else None,
+            "results": _project_problems(page, view, fields),
+        }
+
+    body, etag = PROBLEM_CATALOG.encoded(cache_key + (offset, limit, fields, view), build_payload)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        client_etags = {tag.strip() for tag in if_none_match.split(",")}
+        if etag in client_etags or "*" in client_etags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/get_all_problems", summary="Lấy toàn bộ danh sách bài tập (hỗ trợ phân trang và chọn trường)",
+         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT])),
+                       Depends(sync_problem_catalog)])
+async def get_all_problems_endpoint(
+        request: Request,
+        offset: int = Query(0, ge=0, description="Vị trí bắt đầu (dùng giá trị next_offset của trang trước)"),
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Số bài tập tối đa mỗi trang"),
+        view: str = Query("summary", pattern="^(summary|full)$",
+                          description="'summary' (mặc định, không kèm testcases) hoặc 'full'"),
+        fields: Optional[str] = Query(None, description="Danh sách trường cần trả về, phân tách bằng dấu phẩy")):
+    return _cached_listing_response(request, ("all",), lambda: PROBLEM_CATALOG.problems,
+                                    offset, limit, _parse_fields_param(fields), view)
+
+
+@app.get("/problems/search", summary="Tìm kiếm bài tập theo tên, mã, mô tả và nhóm (không phân biệt dấu)",
+         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT])),
+                       Depends(sync_problem_catalog)])
+async def search_problems_endpoint(
+        q: str = Query(..., min_length=1, max_length=200, description="Từ khóa tìm kiếm, ví dụ 'tinh tong'"),
+        limit: int = Query(20, ge=1, le=100, description="Số kết quả tối đa"),
+        view: str = Query("summary", pattern="^(summary|full)$",
+                          description="'summary' (mặc định, không kèm testcases) hoặc 'full'"),
+        fields: Optional[str] = Query(None, description="Danh sách trường cần trả về, phân tách bằng dấu phẩy")):
+    hits = PROBLEM_CATALOG.search(q, limit)
+    projected = _project_problems([p for p, _ in hits], view, _parse_fields_param(fields))
+    results = [dict(p, score=round(score, 4)) for p, (_, score) in zip(projected, hits)]
+    return {"query": q, "count": len(results), "results": results}
 
 
 @app.get("/get_problems_by_level", summary="Lấy danh sách bài tập lọc theo level",
-         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT]))])
+         dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT])),
+                       Depends(sync_problem_catalog)])
 async def get_problems_by_level_endpoint(
-        level: int = Query(..., ge=1, le=5, description="Lọc bài tập theo mức độ khó")):
-    filtered = [p for p in LOADED_ALL_PROBLEMS if p.get("level") == level and not p.get("is_frontend")]
-    return {"count": len(filtered), "results": filtered}
+        request: Request,
+        level: int = Query(..., ge=1, le=5, description="Lọc bài tập theo mức độ khó"),
+        offset: int = Query(0, ge=0, description="Vị trí bắt đầu (dùng giá trị next_offset của trang trước)"),
+        limit: Optional[int] = Query(None, ge=1, le=1000, description="Số bài tập tối đa mỗi trang"),
+        view: str = Query("summary", pattern="^(summary|full)$",
+                          description="'summary' (mặc định, không kèm testcases) hoặc 'full'"),
+        fields: Optional[str] = Query(None, description="Danh sách trường cần trả về, phân tách bằng dấu phẩy")):
+    return _cached_listing_response(request, ("level", level), lambda: PROBLEM_CATALOG.by_level(level),
+                                    offset, limit, _parse_fields_param(fields), view)
+
+
+def _prepare_exercise_checker(exercise: models.Exercise):
+    """Biên dịch checker dạng chương trình của bài tập ngay khi tạo bài tập; checker lỗi thì từ chối tạo (400)."""
+    if not is_program_checker(exercise.checker):
+        return
+    try:
+        if GRADER_POOL is not None:
+            GRADER_POOL.call("prepare_checker", {"checker": exercise.checker})
+        else:
+            from grader import judge_backend
+            judge_backend.prepare_checker(exercise.checker)
+    except (grader_service.GraderServiceError, RuntimeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Checker của bài tập không hợp lệ: {e}")
 
 
 @app.post("/create-exercise", summary="Tạo bài tập mới",
           dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER]))])
 def create_exercise_endpoint(exercise: models.Exercise,
                              current_user: models.User = Depends(auth.get_current_active_user)):
+    _prepare_exercise_checker(exercise)
     try:
         exercise_id = database.add_exercise(exercise)
+        # Cập nhật ngay danh mục của worker này; các worker khác nhận thay đổi qua sync_problem_catalog
+        PROBLEM_CATALOG.upsert(_standardize_db_exercise(exercise))
         return {"message": "Bài tập đã tạo thành công!", "id": exercise_id, "title": exercise.title}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi server khi tạo bài tập: {str(e)}")
@@ -739,6 +903,43 @@ def create_exercise_endpoint(exercise: models.Exercise,
 GRADER_FRONTEND_SCRIPT_PATH = pathlib.Path(__file__).parent / "grader" / "judge.py"
 GRADER_BACKEND_SCRIPT_PATH = pathlib.Path(__file__).parent / "grader" / "judge_backend.py"
 
+# Pool các tiến trình chấm bài sống lâu dài (xem grader/service.py).
+# Nếu hệ điều hành không hỗ trợ, hệ thống quay về cách cũ: chạy một script Python mới cho mỗi bài nộp.
+GRADER_POOL: Optional[grader_service.GraderPool] = None
+# Hàng đợi giới hạn số bài được chấm đồng thời trong worker này (xem submission_queue.py)
+SUBMISSION_QUEUE = SubmissionQueue()
+# Sự kiện tiến độ (kết quả từng test case) của các job đang chấm trong worker này
+SUBMISSION_EVENTS = SubmissionEventHub(database.append_submission_event)
+# Chu kỳ (giây) đọc sự kiện từ DB khi job đang chạy ở worker khác
+SUBMISSION_EVENTS_POLL_INTERVAL = 0.5
+
+
+@app.on_event("startup")
+async def start_grader_service():
+    global GRADER_POOL
+    if not grader_service.is_supported():
+        print("Grader service không được hỗ trợ trên hệ điều hành này, dùng chế độ chạy script cho mỗi bài nộp.")
+        return
+    GRADER_POOL = grader_service.GraderPool()
+    await asyncio.to_thread(GRADER_POOL.start)
+
+
+@app.on_event("shutdown")
+async def stop_grader_service():
+    await SUBMISSION_QUEUE.close()
+    if GRADER_POOL is not None:
+        await asyncio.to_thread(GRADER_POOL.shutdown)
+
+
+@app.get("/grader/health", summary="Kiểm tra trạng thái các worker chấm bài", tags=["Grader"],
+         dependencies=[Depends(auth.role_required([models.Role.ADMIN]))])
+async def grader_health_endpoint():
+    if GRADER_POOL is None:
+        return {"mode": "script", "workers": [], "queue": SUBMISSION_QUEUE.stats}
+    workers = await asyncio.to_thread(GRADER_POOL.health_check)
+    return {"mode": "service", "healthy": all(w.get("healthy") for w in workers), "workers": workers,
+            "queue": SUBMISSION_QUEUE.stats}
+
 
 def _run_grader_script_sync(cmd: List[str], env: Optional[dict] = None) -> subprocess.CompletedProcess:
     current_env = os.environ.copy()
@@ -749,95 +950,211 @@ def _run_grader_script_sync(cmd: List[str], env: Optional[dict] = None) -> subpr
                           env=current_env)
 
 
-@app.post("/submit-solution", summary="Nộp bài giải và chấm điểm",
-          dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT]))])
-async def submit_solution_endpoint(exercise_id: int = Form(...), file: UploadFile = File(...)):
-    exercise_dict = next((p for p in LOADED_ALL_PROBLEMS if p.get('id') == exercise_id), None)
+async def _call_grader_service(request_type: str, payload: Dict[str, Any],
+                               on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    try:
+        return await asyncio.to_thread(GRADER_POOL.call, request_type, payload, on_event=on_event)
+    except grader_service.GraderServiceError as e:
+        raise HTTPException(status_code=500, detail=f"Máy chấm gặp lỗi: {e}")
+
+
+async def _grade_backend_with_script(user_code_path: str, testcase_dir: str,
+                                     time_limit: Optional[float], memory_limit: Optional[int],
+                                     checker: Optional[Any], output_limit: Optional[int]) -> List[Dict[str, Any]]:
+    cmd = [sys.executable, str(GRADER_BACKEND_SCRIPT_PATH.resolve()), user_code_path, "--testcase-dir", testcase_dir]
+    if time_limit:
+        cmd += ["--time-limit", str(time_limit)]
+    if memory_limit:
+        cmd += ["--memory-limit", str(memory_limit)]
+    if checker is not None:
+        cmd += ["--checker", json.dumps(checker)]
+    if output_limit:
+        cmd += ["--output-limit", str(output_limit)]
+
+    process_result = await asyncio.to_thread(_run_grader_script_sync, cmd)
+
+    if process_result.returncode != 0 and not process_result.stdout:
+        raise HTTPException(status_code=500,
+                            detail=f"Script chấm điểm backend thất bại. Lỗi: {process_result.stderr.strip()}")
+    try:
+        return json.loads(process_result.stdout)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500,
+                            detail=f"Không thể đọc JSON từ stdout của máy chấm backend. Output: {process_result.stdout}")
+
+
+async def _grade_frontend_with_script(exercise_file: str, user_code_path: str) -> List[Dict[str, Any]]:
+    # SỬA LỖI: Tạo file tạm cho output của máy chấm frontend
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as output_file:
+        results_output_path = pathlib.Path(output_file.name)
+
+    try:
+        # SỬA LỖI: Thêm tham số thứ 3 (output_file_path) vào lệnh cmd
+        cmd = [sys.executable, str(GRADER_FRONTEND_SCRIPT_PATH.resolve()), f"@{exercise_file}", user_code_path,
+               str(results_output_path)]
+        process_result = await asyncio.to_thread(_run_grader_script_sync, cmd)
+
+        if not results_output_path.exists():
+            raise HTTPException(status_code=500,
+                                detail=f"Máy chấm frontend không tạo file kết quả. Lỗi: {process_result.stderr.strip()}")
+        try:
+            with open(results_output_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            with open(results_output_path, 'r', encoding='utf-8') as f_err:
+                error_content = f_err.read()
+            raise HTTPException(
+                status_code=500,
+                detail=f"Không thể đọc JSON. Nội dung file lỗi: {error_content}"
+            )
+    finally:
+        if results_output_path.exists():
+            os.unlink(results_output_path)
+
+
+def _resolve_exercise(exercise_id: int):
+    """Tìm bài tập và model Exercise đã validate, kiểm tra bài tập có test case để chấm."""
+    exercise_dict = PROBLEM_CATALOG.get(exercise_id)
     if not exercise_dict:
         raise HTTPException(status_code=404, detail=f"Không tìm thấy bài tập với ID: {exercise_id}")
 
     try:
-        exercise = models.Exercise(**exercise_dict)
+        # Model Exercise chỉ được validate một lần cho mỗi bài tập, các lần nộp sau dùng lại
+        exercise = PROBLEM_CATALOG.derived(exercise_dict, "exercise_model", lambda: models.Exercise(**exercise_dict))
     except ValidationError as e:
         raise HTTPException(status_code=500, detail=f"Lỗi dữ liệu bài tập không hợp lệ: {e}")
 
-    user_code_path = None
-    results_output_path = None
-    results_data = []
+    if exercise.exercise_type == models.ExerciseType.BACKEND:
+        if not exercise.backend_testcases:
+            raise HTTPException(status_code=400, detail="Bài tập Backend này chưa có test case.")
+    elif exercise.exercise_type == models.ExerciseType.FRONTEND:
+        if not (exercise.frontend_testcases or exercise_dict.get("testcases")):
+            raise HTTPException(status_code=400, detail="Bài tập Frontend này chưa có test case.")
+    else:
+        raise HTTPException(status_code=400, detail="Loại bài tập không được hỗ trợ.")
 
-    try:
-        # Tạo file tạm cho bài nộp của người dùng
-        file_suffix = pathlib.Path(file.filename).suffix or ".tmp"
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_suffix, mode="wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            user_code_path = temp_file.name
-
-        # Logic chọn máy chấm và chuẩn bị tham số
-        if exercise.exercise_type == models.ExerciseType.BACKEND:
-            script_path = GRADER_BACKEND_SCRIPT_PATH
-            if not exercise.backend_testcases:
-                raise HTTPException(status_code=400, detail="Bài tập Backend này chưa có test case.")
-            test_cases_str = json.dumps([tc.model_dump() for tc in exercise.backend_testcases])
-            cmd = [sys.executable, str(script_path.resolve()), user_code_path, test_cases_str]
-
-        elif exercise.exercise_type == models.ExerciseType.FRONTEND:
-            script_path = GRADER_FRONTEND_SCRIPT_PATH
-            if not (exercise.frontend_testcases or exercise_dict.get("testcases")):
-                raise HTTPException(status_code=400, detail="Bài tập Frontend này chưa có test case.")
-
-            # SỬA LỖI: Tạo file tạm cho output của máy chấm frontend
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as output_file:
-                results_output_path = pathlib.Path(output_file.name)
-
-            exercise_json_str = json.dumps(exercise_dict)
-            # SỬA LỖI: Thêm tham số thứ 3 (output_file_path) vào lệnh cmd
-            cmd = [sys.executable, str(script_path.resolve()), exercise_json_str, user_code_path,
-                   str(results_output_path)]
+    return exercise_dict, exercise
 
-        else:
-            raise HTTPException(status_code=400, detail="Loại bài tập không được hỗ trợ.")
 
-        # Gọi script chấm bài
-        loop = asyncio.get_running_loop()
-        process_result = await loop.run_in_executor(None, _run_grader_script_sync, cmd)
+async def _save_uploaded_submission(file: UploadFile) -> str:
+    """Lưu file bài nộp vào một file tạm và trả về đường dẫn (người gọi chịu trách nhiệm xóa)."""
+    file_suffix = pathlib.Path(file.filename).suffix or ".tmp"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=file_suffix, mode="wb") as temp_file:
+        content = await file.read()
+        temp_file.write(content)
+        return temp_file.name
 
-        print(f"--- GRADER STDOUT ---\n{process_result.stdout}\n---------------------")
-        print(f"--- GRADER STDERR ---\n{process_result.stderr}\n---------------------")
 
-        if exercise.exercise_type == models.ExerciseType.BACKEND:
-            # Xử lý kết quả cho BACKEND
-            if process_result.returncode != 0 and not process_result.stdout:
-                raise HTTPException(status_code=500,
-                                    detail=f"Script chấm điểm backend thất bại. Lỗi: {process_result.stderr.strip()}")
-            try:
-                results_data = json.loads(process_result.stdout)
-            except json.JSONDecodeError:
-                raise HTTPException(status_code=500,
-                                    detail=f"Không thể đọc JSON từ stdout của máy chấm backend. Output: {process_result.stdout}")
-
-        elif exercise.exercise_type == models.ExerciseType.FRONTEND:
-            # Xử lý kết quả cho FRONTEND
-            if not results_output_path or not results_output_path.exists():
-                raise HTTPException(status_code=500,
-                                    detail=f"Máy chấm frontend không tạo file kết quả. Lỗi: {process_result.stderr.strip()}")
-            try:
-                with open(results_output_path, 'r', encoding='utf-8') as f:
-                    results_data = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                with open(results_output_path, 'r', encoding='utf-8') as f_err:
-                    error_content = f_err.read()
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"Không thể đọc JSON. Nội dung file lỗi: {error_content}"
-                )
+def _backend_testcase_dir(exercise_dict: Dict[str, Any], exercise: models.Exercise) -> str:
+    """Thư mục test case dạng file của bài tập (chỉ ghi ra đĩa một lần cho mỗi phiên bản bài tập)."""
+    return PROBLEM_CATALOG.derived(exercise_dict, "testcase_dir", lambda: testcase_store.store_backend_testcases(
+        exercise.id, [tc.model_dump() for tc in exercise.backend_testcases]))
 
-    finally:
-        if user_code_path and os.path.exists(user_code_path):
-            os.unlink(user_code_path)
-        if results_output_path and os.path.exists(results_output_path):
-            os.unlink(results_output_path)
 
+async def _grade_submission(exercise_dict: Dict[str, Any], exercise: models.Exercise, user_code_path: str,
+                            on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Chấm một bài nộp đã lưu trên đĩa bằng grader service (hoặc script nếu service không khả dụng).
+    on_event nhận kết quả từng test case ngay khi chấm xong (chỉ có ở chế độ grader service, gọi từ thread khác).
+    """
+    if exercise.exercise_type == models.ExerciseType.BACKEND:
+        testcase_dir = await asyncio.to_thread(_backend_testcase_dir, exercise_dict, exercise)
+        time_limit = exercise_dict.get("time_limit")
+        memory_limit = exercise_dict.get("memory_limit")
+        if GRADER_POOL is not None:
+            return await _call_grader_service("grade_backend", {
+                "user_code_path": user_code_path,
+                "testcase_dir": testcase_dir,
+                "time_limit": time_limit,
+                "memory_limit": memory_limit,
+                "checker": exercise.checker,
+                "output_limit": exercise.output_limit,
+            }, on_event)
+        return await _grade_backend_with_script(user_code_path, testcase_dir, time_limit, memory_limit,
+                                                exercise.checker, exercise.output_limit)
+
+    if GRADER_POOL is not None:
+        return await _call_grader_service("grade_frontend", {
+            "exercise": exercise_dict,
+            "zip_path": user_code_path,
+        }, on_event)
+    exercise_file = await asyncio.to_thread(
+        PROBLEM_CATALOG.derived, exercise_dict, "exercise_file",
+        lambda: testcase_store.store_exercise_file(exercise_dict))
+    return await _grade_frontend_with_script(exercise_file, user_code_path)
+
+
+# Tăng khi logic chấm thay đổi để bỏ qua các kết quả đã ghi nhớ từ phiên bản máy chấm cũ
+VERDICT_CACHE_VERSION = 7
+# Các trường của bài tập ảnh hưởng tới kết quả chấm
+JUDGE_INPUT_FIELDS = ("exercise_type", "backend_testcases", "frontend_testcases", "testcases",
+                      "time_limit", "memory_limit", "checker", "output_limit")
+# Các verdict phụ thuộc vào tải của máy chấm, không được ghi nhớ
+NON_DETERMINISTIC_STATUSES = {"TIME_LIMIT_EXCEEDED", "MEMORY_LIMIT_EXCEEDED", "GRADER_ERROR", "SKIPPED"}
+
+
+def _judge_inputs_hash(exercise_dict: Dict[str, Any]) -> str:
+    """Hash của test case và giới hạn chấm của bài tập (tính một lần cho mỗi phiên bản bài tập)."""
+    def compute() -> str:
+        judge_inputs = {field: exercise_dict.get(field) for field in JUDGE_INPUT_FIELDS}
+        encoded = json.dumps(judge_inputs, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    return PROBLEM_CATALOG.derived(exercise_dict, "judge_inputs_hash", compute)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_memoizable(results_data: List[Dict[str, Any]]) -> bool:
+    for r in results_data:
+        if not isinstance(r, dict) or r.get("status") in NON_DETERMINISTIC_STATUSES:
+            return False
+        # Lỗi của máy chấm frontend (timeout trình duyệt...) có thể không lặp lại
+        if str(r.get("result", "")).startswith("❌ Error"):
+            return False
+    return bool(results_data)
+
+
+async def _grade_submission_memoized(exercise_id: int, exercise_dict: Dict[str, Any], exercise: models.Exercise,
+                                     user_code_path: str,
+                                     on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                     slot: Optional[Callable[[], Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Như _grade_submission, nhưng bài nộp giống hệt (cùng bài tập, cùng test case, cùng nội dung file)
+    một bài đã chấm trước đó được trả lời ngay từ kết quả đã ghi nhớ.
+    slot: nếu có, chỉ chiếm chỗ trong hàng đợi chấm khi thực sự phải chấm (không có kết quả ghi nhớ).
+    """
+    source_hash = await asyncio.to_thread(_hash_file, user_code_path)
+    key_material = (f"{VERDICT_CACHE_VERSION}:{exercise_id}:{_judge_inputs_hash(exercise_dict)}:"
+                    f"{pathlib.Path(user_code_path).suffix}:{source_hash}")
+    key = hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+    cached = await asyncio.to_thread(database.get_cached_verdict, key)
+    if cached is not None:
+        print(f"Dùng lại kết quả chấm đã ghi nhớ cho bài tập {exercise_id}.")
+        if on_event is not None:
+            for index, result in enumerate(cached):
+                on_event({"type": "testcase", "index": index, "result": result})
+        return cached
+
+    if slot is None:
+        results_data = await _grade_submission(exercise_dict, exercise, user_code_path, on_event)
+    else:
+        async with slot():
+            results_data = await _grade_submission(exercise_dict, exercise, user_code_path, on_event)
+    if _is_memoizable(results_data):
+        await asyncio.to_thread(database.store_cached_verdict, key, exercise_id, results_data)
+    return results_data
+
+
+def _build_submission_result(exercise_id: int, exercise: models.Exercise,
+                             results_data: List[Dict[str, Any]]) -> Dict[str, Any]:
     passed_count = sum(1 for r in results_data if r.get("status") == "ACCEPTED" or (
             isinstance(r, dict) and r.get("result", "").strip() == "✅ Passed"))
     total_tests = len(results_data)
@@ -849,6 +1166,199 @@ async def submit_solution_endpoint(exercise_id: int = Form(...), file: UploadFil
         "details": results_data
     }
 
+
+def _queue_unavailable(e: Exception) -> HTTPException:
+    """Chuyển lỗi hàng đợi thành HTTP 429 (quá tải) hoặc 503 (đang dừng)."""
+    if isinstance(e, QueueFullError):
+        return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=str(e),
+                             headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)})
+    return HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e),
+                         headers={"Retry-After": str(QUEUE_FULL_RETRY_AFTER)})
+
+
+@app.post("/submit-solution", summary="Nộp bài giải và chấm điểm",
+          dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT])),
+                        Depends(sync_problem_catalog)])
+async def submit_solution_endpoint(exercise_id: int = Form(...), file: UploadFile = File(...)):
+    exercise_dict, exercise = _resolve_exercise(exercise_id)
+
+    user_code_path = None
+    try:
+        # Từ chối sớm khi quá tải, trước khi đọc file bài nộp
+        SUBMISSION_QUEUE.check_capacity()
+        user_code_path = await _save_uploaded_submission(file)
+        # Dùng chung giới hạn số bài chấm đồng thời với hàng đợi /submissions
+        results_data = await _grade_submission_memoized(exercise_id, exercise_dict, exercise, user_code_path,
+                                                        slot=SUBMISSION_QUEUE.slot)
+    except (QueueFullError, QueueClosedError) as e:
+        raise _queue_unavailable(e)
+    finally:
+        if user_code_path and os.path.exists(user_code_path):
+            os.unlink(user_code_path)
+
+    return _build_submission_result(exercise_id, exercise, results_data)
+
+
+@app.post("/submissions", status_code=status.HTTP_202_ACCEPTED, tags=["Submissions"],
+          summary="Nộp bài vào hàng đợi chấm, trả về job id ngay lập tức",
+          dependencies=[Depends(sync_problem_catalog)])
+async def create_submission_job_endpoint(
+        exercise_id: int = Form(...), file: UploadFile = File(...),
+        current_user: models.User = Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER,
+                                                                 models.Role.STUDENT]))):
+    exercise_dict, exercise = _resolve_exercise(exercise_id)
+    try:
+        SUBMISSION_QUEUE.check_capacity()
+    except (QueueFullError, QueueClosedError) as e:
+        raise _queue_unavailable(e)
+
+    job_id = uuid.uuid4().hex
+    user_code_path = await _save_uploaded_submission(file)
+
+    async def run_job():
+        await asyncio.to_thread(database.update_submission_job, job_id, "running")
+        await SUBMISSION_EVENTS.publish(job_id, {"type": "status", "status": "running"})
+        try:
+            results_data = await _grade_submission_memoized(
+                exercise_id, exercise_dict, exercise, user_code_path,
+                on_event=lambda event: SUBMISSION_EVENTS.publish_threadsafe(job_id, event))
+            result = _build_submission_result(exercise_id, exercise, results_data)
+            await asyncio.to_thread(database.update_submission_job, job_id, "completed", result)
+            await SUBMISSION_EVENTS.publish(job_id, {"type": "summary", "status": "completed", "result": result})
+        except HTTPException as e:
+            await asyncio.to_thread(database.update_submission_job, job_id, "failed", None, str(e.detail))
+            await SUBMISSION_EVENTS.publish(job_id, {"type": "error", "status": "failed", "error": str(e.detail)})
+        except Exception as e:
+            traceback.print_exc()
+            error = f"{type(e).__name__}: {e}"
+            await asyncio.to_thread(database.update_submission_job, job_id, "failed", None, error)
+            await SUBMISSION_EVENTS.publish(job_id, {"type": "error", "status": "failed", "error": error})
+
+    def cleanup():
+        SUBMISSION_EVENTS.close(job_id)
+        if os.path.exists(user_code_path):
+            os.unlink(user_code_path)
+
+    try:
+        await asyncio.to_thread(database.create_submission_job, job_id, exercise_id, current_user.username)
+        SUBMISSION_EVENTS.open(job_id)
+        SUBMISSION_QUEUE.enqueue(job_id, run_job, on_finished=cleanup)
+    except (QueueFullError, QueueClosedError) as e:
+        cleanup()
+        await asyncio.to_thread(database.update_submission_job, job_id, "failed", None, str(e))
+        raise _queue_unavailable(e)
+    except Exception:
+        cleanup()
+        raise
+
+    return {"job_id": job_id, "status": "queued", "status_url": f"/submissions/{job_id}",
+            "events_url": f"/submissions/{job_id}/events", "queue": SUBMISSION_QUEUE.stats}
+
+
+async def _get_visible_submission_job(job_id: str, current_user: models.User) -> Dict[str, Any]:
+    job = await asyncio.to_thread(database.get_submission_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job chấm bài: {job_id}")
+    # Sinh viên chỉ được xem bài nộp của chính mình
+    if current_user.role == models.Role.STUDENT.value and job["owner"] != current_user.username:
+        raise HTTPException(status_code=404, detail=f"Không tìm thấy job chấm bài: {job_id}")
+    return job
+
+
+@app.get("/submissions/{job_id}", tags=["Submissions"], summary="Xem trạng thái và kết quả của một job chấm bài")
+async def get_submission_job_endpoint(
+        job_id: str = Path(..., description="ID của job chấm bài"),
+        current_user: models.User = Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER,
+                                                                 models.Role.STUDENT]))):
+    return await _get_visible_submission_job(job_id, current_user)
+
+
+def _format_sse(seq: Optional[int], event: Dict[str, Any]) -> bytes:
+    lines = []
+    if seq is not None:
+        lines.append(f"id: {seq}")
+    lines.append(f"event: {event.get('type', 'message')}")
+    lines.append(f"data: {json.dumps(event, ensure_ascii=False)}")
+    return ("\n".join(lines) + "\n\n").encode("utf-8")
+
+
+async def _tail_stored_submission_events(job_id: str, after_seq: int):
+    """
+    Đọc sự kiện của job từ DB (job đang chạy ở worker khác hoặc đã kết thúc).
+    Job kết thúc mà không có sự kiện tổng kết (ví dụ job tạo trước khi có stream) thì tự dựng từ bản ghi job.
+    """
+    idle = 0.0
+    while True:
+        events = await asyncio.to_thread(database.get_submission_events, job_id, after_seq)
+        for seq, event in events:
+            after_seq = seq
+            yield _format_sse(seq, event)
+            if is_terminal_event(event):
+                return
+        if events:
+            idle = 0.0
+            continue
+
+        job = await asyncio.to_thread(database.get_submission_job, job_id)
+        if job is None:
+            return
+        if job["status"] in ("completed", "failed"):
+            # Đọc lại một lần để không bỏ lỡ sự kiện ghi ngay trước khi job đổi trạng thái
+            events = await asyncio.to_thread(database.get_submission_events, job_id, after_seq)
+            for seq, event in events:
+                yield _format_sse(seq, event)
+                if is_terminal_event(event):
+                    return
+            if job["status"] == "completed":
+                yield _format_sse(None, {"type": "summary", "status": "completed", "result": job["result"]})
+            else:
+                yield _format_sse(None, {"type": "error", "status": "failed", "error": job["error"]})
+            return
+
+        await asyncio.sleep(SUBMISSION_EVENTS_POLL_INTERVAL)
+        idle += SUBMISSION_EVENTS_POLL_INTERVAL
+        if idle >= SUBMISSION_EVENTS_KEEPALIVE:
+            idle = 0.0
+            yield b": keep-alive\n\n"
+
+
+@app.get("/submissions/{job_id}/events", tags=["Submissions"],
+         summary="Stream kết quả từng test case của một job chấm bài (Server-Sent Events)")
+async def stream_submission_events_endpoint(
+        request: Request,
+        job_id: str = Path(..., description="ID của job chấm bài"),
+        current_user: models.User = Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER,
+                                                                 models.Role.STUDENT]))):
+    """
+    Mỗi test case chấm xong được đẩy ngay thành một sự kiện `testcase` (verdict, thời gian chạy, bộ nhớ nếu có),
+    cuối cùng là một sự kiện `summary` (hoặc `error` nếu job lỗi) rồi stream đóng.
+    Client kết nối lại có thể gửi header `Last-Event-ID` để nhận tiếp từ sự kiện sau đó.
+    """
+    await _get_visible_submission_job(job_id, current_user)
+    try:
+        after_seq = int(request.headers.get("last-event-id", "0"))
+    except ValueError:
+        after_seq = 0
+
+    async def event_stream():
+        last_seq = after_seq
+        if SUBMISSION_EVENTS.is_local(job_id):
+            # Job đang chạy trong worker này: nhận sự kiện trực tiếp từ bộ nhớ
+            async for item in SUBMISSION_EVENTS.follow(job_id, after_seq):
+                if item is None:
+                    yield b": keep-alive\n\n"
+                    continue
+                last_seq, event = item
+                yield _format_sse(last_seq, event)
+                if is_terminal_event(event):
+                    return
+        # Job ở worker khác, đã kết thúc, hoặc kênh vừa đóng: đọc tiếp từ DB
+        async for chunk in _tail_stored_submission_events(job_id, last_seq):
+            yield chunk
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @app.post("/suggest_learning_path", summary="Gợi ý lộ trình học tập dựa trên danh sách kỹ năng",
           dependencies=[Depends(auth.role_required([models.Role.ADMIN, models.Role.LECTURER, models.Role.STUDENT]))])
 async def suggest_learning_path_endpoint(request: schemas.LearningPathRequest):
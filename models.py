@@ -2,7 +2,7 @@
 import enum
 
 from pydantic import BaseModel, Field
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Dict, Union
 from enum import Enum
 
 
@@ -33,6 +33,8 @@ class FrontendTestCase(BaseModel):
     trigger: Optional[str] = None
     expected: Optional[str] = None
     attributeName: Optional[str] = None
+    # Thời gian chờ tối đa (ms) cho mỗi bước chờ của test case (hành động, DOM ổn định, dialog...)
+    timeout: Optional[int] = None
     is_frontend: bool = True
 
 
@@ -49,6 +51,12 @@ class Exercise(BaseModel):
     backend_testcases: Optional[List[BackendTestCase]] = Field(default_factory=list)
     frontend_testcases: Optional[List[FrontendTestCase]] = Field(default_factory=list)
 
+    # Cách so sánh output của bài backend (xem grader/checkers.py), mặc định so sánh sau khi bỏ khoảng trắng 2 đầu.
+    # {"type": "program", "language": "cpp"|"python", "source": ...} là chương trình chấm riêng (special judge)
+    checker: Optional[Union[str, Dict[str, Any]]] = None
+    # Giới hạn kích thước stdout của mỗi test case (KB)
+    output_limit: Optional[int] = None
+
 
 # Model cho kết quả nộp bài (giữ nguyên)
 class SubmissionResult(BaseModel):
@@ -0,0 +1,325 @@
+# problem_catalog.py
+import os
+import sys
+import copy
+import json
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Any, Dict, Iterable, Union, Tuple, Callable
+
+from problem_search import ProblemSearchIndex
+
+# Các trường được đánh chỉ mục sẵn. Giá trị là hàm lấy khóa từ dict bài tập.
+INDEXED_FIELDS = {
+    "level": lambda p: p.get("level"),
+    "exercise_type": lambda p: p.get("exercise_type"),
+    "is_frontend": lambda p: bool(p.get("is_frontend")),
+    "group_id": lambda p: (p.get("group") or {}).get("id"),
+    "sub_group_id": lambda p: (p.get("sub_group") or {}).get("id"),
+}
+
+# Các trường của bản tóm tắt gọn (summary) dùng mặc định trong các response danh sách/gợi ý
+SUMMARY_FIELDS = ("id", "code", "title", "level", "group", "exercise_type")
+
+# Số lượng response JSON đã mã hóa sẵn được giữ lại (LRU) cho mỗi danh mục
+ENCODED_CACHE_MAX_ENTRIES = 256
+
+
+def project_fields(problem: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Chỉ giữ lại các trường được yêu cầu của một bài tập (luôn kèm 'id')."""
+    if not fields:
+        return problem
+    projected = {"id": problem.get("id")}
+    for field in fields:
+        if field in problem:
+            projected[field] = problem[field]
+    return projected
+
+
+# Tăng giá trị này khi định dạng snapshot thay đổi để các snapshot cũ tự bị bỏ qua
+SNAPSHOT_FORMAT_VERSION = 2
+# Chuỗi ngắn hơn ngưỡng này được intern (tên nhóm, mã bài, key, ...)
+INTERN_MAX_LENGTH = 64
+
+
+class FrozenDict(dict):
+    """
+    Dict chỉ đọc, dùng cho các dict con được nhiều bài tập dùng chung (xem compact_problems):
+    sửa tại chỗ sẽ lặng lẽ đổi mọi bài tập dùng chung nên bị chặn. Vẫn là dict nên được mã hóa JSON
+    và validate như dict thường; copy()/deepcopy trả về dict thường có thể sửa.
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Dict con dùng chung của danh mục bài tập là chỉ đọc; hãy sửa trên bản sao (copy()).")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce__(self):
+        # dict.__reduce_ex__ khôi phục bằng __setitem__ (bị chặn): dựng lại từ một dict thường
+        return FrozenDict, (dict(self),)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+
+def compact_problems(problems: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Thu gọn bộ nhớ của danh sách bài tập: intern các chuỗi ngắn lặp lại (tên nhóm, nhóm con, ...)
+    và dùng chung một đối tượng FrozenDict (chỉ đọc) cho các dict con giống hệt nhau
+    (group, sub_group, question_level, ...). Dict của từng bài tập và các list vẫn là dict/list thường.
+    """
+    shared: Dict[tuple, FrozenDict] = {}
+
+    def compact_dict(value: Dict[str, Any]) -> Dict[str, Any]:
+        return {sys.intern(k) if isinstance(k, str) else k: share(v) for k, v in value.items()}
+
+    def share(value: Any) -> Any:
+        if isinstance(value, str):
+            return sys.intern(value) if len(value) <= INTERN_MAX_LENGTH else value
+        if isinstance(value, list):
+            return [share(item) for item in value]
+        if isinstance(value, dict):
+            compacted = compact_dict(value)
+            # Chỉ dùng chung dict con không chứa list/dict có thể sửa
+            if any(isinstance(v, (list, dict)) and not isinstance(v, FrozenDict) for v in compacted.values()):
+                return compacted
+            # Dict con đã được dùng chung nên có thể so sánh theo định danh
+            key = tuple((k, id(v) if isinstance(v, dict) else v) for k, v in compacted.items())
+            frozen = shared.get(key)
+            if frozen is None:
+                frozen = shared[key] = FrozenDict(compacted)
+            return frozen
+        return value
+
+    return [compact_dict(prob) for prob in problems]
+
+
+def save_snapshot(problems: List[Dict[str, Any]], snapshot_path: str, source_path: str):
+    """Ghi snapshot nhị phân (pickle) của danh sách bài tập đã chuẩn hóa, gắn với phiên bản file nguồn."""
+    source_stat = os.stat(source_path)
+    header = (SNAPSHOT_FORMAT_VERSION, source_stat.st_mtime_ns, source_stat.st_size)
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump((header, problems), f, protocol=pickle.HIGHEST_PROTOCOL)
+    # Ghi ra file tạm rồi đổi tên để worker khác không bao giờ đọc phải snapshot ghi dở
+    os.replace(tmp_path, snapshot_path)
+
+
+def load_snapshot(snapshot_path: str, source_path: str) -> Optional[List[Dict[str, Any]]]:
+    """Đọc snapshot nếu nó còn khớp với file nguồn; trả về None nếu không có hoặc đã cũ."""
+    try:
+        source_stat = os.stat(source_path)
+        with open(snapshot_path, "rb") as f:
+            header, problems = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, TypeError):
+        return None
+    if header != (SNAPSHOT_FORMAT_VERSION, source_stat.st_mtime_ns, source_stat.st_size):
+        return None
+    return problems
+
+
+def build_summary(problem: Dict[str, Any]) -> Dict[str, Any]:
+    """Dựng bản tóm tắt gọn của một bài tập (không chứa testcases, subjects, ...)."""
+    group = problem.get("group")
+    return {
+        "id": problem.get("id"),
+        "code": problem.get("code"),
+        "title": problem.get("title") or problem.get("name"),
+        "level": problem.get("level"),
+        "group": {"id": group.get("id"), "name": group.get("name")} if isinstance(group, dict) else None,
+        "exercise_type": problem.get("exercise_type"),
+    }
+
+
+class ProblemCatalog:
+    """
+    Danh mục bài tập trong bộ nhớ, có chỉ mục theo ID và các bucket dựng sẵn
+    theo level, exercise_type, group.id và sub_group.id.
+    Thứ tự bài tập được giữ nguyên như thứ tự nạp.
+    """
+
+    def __init__(self, problems: Optional[Iterable[Dict[str, Any]]] = None):
+        self._problems: List[Dict[str, Any]] = []
+        self._by_id: Dict[int, Dict[str, Any]] = {}
+        self._by_id_str: Dict[str, Dict[str, Any]] = {}
+        # Vị trí của từng bài trong self._problems, dùng để cập nhật tại chỗ
+        self._positions: Dict[str, int] = {}
+        # Bản tóm tắt gọn được tính sẵn một lần cho mỗi bài tập
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        # Giá trị dẫn xuất tính một lần cho mỗi bài tập (ví dụ model đã validate), xóa khi bài tập thay đổi
+        self._derived: Dict[str, Dict[str, Any]] = {}
+        # Khóa riêng cho từng (ID, tên giá trị dẫn xuất): factory của các giá trị khác nhau không chờ nhau
+        self._derived_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._derived_locks_guard = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._buckets: Dict[str, Dict[Any, List[Dict[str, Any]]]] = {field: {} for field in INDEXED_FIELDS}
+        # Cache các response đã mã hóa sẵn: cache_key -> (body bytes, strong ETag)
+        self._encoded_cache: "OrderedDict[Any, Tuple[bytes, str]]" = OrderedDict()
+        self.version = 0
+        self._search_index = ProblemSearchIndex()
+        for prob in problems or []:
+            self._index(prob)
+
+    def _index(self, prob: Dict[str, Any]):
+        prob_id = prob.get("id")
+        # Giữ hành vi cũ của next(...): nếu trùng ID thì bài xuất hiện trước được ưu tiên
+        if str(prob_id) in self._by_id_str:
+            return
+        self._positions[str(prob_id)] = len(self._problems)
+        self._problems.append(prob)
+        if isinstance(prob_id, int):
+            self._by_id[prob_id] = prob
+        self._by_id_str[str(prob_id)] = prob
+        self._summaries[str(prob_id)] = build_summary(prob)
+        for field, key_func in INDEXED_FIELDS.items():
+            self._buckets[field].setdefault(key_func(prob), []).append(prob)
+        self._search_index.add(str(prob_id), prob)
+
+    def upsert(self, prob: Dict[str, Any]) -> bool:
+        """
+        Thêm mới hoặc thay thế một bài tập và cập nhật các chỉ mục tại chỗ,
+        không dựng lại toàn bộ danh mục. Trả về False nếu nội dung không đổi.
+        Các bucket được thay bằng list mới (copy-on-write) để request đang đọc không bị ảnh hưởng.
+        """
+        key = str(prob.get("id"))
+        with self._write_lock:
+            old_prob = self._by_id_str.get(key)
+            if old_prob is None:
+                self._index(prob)
+                self._invalidate()
+                return True
+            if old_prob == prob:
+                return False
+
+            self._problems[self._positions[key]] = prob
+            if isinstance(prob.get("id"), int):
+                self._by_id[prob["id"]] = prob
+            self._by_id_str[key] = prob
+            self._summaries[key] = build_summary(prob)
+            self._derived.pop(key, None)
+            for field, key_func in INDEXED_FIELDS.items():
+                buckets = self._buckets[field]
+                old_value, new_value = key_func(old_prob), key_func(prob)
+                if old_value == new_value:
+                    buckets[old_value] = [prob if p is old_prob else p for p in buckets[old_value]]
+                    continue
+                remaining = [p for p in buckets.get(old_value, []) if p is not old_prob]
+                if remaining:
+                    buckets[old_value] = remaining
+                else:
+                    buckets.pop(old_value, None)
+                buckets[new_value] = buckets.get(new_value, []) + [prob]
+            self._search_index.add(key, prob)
+            self._invalidate()
+            return True
+
+    def _invalidate(self):
+        """Gọi mỗi khi nội dung danh mục thay đổi để bỏ các response đã mã hóa sẵn."""
+        self.version += 1
+        self._encoded_cache.clear()
+
+    def encoded(self, cache_key: Any, build_payload: Callable[[], Any]) -> Tuple[bytes, str]:
+        """
+        Trả về (body JSON dạng bytes, ETag) cho một response danh sách.
+        Payload chỉ được dựng và mã hóa một lần cho mỗi cache_key cho đến khi danh mục thay đổi.
+        """
+        cached = self._encoded_cache.get(cache_key)
+        if cached is not None:
+            self._encoded_cache.move_to_end(cache_key)
+            return cached
+
+        body = json.dumps(build_payload(), ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        cached = (body, etag)
+        self._encoded_cache[cache_key] = cached
+        if len(self._encoded_cache) > ENCODED_CACHE_MAX_ENTRIES:
+            self._encoded_cache.popitem(last=False)
+        return cached
+
+    def __len__(self) -> int:
+        return len(self._problems)
+
+    @property
+    def problems(self) -> List[Dict[str, Any]]:
+        """Danh sách toàn bộ bài tập theo thứ tự nạp."""
+        return self._problems
+
+    def get(self, exercise_id: Union[int, str]) -> Optional[Dict[str, Any]]:
+        """Tìm bài tập theo ID (chấp nhận cả dạng int và dạng chuỗi) trong O(1)."""
+        if isinstance(exercise_id, int):
+            return self._by_id.get(exercise_id)
+        return self._by_id_str.get(str(exercise_id).strip())
+
+    def summary(self, prob: Dict[str, Any]) -> Dict[str, Any]:
+        """Trả về bản tóm tắt tính sẵn của một bài tập thuộc danh mục."""
+        summary = self._summaries.get(str(prob.get("id")))
+        return summary if summary is not None else build_summary(prob)
+
+    def derived(self, prob: Dict[str, Any], name: str, factory: Callable[[], Any]) -> Any:
+        """
+        Trả về giá trị dẫn xuất `name` của một bài tập, chỉ gọi `factory` ở lần đầu
+        (hoặc sau khi bài tập được cập nhật qua upsert).
+        `factory` chạy trong khóa riêng của (bài tập, `name`): các request đồng thời không tính trùng (ví dụ cùng ghi
+        thư mục testcase), còn các giá trị khác và upsert không phải chờ. Khóa ghi của danh mục chỉ được giữ
+        lúc lưu giá trị, để giá trị của phiên bản cũ không được lưu sau khi upsert.
+        """
+        key = str(prob.get("id"))
+        values = self._derived.get(key)
+        if values is not None and name in values:
+            return values[name]
+        with self._derived_lock(key, name):
+            values = self._derived.get(key)
+            if values is not None and name in values:
+                return values[name]
+            value = factory()
+            with self._write_lock:
+                # Chỉ lưu nếu `prob` vẫn là phiên bản hiện tại của bài tập trong danh mục
+                if self._by_id_str.get(key) is prob:
+                    self._derived.setdefault(key, {})[name] = value
+            return value
+
+    def _derived_lock(self, key: str, name: str) -> threading.Lock:
+        with self._derived_locks_guard:
+            lock = self._derived_locks.get((key, name))
+            if lock is None:
+                lock = self._derived_locks[(key, name)] = threading.Lock()
+            return lock
+
+    def summaries(self, problems: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [self.summary(p) for p in problems]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """Tìm kiếm toàn văn (không phân biệt dấu tiếng Việt), trả về (bài tập, điểm BM25)."""
+        hits = self._search_index.search(query, limit)
+        return [(self._by_id_str[doc_key], score) for doc_key, score in hits if doc_key in self._by_id_str]
+
+    def bucket(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Trả về bucket dựng sẵn cho một trường đã đánh chỉ mục (không sao chép)."""
+        if field not in self._buckets:
+            raise ValueError(f"Trường '{field}' không được đánh chỉ mục. Hỗ trợ: {list(INDEXED_FIELDS)}")
+        return self._buckets[field].get(value, [])
+
+    def filter(self, **criteria: Any) -> List[Dict[str, Any]]:
+        """
+        Lọc bài tập theo một hoặc nhiều trường đã đánh chỉ mục, ví dụ
+        `catalog.filter(level=3, is_frontend=False)`.
+        Chỉ duyệt bucket nhỏ nhất, các điều kiện còn lại được kiểm tra trực tiếp trên từng bài.
+        """
+        if not criteria:
+            return list(self._problems)
+
+        smallest_field = min(criteria, key=lambda field: len(self.bucket(field, criteria[field])))
+        smallest = self.bucket(smallest_field, criteria[smallest_field])
+        others = [(INDEXED_FIELDS[field], value) for field, value in criteria.items() if field != smallest_field]
+        return [p for p in smallest if all(key_func(p) == value for key_func, value in others)]
+
+    def by_level(self, level: int, include_frontend: bool = False) -> List[Dict[str, Any]]:
+        if include_frontend:
+            return list(self.bucket("level", level))
+        return self.filter(level=level, is_frontend=False)
+
+    def frontend_problems(self) -> List[Dict[str, Any]]:
+        return list(self.bucket("is_frontend", True))
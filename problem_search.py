@@ -0,0 +1,119 @@
+# problem_search.py
+import re
+import math
+import heapq
+import unicodedata
+from typing import List, Optional, Any, Dict, Tuple
+
+# Trọng số từng trường khi đánh chỉ mục: token của trường có trọng số cao được tính nhiều lần hơn
+SEARCH_FIELD_WEIGHTS = {
+    "name": 3,
+    "code": 3,
+    "group.name": 1,
+    "sub_group.name": 1,
+    "description": 1,
+}
+
+# Tham số BM25 chuẩn
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold_text(text: str) -> str:
+    """
+    Bỏ dấu tiếng Việt và chuyển về chữ thường, ví dụ "TÍNH TỔNG" -> "tinh tong".
+    """
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(fold_text(text))
+
+
+def _field_text(problem: Dict[str, Any], field: str) -> str:
+    value: Any = problem
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return ""
+        value = value.get(part)
+    return str(value) if value is not None else ""
+
+
+class ProblemSearchIndex:
+    """
+    Chỉ mục đảo (inverted index) trên các trường văn bản của bài tập, xếp hạng bằng BM25.
+    Hỗ trợ thêm/cập nhật từng bài tập mà không cần dựng lại toàn bộ chỉ mục.
+    """
+
+    def __init__(self):
+        # term -> {doc_key: tần suất (đã nhân trọng số)}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # doc_key -> {term: tần suất}, dùng để gỡ bài tập cũ khi cập nhật
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_key: str, problem: Dict[str, Any]):
+        """Đánh chỉ mục (hoặc đánh chỉ mục lại) một bài tập."""
+        self.remove(doc_key)
+
+        term_freqs: Dict[str, int] = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(problem, field)):
+                term_freqs[token] = term_freqs.get(token, 0) + weight
+
+        doc_length = sum(term_freqs.values())
+        self._doc_terms[doc_key] = term_freqs
+        self._doc_lengths[doc_key] = doc_length
+        self._total_length += doc_length
+        for term, freq in term_freqs.items():
+            self._postings.setdefault(term, {})[doc_key] = freq
+
+    def remove(self, doc_key: str):
+        term_freqs = self._doc_terms.pop(doc_key, None)
+        if term_freqs is None:
+            return
+        self._total_length -= self._doc_lengths.pop(doc_key)
+        for term in term_freqs:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_key, None)
+            if not postings:
+                del self._postings[term]
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Trả về danh sách (doc_key, điểm BM25) theo thứ tự điểm giảm dần.
+        Tài liệu chỉ cần khớp ít nhất một từ trong truy vấn.
+        """
+        terms = set(tokenize(query))
+        doc_count = len(self._doc_lengths)
+        if not terms or not doc_count:
+            return []
+
+        avg_length = self._total_length / doc_count or 1.0
+        scores: Dict[str, float] = {}
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            # Sao chép postings trước khi duyệt vì chỉ mục có thể được cập nhật từ thread khác
+            for doc_key, freq in list(postings.items()):
+                doc_length = self._doc_lengths.get(doc_key, avg_length)
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_length / avg_length)
+                scores[doc_key] = scores.get(doc_key, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+
+        if limit is None:
+            return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
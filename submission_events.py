@@ -0,0 +1,113 @@
+# submission_events.py
+import asyncio
+import threading
+from typing import List, Optional, Any, Dict, Tuple, Callable, AsyncIterator
+
+# Khoảng thời gian (giây) không có sự kiện mới thì gửi một dòng keep-alive để giữ kết nối stream
+SUBMISSION_EVENTS_KEEPALIVE = 15
+# Các loại sự kiện kết thúc một job: sau sự kiện này stream được đóng
+TERMINAL_EVENT_TYPES = ("summary", "error")
+
+
+def is_terminal_event(event: Dict[str, Any]) -> bool:
+    return event.get("type") in TERMINAL_EVENT_TYPES
+
+
+class _JobChannel:
+    def __init__(self):
+        self.events: List[Tuple[int, Dict[str, Any]]] = []
+        self.finished = False
+        self.next_seq = 1
+        # Cấp seq và ghi DB theo đúng thứ tự kể cả khi sự kiện đến từ thread đọc của grader service
+        self.lock = threading.Lock()
+        # Được thay mới sau mỗi lần có sự kiện; subscriber giữ tham chiếu cũ để không bỏ lỡ lần báo nào
+        self.changed = asyncio.Event()
+
+
+class SubmissionEventHub:
+    """
+    Kênh sự kiện tiến độ của các job chấm bài đang chạy trong worker API này.
+    - Mỗi sự kiện được gán seq tăng dần theo job và lưu qua `persist` (để client ở worker khác hoặc kết nối
+      muộn đọc lại được), rồi phát ngay cho các subscriber đang chờ trong worker này.
+    - Kênh của một job chỉ tồn tại trong bộ nhớ khi job còn chạy; sau đó chỉ còn bản lưu.
+    """
+
+    def __init__(self, persist: Callable[[str, int, Dict[str, Any]], None]):
+        self._persist = persist
+        self._channels: Dict[str, _JobChannel] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def open(self, job_id: str):
+        """Mở kênh cho một job (gọi trong event loop, trước khi job bắt đầu chấm)."""
+        self._loop = asyncio.get_running_loop()
+        self._channels[job_id] = _JobChannel()
+
+    def is_local(self, job_id: str) -> bool:
+        return job_id in self._channels
+
+    def _record(self, channel: _JobChannel, job_id: str, event: Dict[str, Any]) -> int:
+        with channel.lock:
+            seq = channel.next_seq
+            channel.next_seq += 1
+            try:
+                self._persist(job_id, seq, event)
+            except Exception as e:
+                print(f"[SubmissionEvents] Không lưu được sự kiện của job {job_id}: {e}")
+        return seq
+
+    def _deliver(self, channel: _JobChannel, seq: int, event: Dict[str, Any]):
+        channel.events.append((seq, event))
+        waiter, channel.changed = channel.changed, asyncio.Event()
+        waiter.set()
+
+    def publish_threadsafe(self, job_id: str, event: Dict[str, Any]):
+        """Phát một sự kiện từ thread bất kỳ (ví dụ thread đọc message của grader service)."""
+        channel = self._channels.get(job_id)
+        if channel is None or self._loop is None:
+            return
+        seq = self._record(channel, job_id, event)
+        self._loop.call_soon_threadsafe(self._deliver, channel, seq, event)
+
+    async def publish(self, job_id: str, event: Dict[str, Any]):
+        """Phát một sự kiện từ event loop."""
+        channel = self._channels.get(job_id)
+        if channel is None:
+            return
+        seq = await asyncio.to_thread(self._record, channel, job_id, event)
+        self._deliver(channel, seq, event)
+
+    def close(self, job_id: str):
+        """Đóng kênh khi job kết thúc; các subscriber đang chờ sẽ nhận nốt sự kiện còn lại rồi dừng."""
+        channel = self._channels.pop(job_id, None)
+        if channel is None:
+            return
+        channel.finished = True
+        channel.changed.set()
+
+    async def follow(self, job_id: str, after_seq: int = 0,
+                     keepalive: float = SUBMISSION_EVENTS_KEEPALIVE
+                     ) -> AsyncIterator[Optional[Tuple[int, Dict[str, Any]]]]:
+        """
+        Lần lượt trả về các sự kiện (seq, event) có seq > after_seq của một job đang chạy trong worker này,
+        dừng sau sự kiện kết thúc. Trả về None khi quá `keepalive` giây không có sự kiện mới.
+        """
+        channel = self._channels.get(job_id)
+        if channel is None:
+            return
+        position = 0
+        while True:
+            waiter = channel.changed
+            while position < len(channel.events):
+                seq, event = channel.events[position]
+                position += 1
+                if seq <= after_seq:
+                    continue
+                yield seq, event
+                if is_terminal_event(event):
+                    return
+            if channel.finished:
+                return
+            try:
+                await asyncio.wait_for(waiter.wait(), timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield None
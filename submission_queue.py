@@ -0,0 +1,103 @@
+# submission_queue.py
+import os
+import asyncio
+import contextlib
+from typing import Optional, Any, Dict, Callable, Awaitable
+
+# Số bài được chấm đồng thời tối đa trong một worker API (mặc định bằng số worker chấm bài)
+JUDGE_SLOTS = int(os.getenv("JUDGE_SLOTS", "0")) or int(os.getenv("GRADER_POOL_SIZE", "2"))
+# Số bài nộp tối đa đang chờ hoặc đang chấm trong một worker API; vượt quá sẽ bị từ chối (429)
+MAX_PENDING_SUBMISSIONS = int(os.getenv("MAX_PENDING_SUBMISSIONS", "64"))
+# Gợi ý thời gian (giây) client nên chờ trước khi thử lại khi hàng đợi đầy
+QUEUE_FULL_RETRY_AFTER = 5
+
+
+class QueueFullError(Exception):
+    """Hàng đợi chấm bài đã đầy."""
+
+
+class QueueClosedError(Exception):
+    """Hàng đợi đã dừng nhận bài (server đang tắt)."""
+
+
+class SubmissionQueue:
+    """
+    Hàng đợi chấm bài có giới hạn trong một worker API:
+    - tối đa `judge_slots` bài được chấm cùng lúc, các bài khác chờ theo thứ tự đến;
+    - tối đa `max_pending` bài đang chờ + đang chấm, vượt quá thì từ chối ngay để giữ độ trễ ổn định.
+    """
+
+    def __init__(self, judge_slots: int = JUDGE_SLOTS, max_pending: int = MAX_PENDING_SUBMISSIONS):
+        self.judge_slots = max(1, judge_slots)
+        self.max_pending = max(1, max_pending)
+        self._slots = asyncio.Semaphore(self.judge_slots)
+        self._pending = 0
+        self._running = 0
+        self._closed = False
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "judge_slots": self.judge_slots,
+            "running": self._running,
+            "waiting": self._pending - self._running,
+            "max_pending": self.max_pending,
+        }
+
+    def check_capacity(self):
+        """Ném lỗi nếu hàng đợi không nhận thêm bài (kiểm tra sớm, trước khi đọc file bài nộp)."""
+        if self._closed:
+            raise QueueClosedError("Hệ thống chấm bài đang dừng, vui lòng thử lại sau.")
+        if self._pending >= self.max_pending:
+            raise QueueFullError("Hệ thống chấm bài đang quá tải, vui lòng thử lại sau.")
+
+    def _reserve(self):
+        self.check_capacity()
+        self._pending += 1
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Chiếm một chỗ trong hàng đợi rồi chờ tới lượt chấm (dùng cho endpoint chấm đồng bộ)."""
+        self._reserve()
+        try:
+            async with self._slots:
+                self._running += 1
+                try:
+                    yield
+                finally:
+                    self._running -= 1
+        finally:
+            self._pending -= 1
+
+    def enqueue(self, job_id: str, run_job: Callable[[], Awaitable[Any]],
+                on_finished: Optional[Callable[[], None]] = None):
+        """
+        Đưa một job vào hàng đợi và trả về ngay. `run_job` được gọi khi tới lượt chấm.
+        Ném QueueFullError/QueueClosedError nếu không nhận thêm job.
+        """
+        self._reserve()
+
+        async def runner():
+            try:
+                async with self._slots:
+                    self._running += 1
+                    try:
+                        await run_job()
+                    finally:
+                        self._running -= 1
+            finally:
+                self._pending -= 1
+                self._tasks.pop(job_id, None)
+                if on_finished is not None:
+                    on_finished()
+
+        self._tasks[job_id] = asyncio.create_task(runner())
+
+    async def close(self):
+        """Ngừng nhận job mới và hủy các job còn lại khi server tắt."""
+        self._closed = True
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
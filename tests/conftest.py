@@ -0,0 +1,32 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Các module của dự án nằm phẳng ở thư mục gốc (main.py, problem_catalog.py, ...) và trong grader/
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+# database.py và main.py đọc các biến này ngay khi import: đặt giá trị cho test trước khi module nào được import,
+# kho bài tập SQLite nằm trong thư mục tạm thay vì file exercises_db.sqlite3 của dự án
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("GOOGLE_API_KEYS", "test-key")
+os.environ.setdefault("EXERCISE_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="grader-tests-"),
+                                                          "exercises.sqlite3"))
+
+
+@pytest.fixture(scope="session")
+def main_module():
+    """
+    Module main.py (API). main.py đọc tags.json, problems.json... theo thư mục hiện tại nên được import từ thư mục gốc.
+    Bỏ qua test nếu thiếu thư viện hệ thống (ví dụ weasyprint cần pango).
+    """
+    os.chdir(PROJECT_ROOT)
+    try:
+        import main
+    except (ImportError, OSError) as e:
+        pytest.skip(f"Không import được main.py: {e}")
+    return main
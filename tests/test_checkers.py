@@ -0,0 +1,122 @@
+# tests/test_checkers.py
+import io
+import mmap
+import random
+
+import pytest
+
+from grader.checkers import (StripChecker, ExactChecker, TrailingWhitespaceChecker, TokenChecker, FloatChecker,
+                             checker_factory)
+
+
+def _check(checker, actual: bytes, splits=()) -> bool:
+    """Đưa output vào bộ so sánh theo từng đoạn (cắt tại các vị trí `splits`) như khi đọc từ pipe."""
+    position = 0
+    for split in list(splits) + [len(actual)]:
+        if not checker.feed(actual[position:split]):
+            return False
+        position = split
+    return checker.finish()
+
+
+def _legacy_strip_match(actual: bytes, expected: bytes) -> bool:
+    """Cách so sánh cũ: output đọc ở chế độ text (universal newlines) rồi so sánh sau str.strip()."""
+    text = io.TextIOWrapper(io.BytesIO(actual), encoding="utf-8", newline=None).read()
+    return text.strip() == expected.decode("utf-8").strip()
+
+
+@pytest.mark.parametrize("actual, expected, matched", [
+    (b"3\n", b"3", True),
+    (b"  1 2\n3 \n\n", b"1 2\n3", True),
+    (b"1 2", b"1  2", False),
+    (b"", b"", True),
+    (b" \n", b"", True),
+    (b"x", b"", False),
+    (b"3 4", b"3", False),
+    (b"3", b"3 4", False),
+    # Khoảng trắng unicode ở đầu/cuối được bỏ như str.strip()
+    (" 3　\n".encode("utf-8"), b"3", True),
+    ("3".encode("utf-8"), "3 ".encode("utf-8"), True),
+    ("©3".encode("utf-8"), b"3", False),
+    # Output đọc như ở chế độ text: \r\n và \r thành \n
+    (b"1\r\n2\r\n", b"1\n2", True),
+    (b"1\r2", b"1\n2", True),
+    (b"1\n2", b"1\r\n2", False),
+])
+def test_strip_checker(actual, expected, matched):
+    assert _legacy_strip_match(actual, expected) == matched
+    for split in range(len(actual) + 1):
+        assert _check(StripChecker(expected), actual, [split]) == matched, split
+
+
+def test_strip_checker_matches_legacy_comparison_on_random_chunks():
+    rng = random.Random(0)
+    alphabet = ["a", "é", "“", " ", "\n", "\r", "\r\n", "\t", "\x1c", " ", " ", "　"]
+    for _ in range(5000):
+        expected = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+        if rng.random() < 0.5:
+            actual = rng.choice(["", " ", " "]) + expected.replace("\n", rng.choice(["\r\n", "\r"])) + "\n"
+        else:
+            actual = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 6)))
+        actual_bytes, expected_bytes = actual.encode("utf-8"), expected.encode("utf-8")
+        splits = sorted(rng.sample(range(len(actual_bytes) + 1), min(3, len(actual_bytes) + 1)))
+        assert (_check(StripChecker(expected_bytes), actual_bytes, splits)
+                == _legacy_strip_match(actual_bytes, expected_bytes)), (actual, expected, splits)
+
+
+def test_strip_checker_reads_expected_from_mmap(tmp_path):
+    path = tmp_path / "1.out"
+    path.write_bytes(b"\n 42\n43 \n")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as expected:
+        assert _check(StripChecker(expected), b"42\n43", [1, 3])
+        assert not _check(StripChecker(expected), b"42\n44")
+
+
+def test_strip_checker_stops_early_on_divergence():
+    checker = StripChecker(b"1 2 3")
+    assert checker.feed(b"1 2")
+    assert not checker.feed(b" 4")
+    checker = StripChecker(b"1")
+    assert checker.feed(b"1\n")
+    assert not checker.feed(b"extra")
+
+
+def test_exact_checker():
+    assert _check(ExactChecker(b"1\n"), b"1\n", [1])
+    assert not _check(ExactChecker(b"1\n"), b"1")
+    assert not _check(ExactChecker(b"1"), b"1\n")
+
+
+def test_trailing_whitespace_checker():
+    assert _check(TrailingWhitespaceChecker(b"a b\nc\n"), b"a b  \nc\t\n\n\n", [2, 5])
+    assert _check(TrailingWhitespaceChecker(b"a\r\nb"), b"a\nb\n")
+    assert not _check(TrailingWhitespaceChecker(b"a\nb"), b" a\nb")
+    assert not _check(TrailingWhitespaceChecker(b"a\nb"), b"a\n\nb")
+    assert not _check(TrailingWhitespaceChecker(b"a\nb"), b"a\nb\nc")
+
+
+def test_token_checker_handles_tokens_split_across_chunks():
+    assert _check(TokenChecker(b"12 345\n6"), b"  12\n\n345 6", [3, 7])
+    assert not _check(TokenChecker(b"12 345"), b"12 34 5", [4])
+    assert not _check(TokenChecker(b"1 2"), b"1 2 3")
+    assert not _check(TokenChecker(b"1 2"), b"1")
+
+
+def test_float_checker():
+    assert _check(FloatChecker(b"0.3333333 2"), b"0.33333331 2.0000001")
+    assert _check(FloatChecker(b"1000000"), b"1000000.5", [3])
+    assert not _check(FloatChecker(b"0.5"), b"0.6")
+    assert not _check(FloatChecker(b"abc"), b"abd")
+    assert _check(FloatChecker(b"1.0", tolerance=0.2), b"1.15")
+
+
+def test_checker_factory():
+    assert isinstance(checker_factory(None)(b"1", {}), StripChecker)
+    assert isinstance(checker_factory("tokens")(b"1", {}), TokenChecker)
+    assert _check(checker_factory({"type": "float", "tolerance": 0.1})(b"1", {}), b"1.05")
+    with pytest.raises(ValueError):
+        checker_factory("unknown")
+    with pytest.raises(ValueError):
+        checker_factory({"type": "program", "language": "cpp", "source": "int main(){}"})
+    with pytest.raises(ValueError):
+        checker_factory({"type": "program", "language": "ruby", "source": ""}, run_program=lambda *a: (True, ""))
@@ -0,0 +1,77 @@
+# tests/test_compile_cache.py
+import os
+import time
+
+import pytest
+
+from grader.compile_cache import CompileCache, EVICTION_GRACE_SECONDS
+
+
+def _writer(size):
+    def build(target):
+        (target / "a.out").write_bytes(b"x" * size)
+    return build
+
+
+def _age(cache, key, seconds):
+    marker = cache.root / key / ".complete"
+    past = time.time() - seconds
+    os.utime(marker, (past, past))
+
+
+def test_hit_miss_and_failed_build(tmp_path):
+    cache = CompileCache(tmp_path, max_bytes=10_000)
+    key = CompileCache.key("cpp", b"int main(){}", ["-O2"])
+    assert key != CompileCache.key("cpp", b"int main(){}", ["-O0"])
+
+    entry = cache.get_or_build(key, _writer(10))
+    assert (entry / "a.out").read_bytes() == b"x" * 10
+    assert cache.get_or_build(key, lambda target: pytest.fail("không được biên dịch lại")) == entry
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    def broken(target):
+        (target / "partial").write_text("...")
+        raise RuntimeError("compile error")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_build("broken", broken)
+    assert cache.lookup("broken") is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == [key]
+
+
+def test_evicts_least_recently_used_outside_grace_period(tmp_path):
+    cache = CompileCache(tmp_path, max_bytes=250)
+    cache.get_or_build("old", _writer(100))
+    cache.get_or_build("older", _writer(100))
+    _age(cache, "old", EVICTION_GRACE_SECONDS + 10)
+    _age(cache, "older", EVICTION_GRACE_SECONDS + 20)
+
+    cache.get_or_build("new", _writer(100))
+    assert cache.lookup("older") is None
+    assert cache.lookup("old") is not None
+    assert cache.lookup("new") is not None
+    assert cache.evictions == 1
+    assert not [p for p in tmp_path.iterdir() if p.name.startswith(".")]
+
+
+def test_recently_used_entries_survive_eviction(tmp_path):
+    cache = CompileCache(tmp_path, max_bytes=150)
+    cache.get_or_build("in-use", _writer(100))
+    _age(cache, "in-use", EVICTION_GRACE_SECONDS - 60)
+
+    # Vượt giới hạn nhưng bản cũ vừa được dùng gần đây (có thể đang chạy ở worker khác): chưa xóa
+    cache.get_or_build("new", _writer(100))
+    assert cache.lookup("in-use") is not None
+    assert cache.evictions == 0
+
+    # lookup() làm mới thời điểm dùng; hết thời gian ân hạn thì bản cũ nhất mới bị xóa
+    _age(cache, "in-use", EVICTION_GRACE_SECONDS + 10)
+    _age(cache, "new", EVICTION_GRACE_SECONDS + 5)
+    cache.get_or_build("newest", _writer(10))
+    assert cache.lookup("in-use") is None
+    assert cache.lookup("new") is not None
+    assert cache.evictions == 1
+
+
+def test_disabled_when_max_bytes_is_zero(tmp_path):
+    assert not CompileCache(tmp_path, max_bytes=0).enabled
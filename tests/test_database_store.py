@@ -0,0 +1,93 @@
+# tests/test_database_store.py
+import json
+import threading
+
+import pytest
+
+import database
+from models import Exercise
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Kho SQLite mới trong thư mục tạm cho mỗi test."""
+    monkeypatch.setattr(database, "EXERCISE_STORE_PATH", tmp_path / "exercises.sqlite3")
+    monkeypatch.setattr(database, "DB_FILE_PATH", tmp_path / "exercises_db.json")
+    monkeypatch.setattr(database, "_store_local", threading.local())
+    monkeypatch.setattr(database, "_store_initialized", False)
+    return database
+
+
+def _exercise(exercise_id, title="Bài"):
+    return Exercise(id=exercise_id, title=title, exercise_type="backend",
+                    backend_testcases=[{"id": 1, "stdin": "1", "expected_stdout": "1"}])
+
+
+def test_seq_stamp_tracks_changes(store):
+    assert store.get_exercises_version() == 0
+    assert store.import_exercises([_exercise(1), _exercise(2)]) == 2
+    version = store.get_exercises_version()
+    assert version == 2
+
+    changed, new_version = store.get_exercises_changed_since(0)
+    assert [ex.id for ex in changed] == [1, 2]
+    assert new_version == version
+
+    store.add_exercise(_exercise(1, title="Đã sửa"))
+    changed, new_version = store.get_exercises_changed_since(version)
+    assert [(ex.id, ex.title) for ex in changed] == [(1, "Đã sửa")]
+    assert new_version == store.get_exercises_version() > version
+
+    assert store.get_exercises_changed_since(new_version) == ([], new_version)
+    assert [ex.id for ex in store.get_all_exercises()] == [1, 2]
+
+
+def test_migrates_legacy_json_once(store):
+    store.DB_FILE_PATH.write_text(json.dumps([
+        {"id": 5, "title": "Cũ", "exercise_type": "frontend"},
+        {"id": "không hợp lệ"},
+    ]), encoding="utf-8")
+    assert [ex.id for ex in store.get_all_exercises()] == [5]
+    assert store.get_exercise_by_id(5).title == "Cũ"
+    assert store.get_exercise_by_id(6) is None
+
+
+def test_import_invalidates_verdict_cache_of_changed_exercises(store):
+    store.import_exercises([_exercise(1), _exercise(2)])
+    store.store_cached_verdict("k1", 1, [{"status": "ACCEPTED"}])
+    store.store_cached_verdict("k2", 2, [{"status": "WRONG_ANSWER"}])
+    assert store.get_cached_verdict("k1") == [{"status": "ACCEPTED"}]
+
+    store.import_exercises([_exercise(1, title="Test case mới")])
+    assert store.get_cached_verdict("k1") is None
+    assert store.get_cached_verdict("k2") == [{"status": "WRONG_ANSWER"}]
+
+
+def test_verdict_cache_evicts_least_recently_used(store, monkeypatch):
+    monkeypatch.setattr(store, "VERDICT_CACHE_MAX_ENTRIES", 2)
+    clock = iter(range(100))
+    monkeypatch.setattr(store.time, "time", lambda: next(clock))
+    store.store_cached_verdict("a", 1, [])
+    store.store_cached_verdict("b", 1, [])
+    assert store.get_cached_verdict("a") == []
+    store.store_cached_verdict("c", 1, [])
+    assert store.get_cached_verdict("b") is None
+    assert store.get_cached_verdict("a") == []
+    assert store.get_cached_verdict("c") == []
+
+
+def test_submission_events_replay(store):
+    store.create_submission_job("job-1", 1, "alice")
+    for seq, event in enumerate([{"type": "testcase", "id": 1}, {"type": "testcase", "id": 2},
+                                 {"type": "done"}], start=1):
+        store.append_submission_event("job-1", seq, event)
+    store.append_submission_event("job-2", 1, {"type": "done"})
+
+    assert [seq for seq, _ in store.get_submission_events("job-1")] == [1, 2, 3]
+    # Client kết nối lại chỉ nhận các sự kiện sau seq đã thấy
+    assert store.get_submission_events("job-1", after_seq=2) == [(3, {"type": "done"})]
+    assert store.get_submission_events("job-1", after_seq=3) == []
+
+    store.update_submission_job("job-1", "completed", result={"score": 10})
+    job = store.get_submission_job("job-1")
+    assert (job["status"], job["result"], job["owner"]) == ("completed", {"score": 10}, "alice")
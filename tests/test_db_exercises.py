@@ -0,0 +1,48 @@
+# tests/test_db_exercises.py
+import asyncio
+
+import models
+
+
+def _backend_exercise(exercise_id):
+    return models.Exercise(id=exercise_id, title="Tổng hai số", exercise_type="backend",
+                           backend_testcases=[{"id": 1, "stdin": "1 2", "expected_stdout": "3.0"}],
+                           checker={"type": "float", "tolerance": 1e-3}, output_limit=64)
+
+
+def test_backend_db_exercise_keeps_judge_settings(main_module):
+    standardized = main_module._standardize_db_exercise(_backend_exercise(990001))
+    assert standardized["exercise_type"] == "backend"
+    assert standardized["is_frontend"] is False
+    assert standardized["backend_testcases"] == [{"id": 1, "stdin": "1 2", "expected_stdout": "3.0"}]
+    assert standardized["checker"] == {"type": "float", "tolerance": 1e-3}
+    assert standardized["output_limit"] == 64
+    assert standardized["testcases"] == []
+
+
+def test_frontend_db_exercises_stay_frontend(main_module):
+    frontend_case = {"id": 1, "name": "Tiêu đề", "type": "text", "selector": "h1", "expected": "Xin chào"}
+    explicit = models.Exercise(id=990002, title="Trang chủ", exercise_type="frontend",
+                               frontend_testcases=[frontend_case])
+    # Bản ghi cũ không khai báo loại (mặc định backend) nhưng chỉ có test case frontend
+    legacy = models.Exercise(id=990003, title="Trang chủ", frontend_testcases=[frontend_case])
+    for exercise in (explicit, legacy):
+        standardized = main_module._standardize_db_exercise(exercise)
+        assert standardized["exercise_type"] == "frontend"
+        assert standardized["is_frontend"] is True
+        assert standardized["testcases"] == standardized["frontend_testcases"] != []
+        assert standardized["backend_testcases"] == []
+
+
+def test_backend_db_exercise_is_graded_by_backend_judge(main_module, monkeypatch, tmp_path):
+    main = main_module
+    monkeypatch.setattr(main, "GRADER_POOL", None)
+    main.PROBLEM_CATALOG.upsert(main._standardize_db_exercise(_backend_exercise(990004)))
+    exercise_dict, exercise = main._resolve_exercise(990004)
+    assert exercise.exercise_type == models.ExerciseType.BACKEND
+
+    source = tmp_path / "main.py"
+    # In ra 3.0001: chỉ đúng nhờ checker float của bài tập
+    source.write_text("a, b = map(int, input().split())\nprint(a + b + 0.0001)\n")
+    results = asyncio.run(main._grade_submission(exercise_dict, exercise, str(source)))
+    assert [r["status"] for r in results] == ["ACCEPTED"], results
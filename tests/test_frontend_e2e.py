@@ -0,0 +1,116 @@
+# tests/test_frontend_e2e.py
+"""Chấm bài nộp frontend từ đầu tới cuối trên Chromium thật (bỏ qua nếu không khởi động được Chromium)."""
+import zipfile
+
+import pytest
+
+sync_api = pytest.importorskip("playwright.sync_api")
+
+from grader import judge
+
+INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="utf-8">
+  <link rel="stylesheet" href="css/style.css">
+</head>
+<body>
+  <h1>Xin chào</h1>
+  <input id="name" placeholder="Tên của bạn">
+  <button id="greet">Chào</button>
+  <p id="greeting"></p>
+  <button id="increment">+1</button>
+  <span id="count">0</span>
+  <button id="alert">Lưu</button>
+  <button id="save">Ghi nhớ</button>
+  <span id="stored"></span>
+  <script src="js/app.js"></script>
+</body>
+</html>
+"""
+
+STYLE_CSS = "h1 { color: green; }\n"
+
+APP_JS = """
+const count = document.getElementById("count");
+document.getElementById("increment").addEventListener("click", () => {
+  count.textContent = String(Number(count.textContent) + 1);
+});
+document.getElementById("greet").addEventListener("click", () => {
+  document.getElementById("greeting").textContent = "Chào " + document.getElementById("name").value;
+});
+document.getElementById("alert").addEventListener("click", () => alert("Đã lưu!"));
+document.getElementById("stored").textContent = localStorage.getItem("saved") || "0";
+document.getElementById("save").addEventListener("click", () => {
+  localStorage.setItem("saved", "1");
+  document.getElementById("stored").textContent = "1";
+});
+"""
+
+
+@pytest.fixture(scope="module")
+def chromium():
+    try:
+        with sync_api.sync_playwright() as playwright:
+            playwright.chromium.launch(headless=True).close()
+    except Exception as e:
+        pytest.skip(f"Không khởi động được Chromium: {type(e).__name__}: {e}")
+    yield
+    judge.shutdown()
+
+
+@pytest.fixture
+def submission_zip(tmp_path):
+    path = tmp_path / "submission.zip"
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("index.html", INDEX_HTML)
+        zf.writestr("css/style.css", STYLE_CSS)
+        zf.writestr("js/app.js", APP_JS)
+    return str(path)
+
+
+def _grade(testcases, zip_path):
+    streamed = []
+    results = judge.grade_frontend_submission({"id": "e2e", "frontend_testcases": testcases}, zip_path,
+                                              on_result=lambda index, result: streamed.append(index))
+    return results, streamed
+
+
+def test_read_only_batch_trigger_chain_and_alert(chromium, submission_zip):
+    testcases = [
+        # Các test case chỉ đọc liền nhau: một phiên, một lần chụp DOM
+        {"name": "Có tiêu đề", "type": "element_exists", "selector": "h1"},
+        {"name": "Nội dung tiêu đề", "type": "text_equals", "selector": "h1", "expected": "Xin chào"},
+        {"name": "Placeholder", "type": "attribute_equals", "selector": "#name", "attributeName": "placeholder",
+         "expected": "Tên của bạn"},
+        {"name": "Màu tiêu đề", "type": "attribute_equals", "selector": "h1", "attributeName": "color",
+         "expected": "green"},
+        # Chuỗi trigger: bước sau thấy trạng thái bước trước để lại
+        {"name": "Tăng 1", "type": "text_equals", "selector": "#count", "expected": "1", "trigger": "click:#increment"},
+        {"name": "Tăng 2", "type": "text_equals", "selector": "#count", "expected": "2", "trigger": "click:#increment"},
+        {"name": "Lời chào", "type": "text_equals", "selector": "#greeting", "expected": "Chào An",
+         "trigger": "input:#name=An;click:#greet"},
+        {"name": "Alert", "type": "js_alert", "expected": "Đã lưu!", "trigger": "click:#alert"},
+        # Không có trigger: trang mới tải, không thấy trạng thái của chuỗi trên
+        {"name": "Bộ đếm ban đầu", "type": "text_equals", "selector": "#count", "expected": "0"},
+    ]
+    results, streamed = _grade(testcases, submission_zip)
+
+    assert [r["test"] for r in results] == [tc["name"] for tc in testcases]
+    assert [r["result"] for r in results] == ["✅ Passed"] * len(testcases), results
+    assert sorted(streamed) == list(range(len(testcases)))
+
+
+def test_storage_written_by_earlier_session_is_seen_by_later_sessions(chromium, submission_zip):
+    testcases = [
+        {"name": "Chưa ghi nhớ", "type": "text_equals", "selector": "#stored", "expected": "0"},
+        {"name": "Ghi nhớ", "type": "text_equals", "selector": "#stored", "expected": "1", "trigger": "click:#save"},
+        # Như khi chạy tuần tự trong một context: localStorage của phiên trước vẫn còn sau khi tải lại trang
+        {"name": "Đã ghi nhớ", "type": "text_equals", "selector": "#stored", "expected": "1"},
+        {"name": "Alert", "type": "js_alert", "expected": "Đã lưu!", "trigger": "click:#alert"},
+    ]
+    results, streamed = _grade(testcases, submission_zip)
+
+    assert [r["result"] for r in results] == ["✅ Passed"] * len(testcases), results
+    # Mỗi test case chỉ được báo một lần, kể cả khi phải chạy lại tuần tự
+    assert sorted(streamed) == list(range(len(testcases)))
@@ -0,0 +1,80 @@
+# tests/test_grader_service.py
+import threading
+import time
+
+import pytest
+
+from grader import service
+
+pytestmark = pytest.mark.skipif(not service.is_supported(), reason="Grader service cần hệ POSIX")
+
+PYTHON_CHECKER = {"type": "program", "language": "python", "source": "raise SystemExit(0)\n"}
+
+
+@pytest.fixture
+def pool():
+    grader_pool = service.GraderPool(size=1)
+    grader_pool.start()
+    # Chờ worker import xong các module chấm bài
+    assert all(entry["healthy"] for entry in grader_pool.health_check())
+    yield grader_pool
+    grader_pool.shutdown()
+
+
+def _slow_submission(tmp_path, seconds):
+    path = tmp_path / "slow.py"
+    path.write_text(f"import time\ntime.sleep({seconds})\nprint(1)\n")
+    return {"user_code_path": str(path), "test_cases": [{"id": 1, "stdin": "", "expected_stdout": "1"}]}
+
+
+def _call_in_thread(pool, *args, **kwargs):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = pool.call(*args, **kwargs)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def test_timed_out_queued_request_is_cancelled_without_restarting_worker(pool, tmp_path):
+    worker = pool._workers[0]
+    slow, slow_outcome = _call_in_thread(pool, "grade_backend", _slow_submission(tmp_path, 1), timeout=30)
+    time.sleep(0.3)
+
+    # Xếp hàng sau bài đang chấm nên quá thời gian chờ: chỉ request này thất bại
+    with pytest.raises(service.GraderServiceError):
+        pool.call("prepare_checker", {"checker": PYTHON_CHECKER}, timeout=0.2)
+    slow.join()
+    assert slow_outcome["result"][0]["status"] == "ACCEPTED"
+    assert pool._workers[0] is worker
+    assert pool.call("prepare_checker", {"checker": PYTHON_CHECKER}, timeout=30)["language"] == "python"
+
+
+def test_hung_request_replaces_worker_and_lets_other_requests_finish(pool, tmp_path):
+    old_worker = pool._workers[0]
+    hung, hung_outcome = _call_in_thread(pool, "grade_backend", _slow_submission(tmp_path, 2), timeout=0.5)
+    time.sleep(0.1)
+    queued, queued_outcome = _call_in_thread(pool, "prepare_checker", {"checker": PYTHON_CHECKER}, timeout=30)
+
+    started = time.monotonic()
+    hung.join()
+    assert isinstance(hung_outcome["error"], service.GraderServiceError)
+    # Worker cũ được dừng ngoài khóa, trong nền: lời gọi bị quá thời gian không phải chờ nó dừng
+    assert time.monotonic() - started < 2
+    new_worker = pool._workers[0]
+    assert new_worker is not old_worker
+    assert pool.call("prepare_checker", {"checker": PYTHON_CHECKER}, timeout=30)["language"] == "python"
+
+    # Request khác của worker cũ vẫn được chấm xong, sau đó worker cũ mới dừng
+    queued.join()
+    assert queued_outcome["result"]["language"] == "python"
+    old_worker.process.wait(timeout=15)
+    deadline = time.monotonic() + 5
+    while pool._draining and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert pool._draining == []
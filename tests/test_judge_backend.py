@@ -0,0 +1,120 @@
+# tests/test_judge_backend.py
+import shutil
+
+import pytest
+
+from grader import judge_backend
+
+posix_only = pytest.mark.skipif(judge_backend.resource is None, reason="Cần setrlimit/wait4 (POSIX)")
+
+
+@posix_only
+def test_limits_are_applied_by_exec_wrapper(tmp_path):
+    cmd = judge_backend._limited_command(["/bin/sh", "-c", "ulimit -S -t; ulimit -H -t; ulimit -v"], 1.2, 262144)
+    compiled = judge_backend.CompiledSubmission(cmd, cwd=str(tmp_path))
+    with open(tmp_path / "stdin", "wb+") as stdin_file:
+        result = judge_backend._run_compiled(compiled, stdin_file, 10, None, None)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split() == ["2", "3", "262144"]
+    assert judge_backend._limited_command(["prog"], None, None) == ["prog"]
+
+
+@posix_only
+@pytest.mark.skipif(shutil.which("g++") is None, reason="Không có g++")
+def test_cpu_limit_gives_tle(tmp_path, monkeypatch):
+    monkeypatch.setattr(judge_backend.COMPILE_CACHE, "max_bytes", 0)
+    source = tmp_path / "spin.cpp"
+    source.write_text("int main() { volatile unsigned long x = 0; for (;;) x++; }\n")
+    results = judge_backend.grade_backend_submission(str(source), [{"id": 1, "stdin": "", "expected_stdout": ""}],
+                                                     time_limit=0.5)
+    assert results[0]["status"] == "TIME_LIMIT_EXCEEDED"
+
+
+def _grade_python(tmp_path, source, expected, **limits):
+    path = tmp_path / "main.py"
+    path.write_text(source)
+    return judge_backend.grade_backend_submission(str(path), [{"id": 1, "stdin": "", "expected_stdout": expected}],
+                                                  **limits)[0]
+
+
+@posix_only
+@pytest.mark.parametrize("source", [
+    "raise SystemExit(3)\n",
+    "import sys\nsys.stdout.write('1\\n'); sys.stdout.flush()\nraise ValueError('boom')\n",
+])
+def test_crash_with_missing_output_is_runtime_error(tmp_path, source):
+    result = _grade_python(tmp_path, source, "1\n2")
+    assert result["status"] == "RUNTIME_ERROR"
+
+
+@posix_only
+def test_diverging_output_is_wrong_answer(tmp_path):
+    # Bài nộp bị dừng ngay khi output đã sai, không bị tính là lỗi runtime hay quá thời gian
+    result = _grade_python(tmp_path, "while True:\n    print('x' * 1000)\n", "1", time_limit=2)
+    assert result["status"] == "WRONG_ANSWER"
+    assert _grade_python(tmp_path, "print(2)\n", "1")["status"] == "WRONG_ANSWER"
+    assert _grade_python(tmp_path, "print(1)\n", "1")["status"] == "ACCEPTED"
+
+
+@posix_only
+def test_relative_python_path(tmp_path, monkeypatch):
+    (tmp_path / "sol.py").write_text("print(input())\n")
+    monkeypatch.chdir(tmp_path)
+    results = judge_backend.grade_backend_submission("sol.py", [{"id": 1, "stdin": "7", "expected_stdout": "7"}])
+    assert results[0]["status"] == "ACCEPTED", results
+
+
+CPP_EQUAL_CHECKER = r"""
+#include <fstream>
+#include <string>
+int main(int argc, char** argv) {
+    std::ifstream expected(argv[2]), actual(argv[3]);
+    std::string e, a;
+    expected >> e;
+    actual >> a;
+    return e == a ? 0 : 1;
+}
+"""
+
+
+@posix_only
+@pytest.mark.skipif(shutil.which("g++") is None, reason="Không có g++")
+def test_cpp_checker_and_submission_do_not_share_binary_without_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(judge_backend.COMPILE_CACHE, "max_bytes", 0)
+    source = tmp_path / "main.cpp"
+    source.write_text('#include <cstdio>\nint main() { std::puts("2"); }\n')
+    checker = {"type": "program", "language": "cpp", "source": CPP_EQUAL_CHECKER}
+    results = judge_backend.grade_backend_submission(str(source), [{"id": 1, "stdin": "", "expected_stdout": "1"}],
+                                                     checker=checker)
+    assert results[0]["status"] == "WRONG_ANSWER", results
+
+
+@posix_only
+@pytest.mark.parametrize("source, status", [
+    ("while True:\n    pass\n", "TIME_LIMIT_EXCEEDED"),
+    ("print(1)\nraise SystemExit(3)\n", "RUNTIME_ERROR"),
+])
+def test_program_checker_runs_only_after_clean_exit(tmp_path, source, status):
+    # Checker luôn lỗi (mã thoát 3): nếu bị chạy, verdict sẽ thành GRADER_ERROR
+    checker = {"type": "program", "language": "python", "source": "raise SystemExit(3)\n"}
+    path = tmp_path / "main.py"
+    path.write_text(source)
+    results = judge_backend.grade_backend_submission(str(path), [{"id": 1, "stdin": "", "expected_stdout": "1"}],
+                                                     time_limit=0.5, checker=checker)
+    assert results[0]["status"] == status, results
+
+
+@posix_only
+def test_fail_fast_skips_queued_cases_after_first_failure(tmp_path):
+    path = tmp_path / "main.py"
+    path.write_text("import time\nn = int(input())\nif n != 1:\n    time.sleep(0.3)\nprint(n)\n")
+    # Test case 1 sai ngay; các test case sau đúng nhưng chạy chậm
+    cases = [{"id": i, "stdin": str(i), "expected_stdout": "0" if i == 1 else str(i)} for i in range(1, 9)]
+    reported = []
+    results = judge_backend.grade_backend_submission(str(path), cases, fail_fast=True, max_workers=2,
+                                                     on_result=lambda index, result: reported.append(index))
+    statuses = [r["status"] for r in results]
+    assert statuses[0] == "WRONG_ANSWER"
+    # Chỉ test case chạy song song với test case 1 được chạy xong, các test case còn lại bị bỏ qua
+    assert statuses[2:] == ["SKIPPED"] * 6, statuses
+    assert sorted(reported) == list(range(len(cases)))
@@ -0,0 +1,193 @@
+# tests/test_problem_catalog.py
+import os
+import copy
+import json
+import threading
+
+import pytest
+
+from problem_catalog import ProblemCatalog, compact_problems, save_snapshot, load_snapshot
+
+
+def _problem(prob_id, level=1, group_id=1, name="Bài tập", **extra):
+    prob = {
+        "id": prob_id,
+        "name": name,
+        "code": f"P{prob_id}",
+        "level": level,
+        "exercise_type": "backend",
+        "is_frontend": False,
+        "group": {"id": group_id, "name": f"Nhóm {group_id}"},
+        "sub_group": {"id": group_id * 10, "name": "Nhóm con"},
+    }
+    prob.update(extra)
+    return prob
+
+
+def test_buckets_and_lookup():
+    catalog = ProblemCatalog([_problem(1, level=1), _problem(2, level=2), _problem(3, level=1, group_id=2),
+                              _problem(4, level=1, is_frontend=True, exercise_type="frontend")])
+
+    assert [p["id"] for p in catalog.bucket("level", 1)] == [1, 3, 4]
+    assert [p["id"] for p in catalog.by_level(1)] == [1, 3]
+    assert [p["id"] for p in catalog.by_level(1, include_frontend=True)] == [1, 3, 4]
+    assert [p["id"] for p in catalog.filter(level=1, group_id=2)] == [3]
+    assert [p["id"] for p in catalog.frontend_problems()] == [4]
+    assert catalog.bucket("level", 99) == []
+    assert catalog.get(2) is catalog.get("2") is catalog.get(" 2 ")
+
+
+def test_duplicate_id_keeps_first():
+    first = _problem(1, name="Đầu tiên")
+    catalog = ProblemCatalog([first, _problem(1, name="Trùng")])
+    assert len(catalog) == 1
+    assert catalog.get(1) is first
+
+
+def test_upsert_is_copy_on_write():
+    old = _problem(1, level=1)
+    catalog = ProblemCatalog([old, _problem(2, level=1)])
+    level_1 = catalog.bucket("level", 1)
+    version = catalog.version
+
+    new = _problem(1, level=2)
+    assert catalog.upsert(new) is True
+    # Danh sách mà request đang đọc dở không bị sửa tại chỗ
+    assert [p["id"] for p in level_1] == [1, 2]
+    assert level_1[0] is old
+    assert [p["id"] for p in catalog.bucket("level", 1)] == [2]
+    assert catalog.bucket("level", 2) == [new]
+    assert catalog.get(1) is new
+    assert catalog.problems[0] is new
+    assert catalog.version == version + 1
+
+    assert catalog.upsert(_problem(1, level=2)) is False
+    assert catalog.version == version + 1
+
+
+def test_upsert_clears_derived_and_encoded():
+    prob = _problem(1)
+    catalog = ProblemCatalog([prob])
+    calls = []
+    assert catalog.derived(prob, "x", lambda: calls.append(1) or "v1") == "v1"
+    assert catalog.derived(prob, "x", lambda: calls.append(1) or "v2") == "v1"
+    assert len(calls) == 1
+    body, etag = catalog.encoded("all", lambda: {"n": 1})
+    assert catalog.encoded("all", lambda: {"n": 2}) == (body, etag)
+
+    updated = _problem(1, name="Đổi tên")
+    catalog.upsert(updated)
+    assert catalog.derived(updated, "x", lambda: "v2") == "v2"
+    assert catalog.encoded("all", lambda: {"n": 2})[1] != etag
+
+
+def test_derived_computes_once_under_concurrency():
+    prob = _problem(1)
+    catalog = ProblemCatalog([prob])
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def factory():
+        calls.append(1)
+        return object()
+
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(catalog.derived(prob, "model", factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_slow_derived_factory_does_not_block_other_keys_or_upsert():
+    first, second = _problem(1), _problem(2)
+    catalog = ProblemCatalog([first, second])
+    started, release = threading.Event(), threading.Event()
+
+    def slow_factory():
+        started.set()
+        assert release.wait(5)
+        return "chậm"
+
+    worker = threading.Thread(target=lambda: catalog.derived(first, "testcase_dir", slow_factory))
+    worker.start()
+    try:
+        assert started.wait(5)
+        # Trong lúc factory của (1, "testcase_dir") đang chạy
+        assert catalog.derived(first, "model", lambda: "model") == "model"
+        assert catalog.derived(second, "testcase_dir", lambda: "nhanh") == "nhanh"
+        catalog.upsert(_problem(2, name="Mới"))
+    finally:
+        release.set()
+        worker.join()
+    assert catalog.derived(first, "testcase_dir", lambda: "khác") == "chậm"
+
+
+def test_derived_of_stale_problem_is_not_cached():
+    old = _problem(1)
+    catalog = ProblemCatalog([old])
+    catalog.upsert(_problem(1, name="Mới"))
+    assert catalog.derived(old, "x", lambda: "cũ") == "cũ"
+    assert catalog.derived(catalog.get(1), "x", lambda: "mới") == "mới"
+
+
+def test_compact_problems_shares_identical_subdicts():
+    problems = compact_problems([_problem(1), _problem(2)])
+    assert problems[0]["group"] is problems[1]["group"]
+    assert problems[0]["group"] == {"id": 1, "name": "Nhóm 1"}
+    assert json.loads(json.dumps(problems[0]["group"])) == {"id": 1, "name": "Nhóm 1"}
+
+
+def test_shared_subdicts_are_read_only():
+    problems = compact_problems([_problem(1), _problem(2)])
+    group = problems[0]["group"]
+    with pytest.raises(TypeError):
+        group["name"] = "Đổi tên"
+    with pytest.raises(TypeError):
+        group.update(name="Đổi tên")
+    assert problems[1]["group"]["name"] == "Nhóm 1"
+
+    # Dict của từng bài tập vẫn sửa được; bản sao của dict con dùng chung là dict thường
+    problems[0]["title"] = "Mới"
+    copied = copy.deepcopy(problems[0])
+    copied["group"]["name"] = "Đổi tên"
+    assert type(copied["group"]) is dict and group["name"] == "Nhóm 1"
+
+
+def test_snapshot_round_trip(tmp_path):
+    source = tmp_path / "problems.json"
+    source.write_text("[]", encoding="utf-8")
+    snapshot = str(tmp_path / "problems.snapshot")
+    problems = [_problem(1), _problem(2, level=3)]
+
+    save_snapshot(problems, snapshot, str(source))
+    assert load_snapshot(snapshot, str(source)) == problems
+
+    # Dict con dùng chung vẫn dùng chung (và chỉ đọc) sau khi nạp lại
+    save_snapshot(compact_problems(problems), snapshot, str(source))
+    loaded = load_snapshot(snapshot, str(source))
+    assert loaded == problems
+    assert loaded[0]["group"] is loaded[1]["group"]
+    with pytest.raises(TypeError):
+        loaded[0]["group"]["id"] = 2
+
+    # File nguồn thay đổi thì snapshot cũ bị bỏ qua
+    source.write_text("[ ]", encoding="utf-8")
+    assert load_snapshot(snapshot, str(source)) is None
+    assert load_snapshot(str(tmp_path / "missing"), str(source)) is None
+
+
+def test_snapshot_ignores_corrupt_file(tmp_path):
+    source = tmp_path / "problems.json"
+    source.write_text("[]", encoding="utf-8")
+    snapshot = tmp_path / "problems.snapshot"
+    snapshot.write_bytes(b"not a pickle")
+    assert load_snapshot(str(snapshot), str(source)) is None
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
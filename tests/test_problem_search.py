@@ -0,0 +1,63 @@
+# tests/test_problem_search.py
+from problem_search import ProblemSearchIndex, fold_text, tokenize
+from problem_catalog import ProblemCatalog
+
+
+def _problem(prob_id, name, description=""):
+    return {"id": prob_id, "name": name, "code": f"P{prob_id}", "description": description,
+            "group": {"id": 1, "name": "Cơ bản"}}
+
+
+def test_fold_text_removes_vietnamese_diacritics():
+    assert fold_text("TÍNH TỔNG hai số") == "tinh tong hai so"
+    assert fold_text("Đường đi ngắn nhất") == "duong di ngan nhat"
+    assert tokenize("Số nguyên tố (prime)!") == ["so", "nguyen", "to", "prime"]
+    assert fold_text("") == ""
+
+
+def test_search_matches_with_or_without_diacritics():
+    index = ProblemSearchIndex()
+    index.add("1", _problem(1, "Tính tổng hai số"))
+    index.add("2", _problem(2, "Đường đi ngắn nhất"))
+    index.add("3", _problem(3, "Số nguyên tố"))
+
+    assert [key for key, _ in index.search("tinh tong")] == ["1"]
+    assert [key for key, _ in index.search("ĐƯỜNG ĐI")] == ["2"]
+    assert {key for key, _ in index.search("so")} == {"1", "3"}
+    assert index.search("không khớp gì cả xyz") == []
+    assert index.search("   ") == []
+
+
+def test_search_ranks_by_bm25():
+    index = ProblemSearchIndex()
+    # Từ khóa ở tên (trọng số cao) xếp trên từ khóa chỉ xuất hiện trong mô tả
+    index.add("desc", _problem(1, "Bài A", "cho mảng số nguyên, sắp xếp tăng dần"))
+    index.add("name", _problem(2, "Sắp xếp mảng"))
+    index.add("other", _problem(3, "Bài B", "đếm ký tự"))
+
+    hits = index.search("sap xep")
+    assert [key for key, _ in hits] == ["name", "desc"]
+    assert hits[0][1] > hits[1][1] > 0
+    assert index.search("sap xep", limit=1) == hits[:1]
+
+
+def test_reindex_and_remove():
+    index = ProblemSearchIndex()
+    index.add("1", _problem(1, "Tính tổng"))
+    index.add("1", _problem(1, "Tính tích"))
+    assert len(index) == 1
+    assert index.search("tong") == []
+    assert [key for key, _ in index.search("tich")] == ["1"]
+
+    index.remove("1")
+    index.remove("1")
+    assert len(index) == 0
+    assert index.search("tich") == []
+
+
+def test_catalog_search_follows_upserts():
+    catalog = ProblemCatalog([_problem(1, "Tính tổng"), _problem(2, "Tìm max")])
+    assert [p["id"] for p, _ in catalog.search("tổng")] == [1]
+    catalog.upsert(_problem(2, "Tính tổng lớn"))
+    assert {p["id"] for p, _ in catalog.search("tong")} == {1, 2}
+    assert catalog.search("max") == []
@@ -0,0 +1,114 @@
+# tests/test_submission_queue.py
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from submission_queue import SubmissionQueue, QueueFullError, QueueClosedError
+
+
+def test_slot_rejects_when_full():
+    async def scenario():
+        queue = SubmissionQueue(judge_slots=1, max_pending=2)
+        release = asyncio.Event()
+        started = asyncio.Event()
+
+        async def hold():
+            async with queue.slot():
+                started.set()
+                await release.wait()
+
+        async def wait_in_line():
+            async with queue.slot():
+                pass
+
+        holder = asyncio.create_task(hold())
+        await started.wait()
+        waiter = asyncio.create_task(wait_in_line())
+        await asyncio.sleep(0)
+        assert queue.stats == {"judge_slots": 1, "running": 1, "waiting": 1, "max_pending": 2}
+
+        with pytest.raises(QueueFullError):
+            queue.check_capacity()
+        with pytest.raises(QueueFullError):
+            async with queue.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(holder, waiter)
+        assert queue.stats["running"] == queue.stats["waiting"] == 0
+        queue.check_capacity()
+
+    asyncio.run(scenario())
+
+
+def test_enqueue_runs_jobs_in_slots_and_close_rejects():
+    async def scenario():
+        queue = SubmissionQueue(judge_slots=2, max_pending=3)
+        running, peak, finished = [0], [0], []
+        gate = asyncio.Event()
+
+        async def job():
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            await gate.wait()
+            running[0] -= 1
+
+        for i in range(3):
+            queue.enqueue(f"job-{i}", job, on_finished=lambda i=i: finished.append(i))
+        with pytest.raises(QueueFullError):
+            queue.enqueue("job-3", job)
+
+        await asyncio.sleep(0.01)
+        assert peak[0] == 2
+        gate.set()
+        while len(finished) < 3:
+            await asyncio.sleep(0.01)
+        assert sorted(finished) == [0, 1, 2]
+
+        queue.enqueue("stuck", asyncio.Event().wait, on_finished=lambda: finished.append("stuck"))
+        await asyncio.sleep(0)
+        await queue.close()
+        assert finished[-1] == "stuck"
+        with pytest.raises(QueueClosedError):
+            queue.enqueue("late", job)
+
+    asyncio.run(scenario())
+
+
+def _gradable_exercise_id(main):
+    for prob in main.PROBLEM_CATALOG.problems:
+        try:
+            main._resolve_exercise(prob["id"])
+        except HTTPException:
+            continue
+        return prob["id"]
+    pytest.skip("Không có bài tập nào có test case")
+
+
+def test_submit_returns_429_when_queue_full(main_module, monkeypatch):
+    main = main_module
+    exercise_id = _gradable_exercise_id(main)
+    full_queue = SubmissionQueue(judge_slots=1, max_pending=1)
+    full_queue._reserve()
+    monkeypatch.setattr(main, "SUBMISSION_QUEUE", full_queue)
+    saved = []
+    monkeypatch.setattr(main, "_save_uploaded_submission", lambda file: saved.append(file))
+
+    def upload():
+        return UploadFile(io.BytesIO(b"print(1)"), filename="main.py")
+
+    for endpoint, kwargs in ((main.submit_solution_endpoint, {}),
+                             (main.create_submission_job_endpoint, {"current_user": None})):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(endpoint(exercise_id=exercise_id, file=upload(), **kwargs))
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.headers["Retry-After"] == str(main.QUEUE_FULL_RETRY_AFTER)
+    # Bị từ chối trước khi đọc file bài nộp
+    assert saved == []
+
+    asyncio.run(full_queue.close())
+    with pytest.raises(HTTPException) as exc_info:
+        asyncio.run(main.submit_solution_endpoint(exercise_id=exercise_id, file=upload()))
+    assert exc_info.value.status_code == 503
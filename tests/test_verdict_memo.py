@@ -0,0 +1,64 @@
+# tests/test_verdict_memo.py
+import asyncio
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+
+@pytest.fixture
+def memo(main_module, monkeypatch, tmp_path):
+    """Chấm một bài nộp (có nội dung riêng cho mỗi test) qua _grade_submission_memoized với máy chấm giả."""
+    main = main_module
+    exercise_id = next(p["id"] for p in main.PROBLEM_CATALOG.problems if _resolvable(main, p["id"]))
+    exercise_dict, exercise = main._resolve_exercise(exercise_id)
+    source = tmp_path / "main.py"
+    source.write_text(f"print('{uuid.uuid4().hex}')\n")
+    graded = []
+
+    def grade(results):
+        async def fake_grade(exercise_dict, exercise, user_code_path, on_event=None):
+            graded.append(user_code_path)
+            return results
+        monkeypatch.setattr(main, "_grade_submission", fake_grade)
+        events = []
+        returned = asyncio.run(main._grade_submission_memoized(exercise_id, exercise_dict, exercise, str(source),
+                                                               on_event=events.append))
+        return returned, events
+
+    grade.graded = graded
+    return grade
+
+
+def _resolvable(main, exercise_id):
+    try:
+        main._resolve_exercise(exercise_id)
+    except HTTPException:
+        return False
+    return True
+
+
+def test_deterministic_verdicts_are_served_from_memo(memo):
+    results = [{"test_case_id": 1, "status": "ACCEPTED"}, {"test_case_id": 2, "status": "RUNTIME_ERROR"},
+               {"test_case_id": 3, "status": "WRONG_ANSWER"}]
+    assert memo(results)[0] == results
+    returned, events = memo([{"test_case_id": 1, "status": "GRADER_ERROR"}])
+    assert returned == results
+    assert len(memo.graded) == 1
+    # Kết quả ghi nhớ vẫn được phát lại từng test case cho client đang theo dõi
+    assert [event["result"] for event in events] == results
+
+
+@pytest.mark.parametrize("status", ["TIME_LIMIT_EXCEEDED", "MEMORY_LIMIT_EXCEEDED", "GRADER_ERROR", "SKIPPED"])
+def test_non_deterministic_verdicts_are_not_memoized(memo, status):
+    flaky = [{"test_case_id": 1, "status": "ACCEPTED"}, {"test_case_id": 2, "status": status}]
+    assert memo(flaky)[0] == flaky
+    regraded = [{"test_case_id": 1, "status": "ACCEPTED"}, {"test_case_id": 2, "status": "ACCEPTED"}]
+    assert memo(regraded)[0] == regraded
+    assert len(memo.graded) == 2
+
+
+def test_frontend_grader_errors_are_not_memoized(memo):
+    memo([{"test": "Nút bấm", "result": "❌ Error: Timeout 30000ms exceeded"}])
+    memo([{"test": "Nút bấm", "result": "✅ Passed"}])
+    assert len(memo.graded) == 2